@@ -0,0 +1,32 @@
+import importlib
+
+
+# The package's main entry points, which are imported on first access so that
+# importing refiner itself stays cheap. Most of the heavy dependencies (bs4,
+# subprocess, concurrent.futures...) are further deferred until first use
+# within these modules.
+_LAZY = {
+    'refine': 'refiner.core',
+    'parse': 'refiner.input.pdftohtml',
+    'parse_file': 'refiner.input.pdftohtml',
+    'parse_xml_file': 'refiner.input.pdftohtml',
+    'refine_many': 'refiner.batch',
+    'InputDocument': 'refiner.input.model',
+    'OutputDocument': 'refiner.output.model',
+}
+
+
+def __getattr__(name):
+    try:
+        module = _LAZY[name]
+    except KeyError:
+        raise AttributeError(
+            'module {!r} has no attribute {!r}'.format(__name__, name)
+        )
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY))
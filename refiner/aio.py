@@ -0,0 +1,87 @@
+'''An asyncio front end for extraction and refinement.'''
+import asyncio
+import functools
+import os
+import subprocess
+
+from refiner.core import refine
+from refiner.input.pdftohtml import PDFTOHTML, arguments, parse
+
+
+CHUNK_SIZE = 64 * 1024
+
+
+class AsyncRefiner(object):
+    '''Extracts and refines documents from coroutines.
+
+    pdftohtml is run with asyncio.create_subprocess_exec, at most
+    max_processes at a time, and its output is read as it is produced.
+    Parsing and refinement are CPU bound so they are run in executor, which
+    defaults to the event loop's default executor. Use a
+    concurrent.futures.ProcessPoolExecutor to refine several documents in
+    parallel.
+
+    Create instances from within the event loop they will be used with.
+
+    '''
+    def __init__(
+            self, max_processes = None, executor = None, command = PDFTOHTML
+    ):
+        if max_processes is None:
+            max_processes = os.cpu_count() or 1
+        self.semaphore = asyncio.Semaphore(max_processes)
+        self.executor = executor
+        self.command = command
+
+    async def _run(self, f, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, functools.partial(f, *args, **kwargs)
+        )
+
+    async def extract(self, path):
+        '''Run pdftohtml on the PDF at path, returning its XML output as a
+        string.'''
+        args = arguments(path, command=self.command)
+        async with self.semaphore:
+            process = await asyncio.create_subprocess_exec(
+                *args, stdout=asyncio.subprocess.PIPE
+            )
+            try:
+                chunks = list()
+                while True:
+                    chunk = await process.stdout.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    chunks.append(chunk)
+                returncode = await process.wait()
+            except BaseException:
+                # Including cancellation, don't leave pdftohtml running
+                if process.returncode is None:
+                    process.kill()
+                    await process.wait()
+                raise
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, args)
+        return b''.join(chunks).decode('utf-8', errors='replace')
+
+    async def parse_file(self, path):
+        '''Like refiner.input.pdftohtml.parse_file().'''
+        xml = await self.extract(path)
+        return await self._run(parse, xml)
+
+    async def refine(self, input, **params):
+        '''Like refiner.core.refine().'''
+        return await self._run(refine, input, **params)
+
+    async def refine_file(self, path, **params):
+        '''Extract and refine the PDF at path, returning an
+        OutputDocument.'''
+        xml = await self.extract(path)
+        return await self._run(_parse_and_refine, xml, params)
+
+
+def _parse_and_refine(xml, params):
+    # Done in one executor call so that with a process pool the InputDocument
+    # doesn't have to be sent between processes
+    return refine(parse(xml), **params)
@@ -0,0 +1,205 @@
+import collections
+import concurrent.futures
+import functools
+import itertools
+import os
+
+from refiner.cancel import NEVER, CancelToken
+from refiner.core import refine
+from refiner.input.pdftohtml import parse_file
+
+
+# document is the OutputDocument, or None if error (the exception raised while
+# extracting or refining) is set.
+BatchResult = collections.namedtuple(
+    'BatchResult', ['path', 'document', 'error']
+)
+
+
+def refine_path(path, params, parser = parse_file):
+    '''Extract and refine the document at path. This is the unit of work run
+    in each worker process by refine_many().
+
+    The timeout and cancel of params cover extraction as well as refinement,
+    so if either is given parser is also passed the CancelToken as cancel.
+
+    '''
+    params = dict(params)
+    cancel = CancelToken.within(
+        params.pop('cancel', None), params.pop('timeout', None)
+    )
+    if cancel is NEVER:
+        input = parser(path)
+    else:
+        input = parser(path, cancel=cancel)
+    return refine(input, cancel=cancel, **params)
+
+
+def process_many(
+        function,
+        items,
+        workers = None,
+        ordered = True,
+        max_pending = None,
+        executor = None
+):
+    '''Call function on each of items in a pool of worker processes, yielding
+    an (item, result, error) three-tuple for each. See refine_many() for the
+    meaning of the other arguments.'''
+    if workers is None:
+        workers = os.cpu_count() or 1
+    own_executor = executor is None
+    if own_executor:
+        executor = concurrent.futures.ProcessPoolExecutor(workers)
+    if max_pending is None:
+        max_pending = 2 * workers
+    max_pending = max(max_pending, 1)
+
+    items = iter(items)
+    # The [future, item] of each item submitted but not yet yielded, keyed by
+    # sequence number so they stay in submission order when an item is retried
+    pending = collections.OrderedDict()
+    numbers = itertools.count()
+    # When a worker process dies (e.g. killed for running out of memory) every
+    # item pending in its pool fails with BrokenExecutor, not just the one to
+    # blame. If the pool is ours those items are retried once each, one at a
+    # time in a pool of their own, so that only the culprit fails again. Their
+    # futures are None while they wait in retries.
+    retries = collections.deque()
+    retried = set()
+    # The (executor, future) of the item being retried, if any
+    isolated = None
+
+    def start(item):
+        nonlocal executor
+        try:
+            return executor.submit(function, item)
+        except concurrent.futures.BrokenExecutor as e:
+            # Start a new pool for the rest if it's ours, otherwise fail them
+            # too
+            if own_executor:
+                executor.shutdown(wait=False)
+                executor = concurrent.futures.ProcessPoolExecutor(workers)
+                return executor.submit(function, item)
+            future = concurrent.futures.Future()
+            future.set_exception(e)
+            return future
+
+    def submit():
+        for item in items:
+            pending[next(numbers)] = [start(item), item]
+            return True
+        return False
+
+    def retry():
+        nonlocal isolated
+        if isolated is not None:
+            if not isolated[1].done():
+                return
+            isolated[0].shutdown(wait=False)
+            isolated = None
+        if len(retries) > 0:
+            entry = pending[retries.popleft()]
+            pool = concurrent.futures.ProcessPoolExecutor(1)
+            entry[0] = pool.submit(function, entry[1])
+            isolated = (pool, entry[0])
+
+    def result(number):
+        '''Return the (item, result, error) of the finished item, or None if
+        it's to be retried.'''
+        future, item = pending[number]
+        error = future.exception()
+        if (
+                isinstance(error, concurrent.futures.BrokenExecutor) and
+                own_executor and number not in retried
+        ):
+            retried.add(number)
+            pending[number][0] = None
+            retries.append(number)
+            return None
+        del pending[number]
+        retried.discard(number)
+        if error is not None:
+            return (item, None, error)
+        return (item, future.result(), None)
+
+    try:
+        while len(pending) < max_pending and submit():
+            pass
+
+        while len(pending) > 0:
+            retry()
+            if ordered:
+                number = next(iter(pending))
+                future = pending[number][0]
+                if future is None:
+                    # Waiting to be retried, after the item being retried now
+                    concurrent.futures.wait([isolated[1]])
+                    continue
+                concurrent.futures.wait([future])
+                done = [number]
+            else:
+                futures = dict(
+                    (entry[0], number) for number, entry in pending.items()
+                    if entry[0] is not None
+                )
+                finished, _ = concurrent.futures.wait(
+                    list(futures),
+                    return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                done = [futures[f] for f in finished]
+            for number in done:
+                r = result(number)
+                if r is not None:
+                    yield r
+                    submit()
+    finally:
+        # Only reached with futures pending if the consumer stopped early
+        for future, _ in pending.values():
+            if future is not None:
+                future.cancel()
+        if isolated is not None:
+            isolated[0].shutdown()
+        if own_executor:
+            executor.shutdown()
+
+
+def refine_many(
+        paths,
+        workers = None,
+        ordered = True,
+        max_pending = None,
+        parser = parse_file,
+        executor = None,
+        **params
+):
+    '''Extract and refine each of paths in a pool of worker processes,
+    yielding a BatchResult for each.
+
+    workers: the number of worker processes, defaults to the number of CPUs
+    ordered: if True results are yielded in the same order as paths, otherwise
+        as soon as each is finished
+    max_pending: the maximum number of documents submitted to the pool but not
+        yet yielded, defaults to twice the number of workers. Paths are only
+        consumed as results are yielded, so a slow consumer holds back the
+        pool rather than letting finished documents pile up in memory.
+    parser: a function taking a path and returning an InputDocument, must be
+        picklable (i.e. defined at the top level of a module). If timeout or
+        cancel is given it must also take a cancel keyword argument, like
+        refiner.input.pdftohtml.parse_file().
+    executor: an existing concurrent.futures.Executor to use instead of
+        starting a new pool, it is not shut down afterwards
+
+    Any other keyword arguments are passed on to refine(). An exception raised
+    while processing one document is returned as the error of its BatchResult
+    and doesn't affect the others. If a worker process dies the documents then
+    in the pool are retried, each in a new process of its own, so only the
+    document which killed it fails (with BrokenProcessPool). If executor was
+    given they aren't retried, and the rest fail too.
+
+    '''
+    function = functools.partial(refine_path, params=params, parser=parser)
+    for path, document, error in process_many(
+            function, paths, workers, ordered, max_pending, executor
+    ):
+        yield BatchResult(path, document, error)
@@ -0,0 +1,363 @@
+'''Benchmarks for the refine pipeline over synthetic documents, and for
+comparing the pdftohtml and pdftotext input backends on synthetic documents
+(--backends, parsers only) or real PDFs (--pdfs, end to end).
+
+Run with python -m refiner.bench, see --help. Results can be saved as JSON and
+compared against the results of a previous run to spot regressions.
+
+'''
+import argparse
+import difflib
+import json
+import platform
+import subprocess
+import sys
+import time
+
+from refiner import synthetic
+from refiner.columns import ColumnMap, columns
+from refiner.core import group_lines, join_over_columns, refine
+from refiner.equivalence import diff
+from refiner.geometry import Box
+from refiner.input import pdftohtml, pdftotext
+from refiner.input.pdftohtml import parse
+from refiner.output.model import Heading
+from refiner.profile import LayoutProfile
+from refiner.running import find_running
+
+
+DEFAULT_SCALES = [10, 50, 200]
+DEFAULT_REPEAT = 3
+
+
+def best_of(f, repeat):
+    '''Call f repeat times, returning the list of wall times and the result of
+    the last call.'''
+    times = list()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = f()
+        times.append(time.perf_counter() - start)
+    return times, result
+
+
+def roi_texts(document, roi):
+    texts = list()
+    for page in document.pages:
+        box = Box(
+            page.width * roi[0], page.height * roi[1],
+            right=page.width * roi[2], bottom=page.height * roi[3]
+        )
+        texts.append((page, [t for t in page.texts if box.contains(t)]))
+    return texts
+
+
+def column_map(page_texts):
+    m = ColumnMap()
+    for page, texts in page_texts:
+        m.insert(page, columns(texts))
+    return m
+
+
+def bench_document(
+        pages, repeat, columns = 2, fragments = 2, fonts = 4, noise = 3,
+        seed = 0
+):
+    '''Time each stage on one synthetic document, returning a list of result
+    dicts.'''
+    xml = synthetic.generate(
+        pages, columns, fragments, fonts, noise, seed=seed
+    )
+    roi = synthetic.ROI
+
+    stages = list()
+
+    times, document = best_of(lambda: parse(xml), repeat)
+    stages.append(('parse', times))
+
+    page_texts = roi_texts(document, roi)
+    texts = [t for _, ts in page_texts for t in ts]
+
+    times, cmap = best_of(lambda: column_map(page_texts), repeat)
+    stages.append(('columns', times))
+
+    times, groups = best_of(lambda: group_lines(texts, cmap), repeat)
+    stages.append(('group_lines', times))
+
+    times, _ = best_of(lambda: join_over_columns(groups, cmap), repeat)
+    stages.append(('join_over_columns', times))
+
+    times, _ = best_of(lambda: refine(document, roi=roi), repeat)
+    stages.append(('refine', times))
+
+    # Without an roi refine() either detects running texts or scores the
+    # document against a profile, here learned from another document of the
+    # same layout, and skips detection if it matches (its confidence is
+    # recorded, lines split into fragments usually don't)
+    times, _ = best_of(lambda: find_running(document.pages), repeat)
+    stages.append(('running', times))
+
+    profile = LayoutProfile()
+    refine(parse(synthetic.generate(
+        pages, columns, fragments, fonts, noise, seed=seed + 1
+    )), profile=profile)
+    times, confidence = best_of(
+        lambda: profile.confidence(document.pages), repeat
+    )
+    stages.append(('profile', times))
+
+    params = {
+        'pages': pages, 'columns': columns, 'fragments': fragments,
+        'fonts': fonts, 'noise': noise, 'seed': seed,
+        'texts': sum(len(p.texts) for p in document.pages),
+    }
+    results = list()
+    for name, times in stages:
+        result = {
+            'stage': name,
+            'best': min(times),
+            'mean': sum(times) / len(times),
+        }
+        result.update(params)
+        if name == 'profile':
+            result['confidence'] = confidence
+        results.append(result)
+    return results
+
+
+def _contents(document):
+    return [
+        (isinstance(c, Heading), c.string)
+        for page in document.page_list for c in page.contents
+    ]
+
+
+def agreement(expected, actual):
+    '''Return the similarity of the contents of two output documents, from 0.0
+    to 1.0, as the ratio of a difflib match of their (is heading, string)
+    lists.'''
+    return difflib.SequenceMatcher(
+        None, _contents(expected), _contents(actual), autojunk=False
+    ).ratio()
+
+
+# The input backends compared by bench_backends() and bench_pdfs(): the name
+# of each (also the default command it runs), the synthetic format it reads and
+# its parse and parse_file functions
+BACKENDS = [
+    ('pdftohtml', 'pdftohtml', parse, pdftohtml.parse_file),
+    ('pdftotext', 'bbox', pdftotext.parse, pdftotext.parse_file),
+]
+
+
+def _backend_result(stage, name, times, document, reference, **params):
+    result = {
+        'stage': stage,
+        'backend': name,
+        'best': min(times),
+        'mean': sum(times) / len(times),
+        'identical': diff(reference, document) is None,
+        'agreement': agreement(reference, document),
+    }
+    result.update(params)
+    return result
+
+
+def bench_backends(
+        pages, repeat, columns = 2, fragments = 2, fonts = 4, noise = 3,
+        seed = 0
+):
+    '''Time parsing the same synthetic document as written for each of
+    BACKENDS, returning a list of result dicts with the stage 'parse_synthetic'.
+
+    This compares the parsers only: it doesn't run pdftohtml or pdftotext, and
+    since both inputs come from the generator the agreement of the refined
+    outputs only checks that the parsers build equivalent input documents. See
+    bench_pdfs() to compare the backends end to end on real documents.
+
+    identical is whether refiner.equivalence.diff() finds no difference from
+    the first backend's refined output and agreement is agreement() of the
+    two. pdftotext reports no fonts, so they only agree exactly with fonts of
+    distinct sizes (fonts <= 4).
+
+    '''
+    roi = synthetic.ROI
+    results = list()
+    reference = None
+    for name, format, parse_backend, _ in BACKENDS:
+        source = synthetic.generate(
+            pages, columns, fragments, fonts, noise, seed=seed, format=format
+        )
+        times, input = best_of(lambda: parse_backend(source), repeat)
+        document = refine(input, roi=roi)
+        if reference is None:
+            reference = document
+        results.append(_backend_result(
+            'parse_synthetic', name, times, document, reference,
+            pages=pages, columns=columns, fragments=fragments, fonts=fonts,
+            noise=noise, seed=seed, bytes=len(source.encode('utf-8'))
+        ))
+    return results
+
+
+def bench_pdfs(paths, repeat, commands = None, **params):
+    '''Time extracting, parsing and refining each of the PDFs at paths with
+    each of BACKENDS, returning a list of result dicts with the stage
+    'end_to_end'.
+
+    commands maps backend names to the command to run for each, defaulting to
+    the name. Other keyword arguments are passed on to refine(). identical and
+    agreement compare each backend's output with the first backend's, as in
+    bench_backends().
+
+    '''
+    if commands is None:
+        commands = dict()
+    results = list()
+    for path in paths:
+        reference = None
+        for name, _, _, parse_file in BACKENDS:
+            command = commands.get(name, name)
+            times, document = best_of(
+                lambda: refine(parse_file(path, command=command), **params),
+                repeat
+            )
+            if reference is None:
+                reference = document
+            results.append(_backend_result(
+                'end_to_end', name, times, document, reference,
+                path=path, pages=len(document.pages)
+            ))
+    return results
+
+
+def git_revision():
+    try:
+        out = subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL
+        )
+        return out.decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(
+        scales = DEFAULT_SCALES, repeat = DEFAULT_REPEAT, backends = False,
+        **params
+):
+    '''Run the benchmarks at each of the given scales (page counts), returning
+    a JSON-serializable dict of results. If backends is True the input
+    backends are compared (see bench_backends()) instead of timing stages.'''
+    bench = bench_backends if backends else bench_document
+    results = list()
+    for pages in scales:
+        results += bench(pages, repeat, **params)
+    return make_report(results, repeat)
+
+
+def make_report(results, repeat):
+    '''Return a JSON-serializable dict of results and the environment they
+    were measured in.'''
+    return {
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'time': time.time(),
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def _key(result):
+    return tuple(result.get(name) for name in (
+        'stage', 'backend', 'path', 'pages', 'columns', 'fragments', 'fonts',
+        'noise', 'seed'
+    ))
+
+
+def compare(old, new):
+    '''Return a list of (stage, pages, old best, new best, ratio) five-tuples
+    for each result in both old and new run dicts.'''
+    previous = dict((_key(r), r) for r in old['results'])
+    rows = list()
+    for r in new['results']:
+        o = previous.get(_key(r))
+        if o is not None:
+            rows.append((
+                r['stage'], r['pages'], o['best'], r['best'],
+                r['best'] / o['best'] if o['best'] > 0 else float('inf')
+            ))
+    return rows
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(
+        prog='python -m refiner.bench',
+        description='Benchmark the refine pipeline on synthetic documents.'
+    )
+    parser.add_argument(
+        '--scales', type=int, nargs='+', default=DEFAULT_SCALES,
+        help='page counts to benchmark'
+    )
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('--columns', type=int, default=2)
+    parser.add_argument('--fragments', type=int, default=2)
+    parser.add_argument('--fonts', type=int, default=4)
+    parser.add_argument('--noise', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', help='save results to this file')
+    parser.add_argument(
+        '--compare', help='compare against results saved by a previous run'
+    )
+    parser.add_argument(
+        '--backends', action='store_true',
+        help='compare the parsers of the input backends on synthetic documents'
+    )
+    parser.add_argument(
+        '--pdfs', nargs='+', metavar='PDF',
+        help='compare the input backends end to end on these PDFs instead'
+    )
+    parser.add_argument('--pdftohtml', default=pdftohtml.PDFTOHTML)
+    parser.add_argument('--pdftotext', default=pdftotext.PDFTOTEXT)
+    args = parser.parse_args(argv)
+
+    if args.pdfs:
+        report = make_report(bench_pdfs(args.pdfs, args.repeat, {
+            'pdftohtml': args.pdftohtml, 'pdftotext': args.pdftotext,
+        }), args.repeat)
+    else:
+        report = run(
+            args.scales, args.repeat, backends=args.backends,
+            columns=args.columns, fragments=args.fragments, fonts=args.fonts,
+            noise=args.noise, seed=args.seed
+        )
+
+    for r in report['results']:
+        if 'backend' in r:
+            line = (
+                '{backend:<20} {pages:>6} pages {best:>10.4f}s best '
+                '{mean:>10.4f}s mean {agreement:>6.1%} agreement'.format(**r)
+            )
+            if 'path' in r:
+                line += ' ' + r['path']
+            print(line)
+        else:
+            print('{stage:<20} {pages:>6} pages {texts:>8} texts '
+                  '{best:>10.4f}s best {mean:>10.4f}s mean'.format(**r))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            old = json.load(f)
+        print()
+        for stage, pages, o, n, ratio in compare(old, report):
+            print('{:<20} {:>6} pages {:>10.4f}s -> {:>10.4f}s {:>6.2f}x'.format(
+                stage, pages, o, n, ratio
+            ))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
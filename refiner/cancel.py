@@ -0,0 +1,102 @@
+'''Cooperative cancellation and deadlines.
+
+A CancelToken is passed to refine(), parse_file() or extract(), which check it
+between pages (and kill pdftohtml) and raise Cancelled once it has been
+cancelled, or DeadlineExceeded once its deadline has passed.
+
+'''
+import threading
+import time
+
+
+class Cancelled(Exception):
+    pass
+
+
+class DeadlineExceeded(Cancelled):
+    pass
+
+
+class _NeverCancelled(object):
+    '''A token which is never cancelled. This is the default for the cancel
+    argument of refine() and the functions it calls.'''
+    cancelled = False
+
+    def check(self):
+        pass
+
+    def remaining(self):
+        return None
+
+
+NEVER = _NeverCancelled()
+
+
+class CancelToken(object):
+    '''A token which is cancelled by calling cancel(), from any thread, or once
+    timeout seconds have passed since it was created. It is also cancelled if
+    parent (another CancelToken) is.'''
+    def __init__(self, timeout = None, parent = None):
+        self._event = threading.Event()
+        if timeout is not None:
+            self.deadline = time.monotonic() + timeout
+        else:
+            self.deadline = None
+        self.parent = parent
+
+    @classmethod
+    def within(cls, cancel = None, timeout = None):
+        '''Return a token which is cancelled when cancel is or after timeout
+        seconds, either of which may be None.'''
+        if cancel is None:
+            cancel = NEVER
+        if timeout is None:
+            return cancel
+        return cls(timeout, cancel)
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        try:
+            self.check()
+        except Cancelled:
+            return True
+        return False
+
+    def remaining(self):
+        '''Return the seconds left until the deadline (of this token or its
+        parent), or None if there isn't one.'''
+        remaining = None
+        if self.deadline is not None:
+            remaining = max(self.deadline - time.monotonic(), 0.0)
+        if self.parent is not None:
+            parent = self.parent.remaining()
+            if remaining is None or (parent is not None and parent < remaining):
+                remaining = parent
+        return remaining
+
+    def check(self):
+        '''Raise Cancelled if the token has been cancelled, or
+        DeadlineExceeded if its deadline has passed.'''
+        if self._event.is_set():
+            raise Cancelled()
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            raise DeadlineExceeded()
+        if self.parent is not None:
+            self.parent.check()
+
+    def __getstate__(self):
+        # Tokens sent to worker processes keep their deadline but can no
+        # longer be cancelled from this process
+        state = self.__dict__.copy()
+        state['_event'] = self._event.is_set()
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        event = threading.Event()
+        if state['_event']:
+            event.set()
+        self._event = event
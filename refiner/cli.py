@@ -0,0 +1,328 @@
+'''The pdfrefiner command, which refines every document in a directory tree.
+
+Each finished document is recorded in a manifest (JSON Lines) so that an
+interrupted run can be restarted and will skip the documents already done.
+
+'''
+import argparse
+import fnmatch
+import functools
+import json
+import os
+import sys
+import time
+
+from refiner.batch import process_many
+from refiner.cancel import CancelToken
+from refiner.core import (
+    refine, DEFAULT_MAX_LINE_SEP, DEFAULT_MIN_H_SEP, QUALITIES, QUALITY_FULL
+)
+from refiner.columns import DEFAULT_SMALLEST_COL, DEFAULT_MIN_COL_VOTES
+from refiner.input.pdftohtml import parse_file, parse_xml_file
+from refiner.output import binary, jsonl, markdown, html
+
+
+# Module, file extension and whether the output file is binary
+FORMATS = {
+    'jsonl': (jsonl, '.jsonl', False),
+    'markdown': (markdown, '.md', False),
+    'html': (html, '.html', False),
+    'binary': (binary, '.rfnb', True),
+}
+
+MANIFEST_NAME = '.pdfrefiner-manifest.jsonl'
+
+
+def find_inputs(root, pattern, extension = None):
+    '''Yield the paths of files under root (or root itself if it's a file)
+    matching pattern, in a stable order. The manifest and any outputs (files
+    ending in extension) are skipped, in case pattern matches them.'''
+    if os.path.isfile(root):
+        yield root
+        return
+    for directory, dirs, files in os.walk(root):
+        dirs.sort()
+        for name in sorted(files):
+            if name == MANIFEST_NAME or (
+                    extension is not None and name.endswith(extension)
+            ):
+                continue
+            if fnmatch.fnmatch(name, pattern):
+                yield os.path.join(directory, name)
+
+
+def output_path(path, root, output_dir, extension):
+    '''Return where the output for the input at path should be written.'''
+    base = os.path.splitext(path)[0] + extension
+    if output_dir is None:
+        return base
+    if os.path.isfile(root):
+        return os.path.join(output_dir, os.path.basename(base))
+    return os.path.join(output_dir, os.path.relpath(base, root))
+
+
+def fingerprint(path):
+    '''Return a (size, mtime) fingerprint used to tell whether an input has
+    changed since it was recorded in the manifest.'''
+    s = os.stat(path)
+    return [s.st_size, s.st_mtime]
+
+
+class Manifest(object):
+    '''An append-only JSON Lines record of processed inputs. The last record
+    for each input wins.'''
+    def __init__(self, path):
+        self.path = path
+        self.records = dict()
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A partial final line from an interrupted run
+                        continue
+                    self.records[record['input']] = record
+        self.f = None
+
+    def done(self, path, skip_failed = False):
+        '''Return True if path was processed by a previous run and hasn't
+        changed since.'''
+        record = self.records.get(os.path.abspath(path))
+        if record is None or record['fingerprint'] != fingerprint(path):
+            return False
+        if record['status'] == 'ok':
+            return os.path.exists(record['output'])
+        return skip_failed
+
+    def add(self, record):
+        if self.f is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.f = open(self.path, 'a')
+        self.records[record['input']] = record
+        self.f.write(json.dumps(record))
+        self.f.write('\n')
+        self.f.flush()
+
+    def close(self):
+        if self.f is not None:
+            self.f.close()
+            self.f = None
+
+
+def process(task, fmt, params, xml, timeout = None):
+    '''Refine one input and write its output. This is the unit of work run in
+    each worker process.'''
+    path, out = task
+    writer, _, is_binary = FORMATS[fmt]
+    start = time.time()
+    cancel = CancelToken.within(timeout=timeout)
+    if xml:
+        input = parse_xml_file(path)
+    else:
+        input = parse_file(path, cancel=cancel)
+    document = refine(input, cancel=cancel, **params)
+
+    directory = os.path.dirname(out)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # Write to a temporary file and rename it into place so that an
+    # interrupted run never leaves a partial output behind
+    tmp = '{}.{}.tmp'.format(out, os.getpid())
+    try:
+        if is_binary:
+            f = open(tmp, 'wb')
+        else:
+            f = open(tmp, 'w', encoding='utf-8')
+        with f:
+            writer.write(document, f)
+        os.replace(tmp, out)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return time.time() - start
+
+
+def _roi(value):
+    roi = tuple(float(x) for x in value.split(','))
+    if len(roi) != 4:
+        raise argparse.ArgumentTypeError('roi must be four numbers')
+    return roi
+
+
+def _pages(value):
+    return [int(x) for x in value.split(',') if x]
+
+
+def make_parser():
+    parser = argparse.ArgumentParser(
+        prog='pdfrefiner',
+        description='Refine every document in a directory tree.'
+    )
+    parser.add_argument('input', help='a document or a directory of them')
+    parser.add_argument(
+        '-o', '--output-dir',
+        help='where to write outputs, by default next to each input'
+    )
+    parser.add_argument(
+        '-f', '--format', choices=sorted(FORMATS), default='jsonl'
+    )
+    parser.add_argument(
+        '-j', '--workers', type=int, default=None,
+        help='number of worker processes, by default the number of CPUs'
+    )
+    parser.add_argument(
+        '--xml', action='store_true',
+        help='inputs are pdftohtml -xml output rather than PDFs'
+    )
+    parser.add_argument(
+        '--pattern',
+        help='file name pattern of inputs, default *.pdf or *.xml with --xml'
+    )
+    parser.add_argument(
+        '--manifest',
+        help='checkpoint manifest, by default {} in the output directory '
+        '(or input directory)'.format(MANIFEST_NAME)
+    )
+    parser.add_argument(
+        '--force', action='store_true',
+        help='process every input, even those already done'
+    )
+    parser.add_argument(
+        '--skip-failed', action='store_true',
+        help="don't retry inputs which failed in a previous run"
+    )
+    parser.add_argument(
+        '--timeout', type=float,
+        help='give up on an input after this many seconds'
+    )
+    parser.add_argument('-q', '--quiet', action='store_true')
+
+    group = parser.add_argument_group('refine parameters')
+    group.add_argument(
+        '--roi', type=_roi,
+        help='region of interest as left,top,right,bottom page fractions'
+    )
+    group.add_argument('--width', type=int)
+    group.add_argument('--first', type=int)
+    group.add_argument('--last', type=int)
+    group.add_argument('--ignore', type=_pages, default=[])
+    group.add_argument(
+        '--max-line-sep', type=float, default=DEFAULT_MAX_LINE_SEP
+    )
+    group.add_argument(
+        '--smallest-col', type=float, default=DEFAULT_SMALLEST_COL
+    )
+    group.add_argument(
+        '--min-col-votes', type=int, default=DEFAULT_MIN_COL_VOTES
+    )
+    group.add_argument('--min-h-sep', type=float, default=DEFAULT_MIN_H_SEP)
+    group.add_argument(
+        '--strip-running', action='store_true',
+        help='remove running headers, footers and page numbers'
+    )
+    group.add_argument(
+        '--quality', choices=QUALITIES, default=QUALITY_FULL,
+        help='fast trades some structure for speed'
+    )
+    group.add_argument(
+        '--dedupe', action='store_true',
+        help='remove duplicated (e.g. faux-bold) text fragments'
+    )
+    return parser
+
+
+def main(argv = None):
+    args = make_parser().parse_args(argv)
+
+    params = {
+        'first': args.first, 'last': args.last, 'ignore': args.ignore,
+        'roi': args.roi, 'width': args.width,
+        'max_line_sep': args.max_line_sep,
+        'smallest_col': args.smallest_col,
+        'min_col_votes': args.min_col_votes,
+        'min_h_sep': args.min_h_sep,
+        'strip_running': args.strip_running,
+        'dedupe': args.dedupe,
+        'quality': args.quality,
+    }
+    extension = FORMATS[args.format][1]
+    pattern = args.pattern or ('*.xml' if args.xml else '*.pdf')
+
+    manifest_path = args.manifest
+    if manifest_path is None:
+        directory = args.output_dir or args.input
+        if os.path.isfile(directory):
+            directory = os.path.dirname(directory)
+        manifest_path = os.path.join(directory, MANIFEST_NAME)
+    manifest = Manifest(manifest_path)
+
+    skipped = [0]
+    # Inputs which would overwrite the output of an earlier one
+    collided = list()
+
+    def tasks():
+        outputs = dict()
+        for path in find_inputs(args.input, pattern, extension):
+            out = output_path(path, args.input, args.output_dir, extension)
+            other = outputs.setdefault(os.path.abspath(out), path)
+            if other != path:
+                collided.append((path, out, other))
+                continue
+            if not args.force and manifest.done(path, args.skip_failed):
+                skipped[0] += 1
+                continue
+            yield (path, out)
+
+    function = functools.partial(
+        process, fmt=args.format, params=params, xml=args.xml,
+        timeout=args.timeout
+    )
+    ok = failed = 0
+    try:
+        for (path, out), seconds, error in process_many(
+                function, tasks(), args.workers, ordered=False
+        ):
+            record = {
+                'input': os.path.abspath(path),
+                'output': os.path.abspath(out),
+                'fingerprint': fingerprint(path),
+            }
+            if error is None:
+                ok += 1
+                record.update(status='ok', seconds=seconds)
+                if not args.quiet:
+                    print('ok     {:.2f}s {}'.format(seconds, path))
+            else:
+                failed += 1
+                record.update(
+                    status='failed',
+                    error='{}: {}'.format(type(error).__name__, error)
+                )
+                print('failed {} {}'.format(path, record['error']),
+                      file=sys.stderr)
+            manifest.add(record)
+        for path, out, other in collided:
+            failed += 1
+            error = 'output {} is also the output of {}'.format(out, other)
+            manifest.add({
+                'input': os.path.abspath(path),
+                'output': os.path.abspath(out),
+                'fingerprint': fingerprint(path),
+                'status': 'failed',
+                'error': error,
+            })
+            print('failed {} {}'.format(path, error), file=sys.stderr)
+    finally:
+        manifest.close()
+
+    if not args.quiet:
+        print('{} done, {} failed, {} skipped'.format(ok, failed, skipped[0]))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
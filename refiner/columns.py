@@ -83,6 +83,28 @@ def round_to_column(x, cols):
     return i
 
 
+class ColumnSampler(object):
+    '''Finds columns on only the first few pages of each size, and then gives
+    the columns most often found for the rest. This is cheaper than finding
+    the columns of every page, but misses pages with a different layout.'''
+    def __init__(self, samples = 3, smallest = 0.25, min_votes = 1):
+        self.samples = samples
+        self.smallest = smallest
+        self.min_votes = min_votes
+        # Maps (width, height) to a Counter of the columns found, as tuples
+        self.found = dict()
+
+    def columns(self, page, texts):
+        found = self.found.setdefault(
+            (page.width, page.height), collections.Counter()
+        )
+        if sum(found.values()) < self.samples:
+            cols = columns(texts, self.smallest, self.min_votes)
+            found[tuple(cols)] += 1
+            return cols
+        return list(found.most_common(1)[0][0])
+
+
 class ColumnMap(object):
     def __init__(self):
         self.dict = dict()
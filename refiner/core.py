@@ -1,8 +1,14 @@
+import collections
+import functools
 import re
 
 from refiner.output.model import OutputDocument, OutputPage, Content, Paragraph, Heading
-from refiner.columns import ColumnMap, columns, DEFAULT_SMALLEST_COL, DEFAULT_MIN_COL_VOTES
+from refiner.columns import ColumnMap, ColumnSampler, columns, DEFAULT_SMALLEST_COL, DEFAULT_MIN_COL_VOTES
 from refiner.geometry import Box
+from refiner.cancel import NEVER, CancelToken
+from refiner.instrument import NULL as NULL_INSTRUMENTATION
+from refiner.dedupe import duplicates
+from refiner.running import find_running
 
 
 class TextGroup(object):
@@ -45,7 +51,14 @@ class TextGroup(object):
 DEFAULT_MAX_LINE_SEP = 1.0
 DEFAULT_MIN_H_SEP = 0.5
 
-def group_lines(texts, column_map, max_line_sep = DEFAULT_MAX_LINE_SEP, min_h_sep = DEFAULT_MIN_H_SEP):
+# Quality levels of refine(), see its docstring
+QUALITY_FULL = 'full'
+QUALITY_FAST = 'fast'
+QUALITIES = (QUALITY_FULL, QUALITY_FAST)
+# In fast quality columns are only found on this many pages of each size
+FAST_SAMPLE_PAGES = 3
+
+def group_lines(texts, column_map, max_line_sep = DEFAULT_MAX_LINE_SEP, min_h_sep = DEFAULT_MIN_H_SEP, cancel = NEVER):
     if len(texts) == 0:
         return []
 
@@ -59,17 +72,20 @@ def group_lines(texts, column_map, max_line_sep = DEFAULT_MAX_LINE_SEP, min_h_se
         texts,
         key=lambda t: (t.page.number, t.top, t.left)
     )
+    # The column of each text is kept here rather than on the texts, so that
+    # the input document isn't modified and can be refined concurrently
+    cols = dict()
     prev = prelim[0]
-    prev.col = col(prev)
+    cols[prev] = col(prev)
     for t in prelim[1:]:
         if (
                 t.page == prev.page and
                 t.top == prev.top and
                 t.left < prev.right + (min_h_sep * t.height)
         ):
-            t.col = prev.col
+            cols[t] = cols[prev]
         else:
-            t.col = col(t)
+            cols[t] = col(t)
         prev = t
 
     # Sort the texts by page, then by column (rounded) from left to right, then
@@ -77,15 +93,17 @@ def group_lines(texts, column_map, max_line_sep = DEFAULT_MAX_LINE_SEP, min_h_se
     # column-rounded) left coord.
     texts = sorted(
         texts,
-        key=lambda t: (t.page.number, t.col, t.top, t.left)
+        key=lambda t: (t.page.number, cols[t], t.top, t.left)
     )
     groups = []
 
     current = [texts[0]]
     for t in texts[1:]:
+        if t.page != current[-1].page:
+            cancel.check()
         sep = current[-1].height * max_line_sep
         if (t.page == current[-1].page
-            and t.col == current[-1].col
+            and cols[t] == cols[current[-1]]
             and t.top < current[-1].bottom + sep
             and t.font.size == current[-1].font.size):
             #and not t.string.startswith('*')): # To stop lists getting grouped
@@ -99,7 +117,7 @@ def group_lines(texts, column_map, max_line_sep = DEFAULT_MAX_LINE_SEP, min_h_se
     return groups
 
 
-def join_over_columns(groups, column_map):
+def join_over_columns(groups, column_map, instrument = NULL_INSTRUMENTATION, cancel = NEVER):
     if len(groups) < 1:
         return []
 
@@ -107,10 +125,14 @@ def join_over_columns(groups, column_map):
 
     joined = []
     current = groups[0]
+    # Number of groups joined onto current so far
+    chain = 0
 
     for g in groups[1:]:
         cl = current.last
         gf = g.first
+        if cl.page != gf.page:
+            cancel.check()
         is_diff_col = (
             cl.page != gf.page or
             col(cl) != col(gf)
@@ -122,10 +144,13 @@ def join_over_columns(groups, column_map):
             # current doesn't end with a full stop or colon then join g to
             # current...
             current = current.join(g)
+            chain += 1
+            instrument.event('join', page=gf.page.number, chain=chain)
         else:
             # Otherwise current is finished, g is the new current
             joined.append(current)
             current = g
+            chain = 0
 
     # Append the final group
     joined.append(current)
@@ -155,121 +180,82 @@ def is_heading(group, prev_group = None, next_group = None):
         
 
 
-def is_subheading(a, b):
-    '''Returns True when a is a subheading of b (probably).'''
-    return a.first.font.size < b.first.font.size
+def body_font_size(texts):
+    '''Return the most common font size of texts, or None.'''
+    sizes = collections.Counter(
+        t.font.size for t in texts if t.font is not None
+    )
+    if len(sizes) == 0:
+        return None
+    return sizes.most_common(1)[0][0]
 
 
-def refine(
-        input,
-        first = None, last = None,
-        ignore = [],
-        roi = None, width = None,
-        max_line_sep = DEFAULT_MAX_LINE_SEP,
-        smallest_col = DEFAULT_SMALLEST_COL,
-        min_col_votes = DEFAULT_MIN_COL_VOTES,
-        min_h_sep = DEFAULT_MIN_H_SEP
+def is_larger_heading(
+        group, prev_group = None, next_group = None, body_size = None
 ):
-    output_document = OutputDocument()
-    
-    roi_texts = list()
-    column_map = ColumnMap()
-
-    if first is not None:
-        first = max(first - 1, 0)
-    else:
-        first = 0
+    '''A cheaper alternative to is_heading(): group is a heading if it's in a
+    font bigger than body_size and isn't too long.'''
+    font = group.first.font
+    if font is None or body_size is None or font.size <= body_size:
+        return False
+    return sum(t.string.count(' ') for t in group.texts) <= 14
 
-    if last is None:
-        last = len(input.pages)
 
-    for input_page in input.pages[first:last]:
-        # Is this page ignored?
-        ignore_page = input_page.number in ignore
-
-        # Determine the roi for this page
-        if roi is not None:
-            page_roi = Box(
-                input_page.width * roi[0],
-                input_page.height * roi[1],
-                right=input_page.width * roi[2],
-                bottom=input_page.height * roi[3],
-            )
-        else:
-            page_roi = None
+def is_subheading(a, b):
+    '''Returns True when a is a subheading of b (probably).'''
+    return a.first.font.size < b.first.font.size
 
-        # Create an OutputPage instance and add it to the OutputDocument
-        if width is not None:
-            # If width parameter is specified need to do some scaling
-            scale = width / input_page.width
 
-            if page_roi:
-                scaled_page_roi = page_roi.scale(scale)
-            else:
-                scaled_page_roi = None
-
-            output_page = OutputPage(
-                output_document,
-                input_page.number,
-                width,
-                (input_page.height * scale),
-                scale=scale,
-                roi=scaled_page_roi,
-                ignored=ignore_page
-            )
-        else:
-            output_page = OutputPage(
-                output_document,
-                input_page.number,
-                input_page.width,
-                input_page.height,
-                roi=page_roi,
-                ignored=ignore_page
-            )
-        output_document.pages[output_page.number] = output_page
-
-        if not ignore_page:
-            # Find the texts within the roi
-            if page_roi:
-                page_texts = [
-                    t for t in input_page.texts if page_roi.contains(t)
-                ]
-            else:
-                page_texts = input_page.texts
+def build_contents(
+        groups, output_document, index = None, cancel = NEVER, progress = None,
+        heading = is_heading
+):
+    '''Turn the text groups into output model Content instances, appending
+    them to the contents of the corresponding pages of output_document.
 
-            # Find columns and insert into column map
-            column_map.insert(
-                input_page,
-                columns(page_texts, smallest_col, min_col_votes)
-            )
+    heading(group, prev_group, next_group) decides whether each group is a
+    heading.
 
-            # Add page texts to the total roi_texts list
-            roi_texts += page_texts
+    cancel is checked and progress('classify', done, total) called as each
+    page is finished.
 
-    # Group texts into paragraphs
-    groups = group_lines(roi_texts, column_map, max_line_sep)
-    groups = join_over_columns(groups, column_map)
+    Returns the number of headings found.
 
+    '''
     # For keeping track of the heading hierarchy - contains a list of
     # (TextGroup, Heading) two-tuples.
     current_headings = list()
+    headings = 0
+    # Groups are in page order, so once the page number changes the previous
+    # page is finished
+    prev_page_number = None
+    done = 0
+    if progress is not None:
+        total = len(set(g.first.page.number for g in groups))
 
-    # Turn the text groups into output model Content instances
     for i in range(len(groups)):
         group = groups[i]
 
         # Get the input page number and then the OutputPage instance
         page_number = group.first.page.number
+        if prev_page_number is not None and page_number != prev_page_number:
+            output_document.pages.finish(prev_page_number)
+            done += 1
+            if progress is not None:
+                progress('classify', done, total)
+            cancel.check()
+        prev_page_number = page_number
         output_page = output_document.pages[page_number]
-        # left, top and string are calculated in the same way for headings and
+        # left, top and texts are found in the same way for headings and
         # normal paragraphs:
         left = group.first.left
         top = group.first.top
         if output_page.scale != 1.0:
             left *= output_page.scale
             top *= output_page.scale
-        string = ' '.join([t.string.strip() for t in group.texts])
-        string = re.sub(r'[ \t]+', ' ', string)
+        # The string is made from the texts when it's first needed, see
+        # Content
+        texts = group.texts
 
         # Can use previous and next text groups to help determine whether this
         # group is a heading
@@ -282,7 +268,7 @@ def refine(
         except IndexError:
             next_group = None
 
-        if (is_heading(group, prev_group, next_group)):
+        if (heading(group, prev_group, next_group)):
             # Determine the parent heading
             parent = None
             while len(current_headings) > 0:
@@ -294,15 +280,331 @@ def refine(
                     # Bigger heading, remove current lowest-level heading
                     del current_headings[-1]
 
-            content = Heading(output_page, left, top, string, parent)
+            content = Heading(
+                output_page, left, top, None, parent, texts=texts
+            )
             current_headings.append((group, content))
+            headings += 1
         else:
-            content = Paragraph(output_page, left, top, string)
-        
+            content = Paragraph(output_page, left, top, texts=texts)
+
         # Append to content list of output page
         output_page.contents.append(content)
 
-    return output_document
+        if index is not None:
+            if isinstance(content, Heading):
+                enclosing = content.parent
+            elif len(current_headings) > 0:
+                enclosing = current_headings[-1][1]
+            else:
+                enclosing = None
+            index.add(content, len(output_page.contents) - 1, enclosing)
+
+    if prev_page_number is not None:
+        output_document.pages.finish(prev_page_number)
+        if progress is not None:
+            progress('classify', done + 1, total)
+
+    return headings
+
+
+def select_pages(input, first = None, last = None):
+    '''Return the pages of input from the first to last (1-based, inclusive) as
+    refine() does.'''
+    if first is not None:
+        first = max(first - 1, 0)
+    else:
+        first = 0
+
+    if last is None:
+        last = len(input.pages)
+
+    return input.pages[first:last]
+
+
+def page_roi(input_page, roi):
+    '''Return roi, as fractions of the page size, as a Box in the coordinates
+    of input_page, or None if roi is None.'''
+    if roi is None:
+        return None
+    return Box(
+        input_page.width * roi[0],
+        input_page.height * roi[1],
+        right=input_page.width * roi[2],
+        bottom=input_page.height * roi[3],
+    )
+
+
+def new_output_page(output_document, input_page, roi, width, ignored):
+    '''Create the OutputPage of output_document corresponding to input_page.
+
+    Returns the OutputPage and the roi (in input coordinates) as a Box, or None
+    if roi is None.
+
+    '''
+    # Determine the roi for this page
+    box = page_roi(input_page, roi)
+
+    if width is not None:
+        # If width parameter is specified need to do some scaling
+        scale = width / input_page.width
+
+        if box:
+            scaled_page_roi = box.scale(scale)
+        else:
+            scaled_page_roi = None
+
+        output_page = OutputPage(
+            output_document,
+            input_page.number,
+            width,
+            (input_page.height * scale),
+            scale=scale,
+            roi=scaled_page_roi,
+            ignored=ignored
+        )
+    else:
+        output_page = OutputPage(
+            output_document,
+            input_page.number,
+            input_page.width,
+            input_page.height,
+            roi=box,
+            ignored=ignored
+        )
+    return output_page, box
+
+
+def exclude_texts(
+        pages,
+        ignore = [],
+        dedupe = False,
+        strip_running = False,
+        instrument = NULL_INSTRUMENTATION
+):
+    '''Return the set of texts on pages (other than those ignored) which are
+    left out of refine() by its dedupe and strip_running options.'''
+    pages = [p for p in pages if p.number not in ignore]
+    exclude = set()
+    if dedupe:
+        with instrument.stage('dedupe'):
+            for p in pages:
+                exclude.update(duplicates(p.texts))
+        instrument.count('duplicates', len(exclude))
+    if strip_running:
+        with instrument.stage('running'):
+            running = find_running(pages)
+        instrument.count('running', len(running))
+        exclude |= running
+    return exclude
+
+
+def select_texts(input_page, box, exclude = None):
+    '''Return the texts of input_page within the Box box (if not None) and not
+    in the set exclude (if given).'''
+    if box:
+        page_texts = [t for t in input_page.texts if box.contains(t)]
+    else:
+        page_texts = input_page.texts
+    if exclude:
+        page_texts = [t for t in page_texts if t not in exclude]
+    return page_texts
+
+
+def refine(
+        input,
+        first = None, last = None,
+        ignore = [],
+        roi = None, width = None,
+        max_line_sep = DEFAULT_MAX_LINE_SEP,
+        smallest_col = DEFAULT_SMALLEST_COL,
+        min_col_votes = DEFAULT_MIN_COL_VOTES,
+        min_h_sep = DEFAULT_MIN_H_SEP,
+        index = None,
+        instrument = NULL_INSTRUMENTATION,
+        max_memory = None,
+        spill_dir = None,
+        strip_running = False,
+        dedupe = False,
+        profile = None,
+        cancel = None,
+        timeout = None,
+        progress = None,
+        quality = QUALITY_FULL
+):
+    '''Refine the InputDocument input into an OutputDocument.
+
+    If index is given, each content is added to it as it is created, along with
+    its enclosing heading (see refiner.index.InvertedIndex).
+
+    Pass a refiner.instrument.Instrumentation as instrument to record the time
+    spent in each stage and counts of the elements passing through them.
+
+    If max_memory is given, each output page is written to a temporary file in
+    spill_dir (or the default temporary directory) as soon as it is finished,
+    and only around max_memory bytes of pages are kept in memory. Other pages
+    are read back in when accessed (see refiner.output.spill.SpillStore).
+
+    If strip_running is True, running headers, footers and page numbers are
+    detected (see refiner.running) and removed before finding columns, which
+    usually makes an roi unnecessary.
+
+    If input was parsed with a refiner.strings.StringTable, the strings of the
+    output contents are interned with it too.
+
+    If dedupe is True, texts which duplicate another text at (almost) the same
+    position, as pdftohtml outputs for faux-bold text, are removed (see
+    refiner.dedupe).
+
+    If a refiner.profile.LayoutProfile is given as profile and it matches input
+    with enough confidence (see LayoutProfile.confidence()), its ROI (unless
+    roi is given) and column edges are used instead of detecting running texts
+    and columns. Otherwise columns are detected, as are running texts (i.e.
+    strip_running is turned on) unless roi is given, and the profile is
+    updated from the result.
+
+    cancel is a refiner.cancel.CancelToken which is checked between pages of
+    each stage. refine() raises refiner.cancel.Cancelled once it has been
+    cancelled, or DeadlineExceeded if its deadline or timeout seconds after the
+    call pass. progress(stage, done, total) is called as each page is
+    selected ('pages') and classified ('classify'), and once grouping
+    ('group_lines') and joining ('join_over_columns') are done.
+
+    quality is QUALITY_FULL ('full') or QUALITY_FAST ('fast'), which trades
+    some structure for speed: columns are only found on the first few pages
+    of each size (see ColumnSampler), groups aren't joined over columns and
+    headings are the groups in a font bigger than the body font (see
+    is_larger_heading()). The quality is recorded as the quality of the
+    returned OutputDocument.
+
+    '''
+    if quality not in QUALITIES:
+        raise ValueError('unknown quality {!r}'.format(quality))
+    fast = quality == QUALITY_FAST
+    cancel = CancelToken.within(cancel, timeout)
+    with instrument.stage('refine'):
+        output_document = OutputDocument(input.strings)
+        output_document.quality = quality
+        if max_memory is not None:
+            from refiner.output.spill import SpillStore
+            output_document.pages = SpillStore(
+                output_document, max_memory, spill_dir
+            )
+
+        roi_texts = list()
+        column_map = ColumnMap()
+        if fast:
+            sampler = ColumnSampler(
+                FAST_SAMPLE_PAGES, smallest_col, min_col_votes
+            )
+
+        pages = select_pages(input, first, last)
+
+        use_profile = False
+        if profile is not None:
+            with instrument.stage('profile'):
+                confidence = profile.confidence(
+                    [p for p in pages if p.number not in ignore]
+                )
+            use_profile = confidence >= profile.min_confidence
+            instrument.event(
+                'profile', confidence=confidence, used=use_profile
+            )
+            if use_profile:
+                if roi is None:
+                    roi = profile.roi
+            elif roi is None:
+                # Fall back to full detection, which the profile then learns
+                strip_running = True
+            # Pages and the texts refined on each, to learn from
+            selected = list()
+
+        exclude = exclude_texts(
+            pages, ignore, dedupe, strip_running, instrument
+        )
+
+        for i, input_page in enumerate(pages):
+            cancel.check()
+            # Is this page ignored?
+            ignore_page = input_page.number in ignore
+
+            # Create an OutputPage instance and add it to the OutputDocument
+            output_page, box = new_output_page(
+                output_document, input_page, roi, width, ignore_page
+            )
+            output_document.pages[output_page.number] = output_page
+
+            if not ignore_page:
+                with instrument.stage('page', number=input_page.number):
+                    # Find the texts within the roi
+                    with instrument.stage('roi'):
+                        page_texts = select_texts(input_page, box, exclude)
+
+                    # Find columns and insert into column map
+                    with instrument.stage('columns', texts=len(page_texts)):
+                        page_columns = None
+                        if use_profile:
+                            page_columns = profile.columns_for(input_page)
+                        if page_columns is None and fast:
+                            page_columns = sampler.columns(
+                                input_page, page_texts
+                            )
+                        elif page_columns is None:
+                            page_columns = columns(
+                                page_texts, smallest_col, min_col_votes
+                            )
+                        column_map.insert(input_page, page_columns)
+
+                # Add page texts to the total roi_texts list
+                roi_texts += page_texts
+                if profile is not None:
+                    selected.append((input_page, page_texts))
+
+            if progress is not None:
+                progress('pages', i + 1, len(pages))
+
+        instrument.count('pages', len(output_document.pages))
+        instrument.count('texts_in', len(roi_texts))
+
+        # Group texts into paragraphs
+        with instrument.stage('group_lines'):
+            groups = group_lines(
+                roi_texts, column_map, max_line_sep, min_h_sep, cancel=cancel
+            )
+        instrument.count('groups_out', len(groups))
+        if progress is not None:
+            progress('group_lines', 1, 1)
+        if not fast:
+            with instrument.stage('join_over_columns'):
+                joined = join_over_columns(
+                    groups, column_map, instrument, cancel
+                )
+            if progress is not None:
+                progress('join_over_columns', 1, 1)
+        else:
+            joined = groups
+        instrument.count('joins', len(groups) - len(joined))
+        groups = joined
+
+        # Turn the text groups into output model Content instances
+        with instrument.stage('classify'):
+            if fast:
+                heading = functools.partial(
+                    is_larger_heading, body_size=body_font_size(roi_texts)
+                )
+            else:
+                heading = is_heading
+            headings = build_contents(
+                groups, output_document, index, cancel, progress, heading
+            )
+        instrument.count('headings', headings)
+        instrument.count('contents', len(groups))
+
+        if profile is not None and not use_profile:
+            with instrument.stage('learn_profile'):
+                profile.learn(selected, smallest_col, min_col_votes)
+
+        return output_document
 
 
 if __name__ == '__main__':
@@ -310,7 +612,7 @@ if __name__ == '__main__':
     import sys
     with open(sys.argv[1], 'r') as f:
         input_doc = parse(f.read(), [(r'�', '.')])
-    output_doc = refine(input_doc, width=int(sys.argv[2]), roi=(0.0, 0.08, 0.952, 0.94), max_line_sep=0.2, min_col_votes=2)
+    output_doc = refine(input_doc, width=int(sys.argv[2]), strip_running=True, max_line_sep=0.2, min_col_votes=2)
     print(str(len(output_doc.pages)) + ' output pages')
     for p in output_doc.page_list:
         print(p)
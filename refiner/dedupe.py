@@ -0,0 +1,75 @@
+'''Detection of duplicate text fragments.
+
+pdftohtml emits faux-bold and shadowed text as two or three copies of the same
+string offset by a pixel or so. Texts are hashed by (string, position cell),
+with cells a little bigger than the tolerance, so each text only needs to be
+compared with the texts already seen in the neighbouring cells.
+
+'''
+
+
+# The maximum difference in left and top coords of duplicates, in pixels
+DEFAULT_TOLERANCE = 1
+# The minimum fraction of the smaller box which the boxes of duplicates must
+# have in common
+DEFAULT_MIN_OVERLAP = 0.8
+
+
+def overlap(a, b):
+    '''Return the area of the intersection of boxes a and b as a fraction of
+    the area of the smaller, or 1.0 if either has no area.'''
+    smaller = min(a.width * a.height, b.width * b.height)
+    if smaller <= 0:
+        return 1.0
+    width = min(a.right, b.right) - max(a.left, b.left)
+    height = min(a.bottom, b.bottom) - max(a.top, b.top)
+    if width <= 0 or height <= 0:
+        return 0.0
+    return width * height / smaller
+
+
+def duplicates(
+        texts,
+        tolerance = DEFAULT_TOLERANCE,
+        min_overlap = DEFAULT_MIN_OVERLAP
+):
+    '''Return a list of the texts (of a single page) which duplicate an
+    earlier text. The first of each set of duplicates is kept.'''
+    cell = tolerance + 1
+    seen = dict()
+    redundant = list()
+    for t in texts:
+        x = int(t.left // cell)
+        y = int(t.top // cell)
+        duplicate = False
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for k in seen.get((t.string, x + dx, y + dy), ()):
+                    if (
+                            abs(k.left - t.left) <= tolerance and
+                            abs(k.top - t.top) <= tolerance and
+                            overlap(k, t) >= min_overlap
+                    ):
+                        duplicate = True
+                        break
+        if duplicate:
+            redundant.append(t)
+        else:
+            seen.setdefault((t.string, x, y), list()).append(t)
+    return redundant
+
+
+def dedupe(
+        document,
+        tolerance = DEFAULT_TOLERANCE,
+        min_overlap = DEFAULT_MIN_OVERLAP
+):
+    '''Remove duplicate texts from each page of the InputDocument document,
+    returning the number removed.'''
+    removed = 0
+    for page in document.pages:
+        redundant = set(duplicates(page.texts, tolerance, min_overlap))
+        if redundant:
+            page.texts = [t for t in page.texts if t not in redundant]
+            removed += len(redundant)
+    return removed
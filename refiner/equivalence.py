@@ -0,0 +1,192 @@
+'''A differential harness checking that a candidate refine implementation
+produces exactly the same output as the reference refiner.core.refine.
+
+Run with python -m refiner.equivalence, see --help.
+
+'''
+import argparse
+import collections
+import importlib
+import random
+import sys
+import time
+
+from refiner import synthetic
+from refiner.core import refine
+from refiner.input.pdftohtml import parse
+from refiner.output.model import Heading, Paragraph
+
+
+# Where and how two output documents first differ. page is None for a
+# document-level difference (the set of page numbers) and content is None for a
+# page-level difference.
+Divergence = collections.namedtuple(
+    'Divergence', ['page', 'content', 'field', 'expected', 'actual']
+)
+
+Result = collections.namedtuple(
+    'Result', ['name', 'divergence', 'reference_time', 'candidate_time']
+)
+
+
+def _kind(c):
+    # Compared by isinstance, so that e.g. lazily loaded headings are still
+    # headings
+    if isinstance(c, Heading):
+        return 'heading'
+    elif isinstance(c, Paragraph):
+        return 'paragraph'
+    return 'content'
+
+
+def _content_fields(c):
+    fields = [
+        ('kind', _kind(c)),
+        ('left', c.left),
+        ('top', c.top),
+        ('string', c.string),
+    ]
+    if isinstance(c, Heading):
+        fields.append(('level', c.level))
+    return fields
+
+
+def _page_fields(p):
+    return [
+        ('width', p.width),
+        ('height', p.height),
+        ('scale', p.scale),
+        ('ignored', p.ignored),
+        ('roi', None if p.roi is None else (
+            p.roi.left, p.roi.top, p.roi.right, p.roi.bottom
+        )),
+        ('contents', len(p.contents)),
+    ]
+
+
+def diff(expected, actual):
+    '''Compare two output documents page by page and content by content,
+    returning the first Divergence or None if they are the same.'''
+    if expected.pages.keys() != actual.pages.keys():
+        return Divergence(
+            None, None, 'pages', expected.pages.keys(), actual.pages.keys()
+        )
+
+    for e, a in zip(expected.page_list, actual.page_list):
+        # Compare contents before the counts so that the first differing
+        # content is reported rather than just the count
+        for i, (ec, ac) in enumerate(zip(e.contents, a.contents)):
+            for (field, ev), (_, av) in zip(
+                    _content_fields(ec), _content_fields(ac)
+            ):
+                if ev != av:
+                    return Divergence(e.number, i, field, ev, av)
+        for (field, ev), (_, av) in zip(_page_fields(e), _page_fields(a)):
+            if ev != av:
+                return Divergence(e.number, None, field, ev, av)
+
+    return None
+
+
+def _timed(f, *args, **kwargs):
+    start = time.perf_counter()
+    result = f(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def check(candidate, inputs, reference = refine):
+    '''Run reference and candidate over each of inputs, yielding a Result for
+    each.
+
+    candidate and reference are called like refine(), with an InputDocument and
+    keyword parameters. inputs is an iterable of (name, xml, params)
+    three-tuples; the xml is parsed separately for each call so that neither
+    implementation can see changes the other made to its input.
+
+    '''
+    for name, xml, params in inputs:
+        expected, reference_time = _timed(reference, parse(xml), **params)
+        actual, candidate_time = _timed(candidate, parse(xml), **params)
+        yield Result(
+            name, diff(expected, actual), reference_time, candidate_time
+        )
+
+
+def fixtures(paths, **params):
+    '''Yield inputs for check() from pdftohtml -xml files.'''
+    for path in paths:
+        with open(path, 'r') as f:
+            yield (path, f.read(), params)
+
+
+def synthetic_inputs(count, seed = 0, max_pages = 20):
+    '''Yield count inputs for check() from randomized synthetic documents.'''
+    r = random.Random(seed)
+    for i in range(count):
+        args = {
+            'pages': r.randint(1, max_pages),
+            'columns': r.randint(1, 4),
+            'fragments': r.randint(1, 4),
+            'fonts': r.randint(1, 7),
+            'noise': r.randint(0, 6),
+            'seed': r.randint(0, 2 ** 31),
+        }
+        params = {'roi': synthetic.ROI} if r.random() < 0.5 else {}
+        if r.random() < 0.3:
+            params['width'] = r.choice([600, 1000])
+        name = 'synthetic ' + ' '.join(
+            '{}={}'.format(k, v) for k, v in sorted(args.items())
+        )
+        yield (name, synthetic.generate(**args), params)
+
+
+def load(spec):
+    '''Return the function named by a 'module:function' string.'''
+    module, _, name = spec.partition(':')
+    return getattr(importlib.import_module(module), name)
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(
+        prog='python -m refiner.equivalence',
+        description='Check a candidate refine() gives the same output as '
+        'refiner.core.refine.'
+    )
+    parser.add_argument(
+        'candidate', help='the candidate as module:function'
+    )
+    parser.add_argument(
+        'fixtures', nargs='*', help='pdftohtml -xml files to check'
+    )
+    parser.add_argument(
+        '--synthetic', type=int, default=20,
+        help='number of randomized synthetic documents to check'
+    )
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    candidate = load(args.candidate)
+    inputs = list(fixtures(args.fixtures))
+    inputs += list(synthetic_inputs(args.synthetic, args.seed))
+
+    failures = 0
+    reference_total = candidate_total = 0.0
+    for result in check(candidate, inputs):
+        reference_total += result.reference_time
+        candidate_total += result.candidate_time
+        ratio = result.candidate_time / max(result.reference_time, 1e-9)
+        if result.divergence is None:
+            print('ok   {:.2f}x {}'.format(ratio, result.name))
+        else:
+            failures += 1
+            print('FAIL {:.2f}x {}'.format(ratio, result.name))
+            print('     {}'.format(result.divergence))
+
+    print('{} of {} differ, candidate took {:.2f}x the reference time'.format(
+        failures, len(inputs), candidate_total / max(reference_total, 1e-9)
+    ))
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
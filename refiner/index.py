@@ -0,0 +1,124 @@
+import collections
+import json
+import re
+
+from refiner.output.model import Heading
+
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(string):
+    return TOKEN_RE.findall(string.lower())
+
+
+# page and content are the page number and index of the matching content within
+# that page's contents. heading is the (page, content) reference of the
+# enclosing heading, or None.
+Hit = collections.namedtuple('Hit', ['page', 'content', 'heading'])
+
+
+class InvertedIndex(object):
+    '''A full-text index over the contents of an output document.
+
+    Pass an instance as the index argument of refine() to build it as the
+    output is created. Each term maps to a list of postings, one
+    (page, content, position) three-tuple per occurrence, in the order contents
+    were added.
+
+    '''
+    def __init__(self):
+        self.postings = collections.defaultdict(list)
+        # (page, content) -> (page, content) of the enclosing heading
+        self.context = dict()
+        # (page, content) of each heading -> heading string
+        self.headings = dict()
+        self._heading_refs = dict()
+
+    def __len__(self):
+        '''The number of distinct terms.'''
+        return len(self.postings)
+
+    def add(self, content, content_index, heading = None):
+        '''Index content, which is at content_index in its page's contents and
+        is enclosed by the Heading heading (or None).'''
+        ref = (content.page.number, content_index)
+        if isinstance(content, Heading):
+            self._heading_refs[id(content)] = ref
+            self.headings[ref] = content.string
+        if heading is not None and id(heading) in self._heading_refs:
+            self.context[ref] = self._heading_refs[id(heading)]
+        for position, term in enumerate(tokenize(content.string)):
+            self.postings[term].append((ref[0], ref[1], position))
+
+    def _hit(self, page, content):
+        return Hit(page, content, self.context.get((page, content)))
+
+    def search(self, term):
+        '''Return a Hit for each content containing term, in document
+        order.'''
+        hits = list()
+        prev = None
+        for page, content, _ in self.postings.get(term.lower(), []):
+            if (page, content) != prev:
+                hits.append(self._hit(page, content))
+                prev = (page, content)
+        return hits
+
+    def phrase(self, string):
+        '''Return a Hit for each content containing all the terms in string
+        consecutively, in document order.'''
+        terms = tokenize(string)
+        if len(terms) == 0:
+            return []
+
+        # Candidate start positions from the first term, narrowed down by
+        # checking each following term is at the next position.
+        starts = set(self.postings.get(terms[0], []))
+        for offset, term in enumerate(terms[1:], 1):
+            if len(starts) == 0:
+                break
+            following = set(
+                (p, c, pos - offset) for p, c, pos in self.postings.get(term, [])
+            )
+            starts &= following
+
+        refs = sorted(set((p, c) for p, c, _ in starts))
+        return [self._hit(p, c) for p, c in refs]
+
+    def heading(self, hit):
+        '''Return the string of the heading enclosing hit, or None.'''
+        if hit.heading is None:
+            return None
+        return self.headings[hit.heading]
+
+    def dump(self, f):
+        '''Write this index as JSON to the text file-like object f.'''
+        json.dump({
+            'postings': {
+                term: [x for posting in postings for x in posting]
+                for term, postings in self.postings.items()
+            },
+            'context': [
+                [p, c, hp, hc] for (p, c), (hp, hc) in self.context.items()
+            ],
+            'headings': [
+                [p, c, s] for (p, c), s in self.headings.items()
+            ],
+        }, f)
+
+    @classmethod
+    def load(cls, f):
+        '''Read an index written by dump() from the text file-like object
+        f.'''
+        data = json.load(f)
+        index = cls()
+        for term, flat in data['postings'].items():
+            index.postings[term] = [
+                tuple(flat[i:i+3]) for i in range(0, len(flat), 3)
+            ]
+        for p, c, hp, hc in data['context']:
+            index.context[(p, c)] = (hp, hc)
+        for p, c, s in data['headings']:
+            index.headings[(p, c)] = s
+        return index
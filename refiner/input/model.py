@@ -87,8 +87,14 @@ class InputPage(object):
         return '<Page {}>'.format(self.number)
 
 class InputDocument(object):
-    def __init__(self):
-        '''Create a new Document instance.'''
+    def __init__(self, strings = None):
+        '''Create a new Document instance.
+
+        strings is the refiner.strings.StringTable the strings of the document
+        were interned with, if any.
+
+        '''
         self.pages = list()
         self.fonts = dict()
+        self.strings = strings
         
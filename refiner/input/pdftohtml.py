@@ -1,51 +1,149 @@
-import subprocess
 import re
-import tempfile
-import bs4
 import sys
 
+from refiner.cancel import NEVER, CancelToken
 from refiner.input.model import InputDocument, InputPage, Font, Text
+from refiner.instrument import NULL as NULL_INSTRUMENTATION
 
 
-def parse(string, replacements=[]):
-    for r in replacements:
-        string = re.sub(r[0], r[1], string)
-
-    soup = bs4.BeautifulSoup(string)
-    document = InputDocument()
-
-    fontspec_elements = soup.find_all('fontspec')
-    for e in fontspec_elements:
-        font = Font(e['id'], e['family'], e['size'], e['color'])
-        document.fonts[font.id] = font
-
-    page_elements = soup.find_all('page')
-    for e in page_elements:
-        page = InputPage(int(e['number']), int(e['width']), int(e['height']))
-        document.pages.append(page)
-
-        for te in e.find_all('text'):
-            string = ''.join(te.strings)
-            text = Text(
-                string,
-                page,
-                int(te['left']),
-                int(te['top']),
-                int(te['width']),
-                int(te['height']),
-                font=document.fonts.get(te['font'], None)
+def parse(
+        string, replacements=[], instrument=NULL_INSTRUMENTATION, strings=None
+):
+    '''Parse a string of pdftohtml -xml output into an InputDocument.
+
+    If strings (a refiner.strings.StringTable) is given the strings of texts
+    are interned with it, and so are the contents refined from the document.
+
+    '''
+    # bs4 is slow to import, so only import it once it's needed
+    import bs4
+
+    with instrument.stage('parse'):
+        for r in replacements:
+            string = re.sub(r[0], r[1], string)
+
+        soup = bs4.BeautifulSoup(string)
+        document = InputDocument(strings)
+
+        fontspec_elements = soup.find_all('fontspec')
+        for e in fontspec_elements:
+            font = Font(e['id'], e['family'], e['size'], e['color'])
+            document.fonts[font.id] = font
+
+        texts = 0
+        page_elements = soup.find_all('page')
+        for e in page_elements:
+            page = InputPage(
+                int(e['number']), int(e['width']), int(e['height'])
             )
-            page.texts.append(text)
+            document.pages.append(page)
+
+            with instrument.stage('page', number=page.number):
+                for te in e.find_all('text'):
+                    string = ''.join(te.strings)
+                    if strings is not None:
+                        string = strings.intern(string)
+                    text = Text(
+                        string,
+                        page,
+                        int(te['left']),
+                        int(te['top']),
+                        int(te['width']),
+                        int(te['height']),
+                        font=document.fonts.get(te['font'], None)
+                    )
+                    page.texts.append(text)
+            texts += len(page.texts)
+
+        instrument.count('input_pages', len(document.pages))
+        instrument.count('texts_parsed', texts)
 
     return document
 
 
-def parse_file(path):
-    with tempfile.NamedTemporaryFile(mode='w+', suffix='.xml') as xml_file:
-        args = ['pdftohtml', '-xml', path, xml_file.name]
-        subprocess.check_call(args)
-        xml = xml_file.read()
-    return parse(xml)
+def parse_xml_file(path, instrument=NULL_INSTRUMENTATION, strings=None):
+    '''Parse a file of pdftohtml -xml output.'''
+    with open(path, 'r') as f:
+        return parse(f.read(), instrument=instrument, strings=strings)
+
+
+PDFTOHTML = 'pdftohtml'
+
+
+def arguments(path, output=None, command=PDFTOHTML):
+    '''Return the pdftohtml command line converting the PDF at path to XML,
+    written to the file output or to stdout if output is None.'''
+    if output is None:
+        return [command, '-xml', '-stdout', path]
+    return [command, '-xml', path, output]
+
+
+# How often a running pdftohtml checks whether it has been cancelled, seconds
+POLL_INTERVAL = 0.1
+
+
+def run(args, capture=False, cancel=NEVER):
+    '''Run the command line args, returning its stdout as bytes if capture is
+    True. The process is killed if the CancelToken cancel is cancelled or
+    passes its deadline while it runs.'''
+    import subprocess
+
+    stdout = subprocess.PIPE if capture else None
+    with subprocess.Popen(args, stdout=stdout) as process:
+        try:
+            while True:
+                if cancel is NEVER:
+                    timeout = None
+                else:
+                    timeout = POLL_INTERVAL
+                    remaining = cancel.remaining()
+                    if remaining is not None:
+                        timeout = min(timeout, remaining)
+                try:
+                    output, _ = process.communicate(timeout=timeout)
+                    break
+                except subprocess.TimeoutExpired:
+                    cancel.check()
+        except BaseException:
+            process.kill()
+            raise
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, args)
+    return output
+
+
+def extract(path, command=PDFTOHTML, timeout=None, cancel=None):
+    '''Run pdftohtml on the PDF at path, returning its XML output as a
+    string.
+
+    pdftohtml is killed and DeadlineExceeded raised if it takes longer than
+    timeout seconds, or Cancelled if the CancelToken cancel is cancelled.
+
+    '''
+    output = run(
+        arguments(path, command=command), capture=True,
+        cancel=CancelToken.within(cancel, timeout)
+    )
+    return output.decode('utf-8', errors='replace')
+
+
+def parse_file(
+        path, instrument=NULL_INSTRUMENTATION, strings=None, timeout=None,
+        cancel=None, command=PDFTOHTML
+):
+    '''Run pdftohtml on the PDF at path and parse its output. See extract()
+    for timeout and cancel.'''
+    import tempfile
+
+    cancel = CancelToken.within(cancel, timeout)
+    with instrument.stage('parse_file'):
+        with tempfile.NamedTemporaryFile(mode='w+', suffix='.xml') as xml_file:
+            args = arguments(path, xml_file.name, command)
+            with instrument.stage('pdftohtml'):
+                run(args, cancel=cancel)
+            xml = xml_file.read()
+        cancel.check()
+        return parse(xml, instrument=instrument, strings=strings)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,118 @@
+'''An input adapter for the XHTML output of poppler's pdftotext -bbox-layout.
+
+pdftotext groups words into lines itself, so each line becomes one Text. Its
+coordinates are PDF points, which are scaled by SCALE to match the pixels of
+pdftohtml -xml output, and rounded to ints as pdftohtml's are. pdftotext
+doesn't report fonts, so each line is given a Font for its (scaled, rounded)
+height, shared by all the lines of that height.
+
+'''
+import xml.etree.ElementTree as ElementTree
+
+from refiner.cancel import CancelToken
+from refiner.input.model import InputDocument, InputPage, Font, Text
+from refiner.input.pdftohtml import run
+from refiner.instrument import NULL as NULL_INSTRUMENTATION
+
+
+PDFTOTEXT = 'pdftotext'
+
+# pdftohtml's default zoom
+SCALE = 1.5
+
+_NS = '{http://www.w3.org/1999/xhtml}'
+
+
+def _local(tag):
+    # Tags are namespaced in pdftotext's output but not necessarily in
+    # hand-written input
+    return tag[len(_NS):] if tag.startswith(_NS) else tag
+
+
+def _px(value, scale):
+    return int(round(float(value) * scale))
+
+
+def parse(
+        string, instrument=NULL_INSTRUMENTATION, strings=None, scale=SCALE
+):
+    '''Parse a string of pdftotext -bbox-layout output into an InputDocument.
+    See refiner.input.pdftohtml.parse() for strings.'''
+    with instrument.stage('parse'):
+        root = ElementTree.fromstring(string.encode('utf-8'))
+        document = InputDocument(strings)
+
+        texts = 0
+        for e in root.iter():
+            if _local(e.tag) != 'page':
+                continue
+            page = InputPage(
+                len(document.pages) + 1,
+                _px(e.get('width'), scale), _px(e.get('height'), scale)
+            )
+            document.pages.append(page)
+
+            with instrument.stage('page', number=page.number):
+                for le in e.iter():
+                    if _local(le.tag) != 'line':
+                        continue
+                    string = ' '.join(
+                        w.text or '' for w in le if _local(w.tag) == 'word'
+                    )
+                    if strings is not None:
+                        string = strings.intern(string)
+                    left = _px(le.get('xMin'), scale)
+                    top = _px(le.get('yMin'), scale)
+                    right = _px(le.get('xMax'), scale)
+                    bottom = _px(le.get('yMax'), scale)
+                    size = bottom - top
+                    font = document.fonts.get(str(size))
+                    if font is None:
+                        font = Font(str(size), '', size, '#000000')
+                        document.fonts[font.id] = font
+                    page.texts.append(Text(
+                        string, page, left, top, right - left, size,
+                        font=font
+                    ))
+            texts += len(page.texts)
+
+        instrument.count('input_pages', len(document.pages))
+        instrument.count('texts_parsed', texts)
+
+    return document
+
+
+def parse_xhtml_file(path, instrument=NULL_INSTRUMENTATION, strings=None):
+    '''Parse a file of pdftotext -bbox-layout output.'''
+    with open(path, 'r', encoding='utf-8') as f:
+        return parse(f.read(), instrument=instrument, strings=strings)
+
+
+def arguments(path, output=None, command=PDFTOTEXT):
+    '''Return the pdftotext command line converting the PDF at path to XHTML,
+    written to the file output or to stdout if output is None.'''
+    return [command, '-bbox-layout', path, '-' if output is None else output]
+
+
+def extract(path, command=PDFTOTEXT, timeout=None, cancel=None):
+    '''Run pdftotext on the PDF at path, returning its XHTML output as a
+    string. See refiner.input.pdftohtml.extract() for timeout and cancel.'''
+    output = run(
+        arguments(path, command=command), capture=True,
+        cancel=CancelToken.within(cancel, timeout)
+    )
+    return output.decode('utf-8', errors='replace')
+
+
+def parse_file(
+        path, instrument=NULL_INSTRUMENTATION, strings=None, timeout=None,
+        cancel=None, command=PDFTOTEXT
+):
+    '''Run pdftotext on the PDF at path and parse its output, like
+    refiner.input.pdftohtml.parse_file().'''
+    cancel = CancelToken.within(cancel, timeout)
+    with instrument.stage('parse_file'):
+        with instrument.stage('pdftotext'):
+            xhtml = extract(path, command, cancel=cancel)
+        cancel.check()
+        return parse(xhtml, instrument=instrument, strings=strings)
@@ -0,0 +1,137 @@
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+class _NullStage(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class NullInstrumentation(object):
+    '''Instrumentation which records nothing. This is the default for the
+    instrument argument of parse_file(), parse() and refine().'''
+    enabled = False
+
+    _stage = _NullStage()
+
+    def stage(self, name, **args):
+        return self._stage
+
+    def count(self, name, n = 1):
+        pass
+
+    def event(self, name, **args):
+        pass
+
+
+NULL = NullInstrumentation()
+
+
+class _Stage(object):
+    def __init__(self, instrumentation, name, args):
+        self.instrumentation = instrumentation
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.instrumentation._depth += 1
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+        return self
+
+    def __exit__(self, *exc_info):
+        wall = time.perf_counter() - self.wall
+        cpu = time.process_time() - self.cpu
+        i = self.instrumentation
+        i._add(self.name, wall, cpu)
+        i._span(self, wall)
+        i._depth -= 1
+        if i._depth == 0 and i.callback is not None:
+            i.callback(i.report())
+        return False
+
+
+class Instrumentation(object):
+    '''Records the wall time, CPU time and number of calls of each named stage,
+    named element counts and peak memory.
+
+    Pass an instance as the instrument argument of parse_file(), parse() or
+    refine(). Each time the outermost stage finishes, i.e. each of those calls
+    returns, callback (if given) is called with the cumulative report().
+
+    If memory is True peak memory is measured with tracemalloc, which is more
+    precise but slows everything down considerably. Otherwise the peak resident
+    set size of the process is reported.
+
+    '''
+    enabled = True
+
+    def __init__(self, callback = None, memory = False):
+        self.callback = callback
+        self.memory = memory
+        self.stages = dict()
+        self.counts = dict()
+        self._depth = 0
+        if memory:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            self._tracemalloc = tracemalloc
+
+    def stage(self, name, **args):
+        '''Return a context manager which times the enclosed block as the named
+        stage. Stages may be entered many times, times are accumulated.
+
+        args describe this particular entry into the stage, e.g. the page
+        number, and are ignored here but recorded by subclasses such as
+        refiner.trace.Tracer.
+
+        '''
+        return _Stage(self, name, args)
+
+    def _add(self, name, wall, cpu):
+        try:
+            s = self.stages[name]
+        except KeyError:
+            s = self.stages[name] = [0, 0.0, 0.0]
+        s[0] += 1
+        s[1] += wall
+        s[2] += cpu
+
+    def _span(self, stage, wall):
+        pass
+
+    def count(self, name, n = 1):
+        self.counts[name] = self.counts.get(name, 0) + n
+
+    def event(self, name, **args):
+        '''Mark a point event, ignored here but recorded by subclasses.'''
+        pass
+
+    @property
+    def peak_memory(self):
+        '''Peak memory in bytes, or None if it can't be measured.'''
+        if self.memory:
+            return self._tracemalloc.get_traced_memory()[1]
+        elif resource is not None:
+            # ru_maxrss is in kilobytes on Linux
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        else:
+            return None
+
+    def report(self):
+        return {
+            'stages': {
+                name: {'calls': s[0], 'wall': s[1], 'cpu': s[2]}
+                for name, s in self.stages.items()
+            },
+            'counts': dict(self.counts),
+            'peak_memory': self.peak_memory,
+        }
@@ -0,0 +1,419 @@
+'''A compact binary format for output documents.
+
+Layout (all integers little-endian):
+
+    header    MAGIC, version (u16), flags (u16), see EXACT and FAST
+    pages     one record per page, see PAGE and CONTENT
+    strings   count (u32), count + 1 offsets (u32) into a UTF-8 blob, the blob
+    table     count (u32), then (page number, byte offset) per page
+    footer    strings offset (u64), table offset (u64), MAGIC
+
+Every distinct string is stored once in the string table and contents refer to
+it by id. Coordinates are stored as fixed-width ints in units of
+1/COORD_SCALE, or as doubles if the EXACT flag is set in the header. The page
+table allows read() to decode a single page without decoding the rest of the
+file.
+
+'''
+import io
+import mmap
+import struct
+import weakref
+
+from refiner.geometry import Box
+from refiner.output.model import (
+    OutputDocument, OutputPage, PageStore, Content, Paragraph, Heading
+)
+
+
+MAGIC = b'RFNB'
+VERSION = 1
+
+COORD_SCALE = 100
+SCALE_SCALE = 1000000
+
+HEADER = struct.Struct('<4sHH')
+# number, width, height, scale, flags, roi left, top, right, bottom, count
+PAGE = struct.Struct('<iiiiBiiiiI')
+PAGE_EXACT = struct.Struct('<idddBddddI')
+# kind, left, top, string id, parent page number, parent content index
+CONTENT = struct.Struct('<BiiIii')
+CONTENT_EXACT = struct.Struct('<BddIii')
+U32 = struct.Struct('<I')
+TABLE_ENTRY = struct.Struct('<iQ')
+FOOTER = struct.Struct('<QQ4s')
+
+# Header flags
+EXACT = 1
+# The document was refined with quality 'fast' rather than 'full'
+FAST = 2
+
+# Page flags
+FLAG_IGNORED = 1
+FLAG_ROI = 2
+
+KIND_CONTENT = 0
+KIND_PARAGRAPH = 1
+KIND_HEADING = 2
+
+
+class FormatError(Exception):
+    pass
+
+
+class _FixedCodec(object):
+    page = PAGE
+    content = CONTENT
+
+    @staticmethod
+    def encode(value, scale = COORD_SCALE):
+        return int(round(value * scale))
+
+    @staticmethod
+    def decode(value, scale = COORD_SCALE):
+        if value % scale == 0:
+            return value // scale
+        return value / scale
+
+
+class _ExactCodec(object):
+    page = PAGE_EXACT
+    content = CONTENT_EXACT
+
+    @staticmethod
+    def encode(value, scale = None):
+        return float(value)
+
+    @staticmethod
+    def decode(value, scale = None):
+        if value.is_integer():
+            return int(value)
+        return value
+
+
+def _codec(flags):
+    if flags & EXACT:
+        return _ExactCodec
+    return _FixedCodec
+
+
+class _Writer(object):
+    def __init__(self, f, heading_refs = None, flags = 0):
+        self.f = f
+        self.flags = flags
+        self.codec = _codec(flags)
+        self.offset = 0
+        self.string_ids = dict()
+        self.strings = list()
+        # Maps each heading written so far to its (page, index) so that
+        # children can refer to their parent
+        if heading_refs is None:
+            heading_refs = weakref.WeakKeyDictionary()
+        self.heading_refs = heading_refs
+        self.table = list()
+
+    def write(self, data):
+        self.f.write(data)
+        self.offset += len(data)
+
+    def intern(self, string):
+        try:
+            return self.string_ids[string]
+        except KeyError:
+            i = len(self.strings)
+            self.string_ids[string] = i
+            self.strings.append(string)
+            return i
+
+    def write_page(self, page):
+        self.table.append((page.number, self.offset))
+
+        encode = self.codec.encode
+        flags = 0
+        if page.ignored:
+            flags |= FLAG_IGNORED
+        roi = (0, 0, 0, 0)
+        if page.roi is not None:
+            flags |= FLAG_ROI
+            roi = (
+                encode(page.roi.left), encode(page.roi.top),
+                encode(page.roi.right), encode(page.roi.bottom)
+            )
+        self.write(self.codec.page.pack(
+            page.number, encode(page.width), encode(page.height),
+            encode(page.scale, SCALE_SCALE), flags, *roi,
+            len(page.contents)
+        ))
+
+        for i, c in enumerate(page.contents):
+            parent = (-1, -1)
+            if isinstance(c, Heading):
+                kind = KIND_HEADING
+                self.heading_refs[c] = (page.number, i)
+                if c.parent is not None:
+                    parent = self.parent_ref(c.parent)
+            elif isinstance(c, Paragraph):
+                kind = KIND_PARAGRAPH
+            else:
+                kind = KIND_CONTENT
+            self.write(self.codec.content.pack(
+                kind, encode(c.left), encode(c.top), self.intern(c.string),
+                *parent
+            ))
+
+    def parent_ref(self, parent):
+        try:
+            return self.heading_refs[parent]
+        except KeyError:
+            # The parent may have been loaded again (e.g. from a SpillStore)
+            # since its page was written
+            return (parent.page.number, parent.page.contents.index(parent))
+
+    def finish(self):
+        strings_offset = self.offset
+        encoded = [s.encode('utf-8') for s in self.strings]
+        self.write(U32.pack(len(encoded)))
+        position = 0
+        offsets = [position]
+        for e in encoded:
+            position += len(e)
+            offsets.append(position)
+        self.write(struct.pack('<{}I'.format(len(offsets)), *offsets))
+        for e in encoded:
+            self.write(e)
+
+        table_offset = self.offset
+        self.write(U32.pack(len(self.table)))
+        for entry in self.table:
+            self.write(TABLE_ENTRY.pack(*entry))
+
+        self.write(FOOTER.pack(strings_offset, table_offset, MAGIC))
+
+
+def write(document, f):
+    '''Write document to the binary file-like object f.
+
+    Pages are written in order as they are encoded, only the string table and
+    page table are held until the end. f does not need to be seekable.
+
+    '''
+    writer = _Writer(f)
+    flags = writer.flags
+    if document.quality == 'fast':
+        flags |= FAST
+    writer.write(HEADER.pack(MAGIC, VERSION, flags))
+    for page in document.page_list:
+        writer.write_page(page)
+    writer.finish()
+
+
+def dumps_page(page, heading_refs):
+    '''Encode a single page as a complete binary output file, with exact
+    coordinates.
+
+    heading_refs is a weakref.WeakKeyDictionary mapping headings on other
+    pages, which may be the parents of headings on this page, to their
+    (page number, index) and is updated with the headings on this page.
+
+    '''
+    f = io.BytesIO()
+    writer = _Writer(f, heading_refs, EXACT)
+    writer.write(HEADER.pack(MAGIC, VERSION, writer.flags))
+    writer.write_page(page)
+    writer.finish()
+    return f.getvalue()
+
+
+class LazyHeading(Heading):
+    '''A Heading whose parent is only looked up (and its page decoded) when
+    first needed.'''
+    def __init__(self, page, left, top, string, parent_ref):
+        super(LazyHeading, self).__init__(page, left, top, string, None)
+        self._parent_ref = parent_ref
+
+    @property
+    def parent(self):
+        if self._parent is None and self._parent_ref is not None:
+            number, i = self._parent_ref
+            self._parent = self.page.document.pages[number].contents[i]
+        return self._parent
+
+    @parent.setter
+    def parent(self, value):
+        self._parent = value
+        self._parent_ref = None
+
+
+class LazyPageStore(PageStore):
+    '''A PageStore whose pages are decoded from a BinaryReader on first
+    access.'''
+    def __init__(self, reader):
+        super(LazyPageStore, self).__init__()
+        self.reader = reader
+        self.offsets = dict()
+        for number, offset in reader.table():
+            self.offsets[number] = offset
+            PageStore.__setitem__(self, number, None)
+
+    def __getitem__(self, number):
+        page = self._pages[number]
+        if page is None:
+            page = self.reader.read_page(self.offsets[number])
+            self._pages[number] = page
+        return page
+
+    @property
+    def loaded(self):
+        '''The numbers of the pages which have been decoded.'''
+        return [n for n in self._numbers if self._pages[n] is not None]
+
+
+class BinaryReader(object):
+    def __init__(self, buffer, document):
+        self.buffer = buffer
+        self.document = document
+        self.strings = dict()
+
+        magic, version, flags = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise FormatError('not a refined output file')
+        if version != VERSION:
+            raise FormatError('unsupported version {}'.format(version))
+        self.codec = _codec(flags)
+        self.quality = 'fast' if flags & FAST else 'full'
+        strings_offset, self.table_offset, magic = FOOTER.unpack_from(
+            buffer, len(buffer) - FOOTER.size
+        )
+        if magic != MAGIC:
+            raise FormatError('truncated refined output file')
+        self.string_count = U32.unpack_from(buffer, strings_offset)[0]
+        self.string_offsets_offset = strings_offset + U32.size
+        self.blob_offset = (
+            self.string_offsets_offset + (self.string_count + 1) * U32.size
+        )
+
+    def table(self):
+        count = U32.unpack_from(self.buffer, self.table_offset)[0]
+        offset = self.table_offset + U32.size
+        for _ in range(count):
+            yield TABLE_ENTRY.unpack_from(self.buffer, offset)
+            offset += TABLE_ENTRY.size
+
+    def string(self, i):
+        # Decoded strings are cached so that repeated strings are shared
+        try:
+            return self.strings[i]
+        except KeyError:
+            pass
+        if i >= self.string_count:
+            raise FormatError('invalid string id {}'.format(i))
+        start, end = struct.unpack_from(
+            '<II', self.buffer, self.string_offsets_offset + i * U32.size
+        )
+        s = bytes(
+            self.buffer[self.blob_offset + start:self.blob_offset + end]
+        ).decode('utf-8')
+        self.strings[i] = s
+        return s
+
+    def read_page(self, offset):
+        codec = self.codec
+        decode = codec.decode
+        (
+            number, width, height, scale, flags,
+            roi_left, roi_top, roi_right, roi_bottom, count
+        ) = codec.page.unpack_from(self.buffer, offset)
+        offset += codec.page.size
+
+        if flags & FLAG_ROI:
+            roi = Box(
+                decode(roi_left), decode(roi_top),
+                right=decode(roi_right), bottom=decode(roi_bottom)
+            )
+        else:
+            roi = None
+        page = OutputPage(
+            self.document, number, decode(width), decode(height),
+            scale=decode(scale, SCALE_SCALE), roi=roi,
+            ignored=bool(flags & FLAG_IGNORED)
+        )
+
+        for _ in range(count):
+            kind, left, top, string, parent_page, parent_index = (
+                codec.content.unpack_from(self.buffer, offset)
+            )
+            offset += codec.content.size
+            left = decode(left)
+            top = decode(top)
+            string = self.string(string)
+            if kind == KIND_HEADING:
+                if parent_page == number:
+                    # Parent is on this page and has already been decoded
+                    content = Heading(
+                        page, left, top, string, page.contents[parent_index]
+                    )
+                elif parent_index >= 0:
+                    content = LazyHeading(
+                        page, left, top, string, (parent_page, parent_index)
+                    )
+                else:
+                    content = Heading(page, left, top, string, None)
+            elif kind == KIND_PARAGRAPH:
+                content = Paragraph(page, left, top, string)
+            else:
+                content = Content(page, left, top, string)
+            page.contents.append(content)
+
+        return page
+
+
+class BinaryDocument(OutputDocument):
+    '''An OutputDocument backed by a memory-mapped binary file. Pages are
+    decoded on first access.'''
+    def __init__(self, path):
+        super(BinaryDocument, self).__init__()
+        self._file = open(path, 'rb')
+        try:
+            self._mmap = mmap.mmap(
+                self._file.fileno(), 0, access=mmap.ACCESS_READ
+            )
+            reader = BinaryReader(self._mmap, self)
+            self.quality = reader.quality
+            self.pages = LazyPageStore(reader)
+        except Exception:
+            self.close()
+            raise
+
+    def close(self):
+        if getattr(self, '_mmap', None) is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read(path):
+    '''Open the binary output file at path, returning a BinaryDocument.'''
+    return BinaryDocument(path)
+
+
+def loads_page(data, document):
+    '''Decode a page encoded by dumps_page() as a page of document.'''
+    reader = BinaryReader(data, document)
+    for _, offset in reader.table():
+        return reader.read_page(offset)
+
+
+def loads(data):
+    '''Decode a whole binary output document from bytes.'''
+    document = OutputDocument()
+    reader = BinaryReader(data, document)
+    document.quality = reader.quality
+    for number, offset in reader.table():
+        document.pages[number] = reader.read_page(offset)
+    return document
@@ -0,0 +1,42 @@
+from html import escape
+
+from refiner.output.model import Heading
+
+
+# HTML only has six heading elements, deeper headings are all h6
+MAX_LEVEL = 6
+
+
+def write_page(page, f):
+    '''Write the contents of page to the file-like object f as a section of
+    HTML.'''
+    f.write('<section class="page" id="page-{0}" data-number="{0}">\n'.format(
+        page.number
+    ))
+    for c in page.contents:
+        if isinstance(c, Heading):
+            tag = 'h{}'.format(min(c.level, MAX_LEVEL))
+        else:
+            tag = 'p'
+        f.write('<{0}>{1}</{0}>\n'.format(tag, escape(c.string)))
+    f.write('</section>\n')
+
+
+def write_header(f, title = '', quality = 'full'):
+    '''Write the start of the document, with the quality it was refined with
+    as the data-quality attribute of the body.'''
+    f.write('<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n')
+    f.write('<title>{}</title>\n</head>\n<body data-quality="{}">\n'.format(
+        escape(title), escape(quality)
+    ))
+
+
+def write_footer(f):
+    f.write('</body>\n</html>\n')
+
+
+def write(document, f, title = ''):
+    write_header(f, title, document.quality)
+    for page in document.page_list:
+        write_page(page, f)
+    write_footer(f)
@@ -0,0 +1,53 @@
+import json
+
+from refiner.output.model import Heading
+
+
+def document_record(document):
+    return {
+        'type': 'document',
+        'quality': document.quality,
+    }
+
+
+def page_record(page):
+    return {
+        'type': 'page',
+        'number': page.number,
+        'width': page.width,
+        'height': page.height,
+        'scale': page.scale,
+        'ignored': page.ignored,
+    }
+
+
+def content_record(content):
+    record = {
+        'type': 'paragraph',
+        'page': content.page.number,
+        'left': content.left,
+        'top': content.top,
+        'string': content.string,
+    }
+    if isinstance(content, Heading):
+        record['type'] = 'heading'
+        record['level'] = content.level
+    return record
+
+
+def write_page(page, f):
+    '''Write a page record followed by one record per content to the file-like
+    object f, one JSON object per line.'''
+    f.write(json.dumps(page_record(page)))
+    f.write('\n')
+    for c in page.contents:
+        f.write(json.dumps(content_record(c)))
+        f.write('\n')
+
+
+def write(document, f):
+    '''Write a document record and then the records of each page.'''
+    f.write(json.dumps(document_record(document)))
+    f.write('\n')
+    for page in document.page_list:
+        write_page(page, f)
@@ -0,0 +1,47 @@
+import re
+
+from refiner.output.model import Heading
+
+
+# Markdown only has six levels of heading, deeper headings are written as h6
+MAX_LEVEL = 6
+
+# Characters which start emphasis, code, links, raw HTML or entities anywhere
+# in a line
+_INLINE = re.compile(r'([\\`*_\[\]<>&])')
+
+# Markers which would make a line a heading, list item, quote, rule or table
+# row rather than plain text (* and > are already escaped as inline
+# characters)
+_BLOCK_MARKER = re.compile(r'^([#+\-=|]|\d+(?=[.)]))')
+
+
+def escape(string):
+    '''Return string with its inline markup characters and any block marker at
+    its start backslash-escaped, so that it's written as plain text.'''
+    string = _INLINE.sub(r'\\\1', string)
+    match = _BLOCK_MARKER.match(string)
+    if match is None:
+        return string
+    if match.group(1)[0].isdigit():
+        # e.g. "1." becomes "1\."
+        return '{}\\{}'.format(match.group(1), string[match.end():])
+    return '\\' + string
+
+
+def write_page(page, f):
+    '''Write the contents of page to the file-like object f as Markdown, with
+    headings prefixed by one # per heading level (up to MAX_LEVEL).'''
+    f.write('<!-- page {} -->\n\n'.format(page.number))
+    for c in page.contents:
+        if isinstance(c, Heading):
+            f.write('#' * min(c.level, MAX_LEVEL))
+            f.write(' ')
+        f.write(escape(c.string))
+        f.write('\n\n')
+
+
+def write(document, f):
+    f.write('<!-- quality {} -->\n\n'.format(document.quality))
+    for page in document.page_list:
+        write_page(page, f)
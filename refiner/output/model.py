@@ -1,13 +1,212 @@
+import bisect
+import math
+import re
+
 from refiner.geometry import Box
 
 
-class OutputDocument(object):
+class PageStore(object):
+    '''A mapping of page numbers to OutputPage instances which keeps the page
+    numbers in ascending order, so ordered iteration and page range lookups
+    don't need to re-sort.
+
+    '''
     def __init__(self):
-        self.pages = dict()
+        self._pages = dict()
+        self._numbers = list()
+
+    def __len__(self):
+        return len(self._pages)
+
+    def __contains__(self, number):
+        return number in self._pages
+
+    def __iter__(self):
+        return iter(self._numbers)
+
+    def __getitem__(self, number):
+        return self._pages[number]
+
+    def __setitem__(self, number, page):
+        if number not in self._pages:
+            if len(self._numbers) == 0 or number > self._numbers[-1]:
+                # Pages are almost always added in order
+                self._numbers.append(number)
+            else:
+                bisect.insort(self._numbers, number)
+        self._pages[number] = page
+
+    def __delitem__(self, number):
+        del self._pages[number]
+        del self._numbers[bisect.bisect_left(self._numbers, number)]
+
+    def finish(self, number):
+        '''Called once the contents of the page numbered number are complete.
+        Stores which hold pages elsewhere than in memory may write it out.'''
+        pass
+
+    def get(self, number, default = None):
+        if number in self._pages:
+            return self[number]
+        return default
+
+    def keys(self):
+        return list(self._numbers)
+
+    def values(self):
+        return [self[n] for n in self._numbers]
+
+    def items(self):
+        return [(n, self[n]) for n in self._numbers]
+
+    def range_numbers(self, first = None, last = None):
+        '''Return the page numbers from first to last (inclusive) in order.
+
+        Either bound may be None, in which case the range is unbounded at that
+        end.
+
+        '''
+        if first is None:
+            i = 0
+        else:
+            i = bisect.bisect_left(self._numbers, first)
+        if last is None:
+            j = len(self._numbers)
+        else:
+            j = bisect.bisect_right(self._numbers, last)
+        return self._numbers[i:j]
+
+    def range(self, first = None, last = None):
+        '''Return the pages numbered from first to last (inclusive) in order.
+        See range_numbers().'''
+        return [self[n] for n in self.range_numbers(first, last)]
+
+
+class OutputDocument(object):
+    def __init__(self, strings = None):
+        self.pages = PageStore()
+        # The refiner.strings.StringTable content strings are interned with,
+        # if any
+        self.strings = strings
+        # The quality level refine() made the document with
+        self.quality = 'full'
 
     @property
     def page_list(self):
-        return [self.pages[n] for n in sorted(self.pages.keys())]
+        return self.pages.values()
+
+    def between(self, y0, y1, first = None, last = None, kind = None):
+        '''Return the contents with a top coord between y0 and y1 (inclusive) on
+        the pages numbered first to last (inclusive), in page and then
+        top-to-bottom order.
+
+        If kind is given only instances of that Content subclass are returned.
+
+        '''
+        found = list()
+        for page in self.pages.range(first, last):
+            found += page.between(y0, y1, kind)
+        return found
+
+    def nearest(self, number, x, y, kind = None):
+        '''Return the content on the given page which is nearest to (x, y).'''
+        return self.pages[number].nearest(x, y, kind)
+
+
+class ContentIndex(object):
+    '''A positional index over the contents of a single OutputPage.
+
+    Contents are kept sorted by (top, left) so that vertical range queries are
+    answered by bisection and nearest neighbour queries only need to look at
+    contents which are vertically close to the query point.
+
+    '''
+    def __init__(self, contents):
+        self.entries = sorted(
+            ((c.top, c.left, i, c) for i, c in enumerate(contents)),
+            key=lambda e: (e[0], e[1], e[2])
+        )
+        self.tops = [e[0] for e in self.entries]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def between(self, y0, y1, kind = None):
+        i = bisect.bisect_left(self.tops, y0)
+        j = bisect.bisect_right(self.tops, y1)
+        return [
+            e[3] for e in self.entries[i:j]
+            if kind is None or isinstance(e[3], kind)
+        ]
+
+    def within(self, box, kind = None):
+        '''Return the contents whose (left, top) position lies within box.'''
+        return [
+            c for c in self.between(box.top, box.bottom, kind)
+            if box.left <= c.left <= box.right
+        ]
+
+    def nearest(self, x, y, kind = None):
+        '''Return the content whose (left, top) position is nearest to (x, y),
+        or None if there are no (matching) contents.
+
+        Searches outwards from the bisection point of y in both directions and
+        stops in each direction once the vertical distance alone is greater
+        than the best distance found so far.
+
+        '''
+        best = None
+        best_dist = math.inf
+        j = bisect.bisect_left(self.tops, y)
+        i = j - 1
+        n = len(self.entries)
+
+        while i >= 0 or j < n:
+            if i >= 0:
+                top, left, _, c = self.entries[i]
+                if y - top > best_dist:
+                    i = -1
+                else:
+                    if kind is None or isinstance(c, kind):
+                        d = math.hypot(left - x, top - y)
+                        if d < best_dist:
+                            best, best_dist = c, d
+                    i -= 1
+            if j < n:
+                top, left, _, c = self.entries[j]
+                if top - y > best_dist:
+                    j = n
+                else:
+                    if kind is None or isinstance(c, kind):
+                        d = math.hypot(left - x, top - y)
+                        if d < best_dist:
+                            best, best_dist = c, d
+                    j += 1
+
+        return best
+
+
+class ContentList(list):
+    '''The list of contents of an OutputPage, which counts changes to itself
+    in version so that the page's index can tell when it's out of date.'''
+    # A class attribute, since unpickling extends the list before restoring
+    # the instance's attributes
+    version = 0
+
+
+def _versioned(method):
+    def mutate(self, *args, **kwargs):
+        self.version += 1
+        return method(self, *args, **kwargs)
+    mutate.__name__ = method.__name__
+    return mutate
+
+
+for _name in (
+        '__setitem__', '__delitem__', '__iadd__', '__imul__', 'append',
+        'extend', 'insert', 'pop', 'remove', 'clear', 'sort', 'reverse'
+):
+    setattr(ContentList, _name, _versioned(getattr(list, _name)))
 
 
 class OutputPage(object):
@@ -22,18 +221,121 @@ class OutputPage(object):
         self.scale = scale
         self.roi = roi
         self.ignored = ignored
-        self.contents = list()
+        self.contents = ContentList()
+        self._index = None
+        self._index_version = None
 
     def __str__(self):
         return '<OutputPage {}>'.format(self.number)
 
+    @property
+    def contents(self):
+        return self._contents
+
+    @contents.setter
+    def contents(self, contents):
+        self._contents = ContentList(contents)
+        self._index = None
+
+    def changed(self):
+        '''Called when a content of the page has been moved.'''
+        self._index = None
+
+    @property
+    def index(self):
+        '''The ContentIndex for this page's contents.
+
+        The index is built on first use and rebuilt if the contents have
+        changed since, whether by changing the list (see ContentList) or moving
+        a content.
+
+        '''
+        if (
+                self._index is None or
+                self._index_version != self._contents.version
+        ):
+            self._index = ContentIndex(self._contents)
+            self._index_version = self._contents.version
+        return self._index
+
+    def between(self, y0, y1, kind = None):
+        return self.index.between(y0, y1, kind)
+
+    def within(self, box, kind = None):
+        return self.index.within(box, kind)
+
+    def nearest(self, x, y, kind = None):
+        return self.index.nearest(x, y, kind)
+
+
+def join_strings(strings):
+    '''Return the strings stripped, joined by spaces and with runs of spaces and
+    tabs collapsed, which is how the string of a content is made from the
+    strings of its texts.'''
+    string = ' '.join([s.strip() for s in strings])
+    # Only runs of more than one space or tab are changed by the re.sub,
+    # and skipping it avoids a copy of most strings
+    if '  ' in string or '\t' in string:
+        string = re.sub(r'[ \t]+', ' ', string)
+    return string
+
 
 class Content(object):
-    def __init__(self, page, left, top, string):
+    '''A paragraph or heading of an OutputPage.
+
+    Either string or texts, the input Texts the content was made from, must be
+    given. In the latter case the string is only made from the texts (see
+    join_strings()) when it's first needed, and the texts are then released.
+
+    '''
+    def __init__(self, page, left, top, string = None, texts = None):
         self.page = page
-        self.left = left
-        self.top = top
-        self.string = string
+        self._left = left
+        self._top = top
+        self._string = string
+        self.texts = texts if string is None else None
+
+    @property
+    def left(self):
+        return self._left
+
+    @left.setter
+    def left(self, value):
+        self._left = value
+        self.page.changed()
+
+    @property
+    def top(self):
+        return self._top
+
+    @top.setter
+    def top(self, value):
+        self._top = value
+        self.page.changed()
+
+    @property
+    def string(self):
+        if self._string is None and self.texts is not None:
+            string = join_strings([t.string for t in self.texts])
+            strings = self.page.document.strings
+            if strings is not None:
+                string = strings.intern(string)
+            self._string = string
+            self.texts = None
+        return self._string
+
+    @string.setter
+    def string(self, value):
+        self._string = value
+        self.texts = None
+
+    def __getstate__(self):
+        # Don't pickle the input texts (and so the whole input document) along
+        # with the content
+        state = self.__dict__.copy()
+        state['_string'] = self.string
+        state['texts'] = None
+        return state
 
     def __str__(self):
         return '({}, {}, {}): {}'.format(
@@ -49,8 +351,8 @@ class Paragraph(Content):
 
 
 class Heading(Content):
-    def __init__(self, page, left, top, string, parent):
-        super(Heading, self).__init__(page, left, top, string)
+    def __init__(self, page, left, top, string, parent, texts = None):
+        super(Heading, self).__init__(page, left, top, string, texts)
         self.parent = parent
 
     def __str__(self):
@@ -0,0 +1,132 @@
+import collections
+import tempfile
+import weakref
+
+from refiner.output import binary
+from refiner.output.model import PageStore, Heading
+
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Rough in-memory size of a Content instance, excluding its string
+CONTENT_OVERHEAD = 200
+
+
+def page_size(page):
+    '''Estimate how many bytes of memory the contents of page take up.'''
+    return sum(len(c.string) + CONTENT_OVERHEAD for c in page.contents)
+
+
+class PageView(object):
+    '''A sequence of the pages of a SpillStore, each only loaded when it's
+    accessed.'''
+    def __init__(self, store, numbers):
+        self.store = store
+        self.numbers = numbers
+
+    def __len__(self):
+        return len(self.numbers)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return PageView(self.store, self.numbers[i])
+        return self.store[self.numbers[i]]
+
+    def __iter__(self):
+        for n in self.numbers:
+            yield self.store[n]
+
+
+def _page_store(pages):
+    store = PageStore()
+    for page in pages:
+        store[page.number] = page
+    return store
+
+
+class SpillStore(PageStore):
+    '''A PageStore which writes each page to a temporary file once it is
+    finished, and keeps at most around max_bytes worth of finished pages in
+    memory, evicting the least recently used. Evicted pages are read back in
+    when they are next accessed.
+
+    Pages should not be modified once they are finished, changes to a page
+    which is later evicted are lost.
+
+    The temporary file can't be pickled, so a pickled SpillStore is loaded as a
+    plain PageStore with all the pages in memory, e.g. when a document is
+    returned from a worker process by refine_many().
+
+    '''
+    def __init__(self, document, max_bytes = DEFAULT_MAX_BYTES, dir = None):
+        super(SpillStore, self).__init__()
+        self.document = document
+        self.max_bytes = max_bytes
+        self.file = tempfile.TemporaryFile(dir=dir)
+        self.end = 0
+        # page number -> (offset, length) of its record in file
+        self.spilled = dict()
+        # page number -> estimated size of the finished pages in memory, least
+        # recently used first
+        self.resident = collections.OrderedDict()
+        self.resident_bytes = 0
+        self.heading_refs = weakref.WeakKeyDictionary()
+
+    def finish(self, number):
+        page = self._pages[number]
+        data = binary.dumps_page(page, self.heading_refs)
+        self.file.seek(self.end)
+        self.file.write(data)
+        self.spilled[number] = (self.end, len(data))
+        self.end += len(data)
+        self._resident(number, page)
+
+    def _resident(self, number, page):
+        size = page_size(page)
+        self.resident[number] = size
+        self.resident_bytes += size
+        while self.resident_bytes > self.max_bytes and len(self.resident) > 1:
+            n, s = self.resident.popitem(last=False)
+            self._pages[n] = None
+            self.resident_bytes -= s
+
+    def __getitem__(self, number):
+        page = self._pages[number]
+        if page is None:
+            offset, length = self.spilled[number]
+            self.file.seek(offset)
+            page = binary.loads_page(self.file.read(length), self.document)
+            for i, c in enumerate(page.contents):
+                if isinstance(c, Heading):
+                    self.heading_refs[c] = (number, i)
+            self._pages[number] = page
+            self._resident(number, page)
+        elif number in self.resident:
+            self.resident.move_to_end(number)
+        return page
+
+    def __setitem__(self, number, page):
+        if number in self.spilled:
+            raise ValueError('page {} is already finished'.format(number))
+        super(SpillStore, self).__setitem__(number, page)
+
+    def __delitem__(self, number):
+        super(SpillStore, self).__delitem__(number)
+        self.spilled.pop(number, None)
+        if number in self.resident:
+            self.resident_bytes -= self.resident.pop(number)
+
+    def __reduce__(self):
+        return (_page_store, (list(self.values()),))
+
+    def values(self):
+        return PageView(self, list(self._numbers))
+
+    def items(self):
+        return ((n, self[n]) for n in list(self._numbers))
+
+    def range(self, first = None, last = None):
+        return PageView(self, self.range_numbers(first, last))
+
+    def close(self):
+        self.file.close()
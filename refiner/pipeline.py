@@ -0,0 +1,105 @@
+'''A pipelined driver which runs pdftohtml on the next few documents while the
+current one is being parsed and refined, so that neither waits for the other.
+'''
+import collections
+import concurrent.futures
+import functools
+
+from refiner.batch import BatchResult
+from refiner.cancel import NEVER, CancelToken
+from refiner.core import refine
+from refiner.input.pdftohtml import PDFTOHTML, extract, parse
+
+
+DEFAULT_DEPTH = 2
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def pipeline(
+        paths,
+        depth = DEFAULT_DEPTH,
+        max_bytes = DEFAULT_MAX_BYTES,
+        command = PDFTOHTML,
+        extractor = None,
+        strings = None,
+        **params
+):
+    '''Extract and refine each of paths in turn, yielding a BatchResult for
+    each in the same order.
+
+    Up to depth extractions are run in background threads ahead of the
+    document being refined. No more are started while the prefetched XML not
+    yet refined adds up to max_bytes or more, although the next document is
+    always extracted while the current one is refined.
+
+    extractor: a function taking a path and returning the XML as a string,
+        defaults to refiner.input.pdftohtml.extract() running command
+    strings: a refiner.strings.StringTable to parse the documents with
+
+    Any other keyword arguments are passed on to refine(). An exception raised
+    while extracting or refining one document is returned as the error of its
+    BatchResult.
+
+    The timeout and cancel arguments of refine() cover extracting each
+    document as well as refining it, from when its extraction starts. If
+    either is given extractor is also passed the CancelToken as cancel.
+
+    '''
+    if extractor is None:
+        extractor = functools.partial(extract, command=command)
+    depth = max(depth, 1)
+    paths = iter(paths)
+    cancel = params.pop('cancel', None)
+    timeout = params.pop('timeout', None)
+    # (path, future, CancelToken) of the extractions started, in order
+    pending = collections.deque()
+    executor = concurrent.futures.ThreadPoolExecutor(depth)
+
+    def prefetched():
+        return sum(
+            len(f.result()) for _, f, _ in pending
+            if f.done() and f.exception() is None
+        )
+
+    def fill():
+        while len(pending) == 0 or (
+                len(pending) < depth and prefetched() < max_bytes
+        ):
+            for path in paths:
+                token = CancelToken.within(cancel, timeout)
+                if token is NEVER:
+                    future = executor.submit(extractor, path)
+                else:
+                    future = executor.submit(extractor, path, cancel=token)
+                pending.append((path, future, token))
+                break
+            else:
+                return
+
+    try:
+        fill()
+        while len(pending) > 0:
+            path, future, token = pending.popleft()
+            try:
+                xml = future.result()
+            except Exception as e:
+                fill()
+                yield BatchResult(path, None, e)
+                continue
+            # Start extracting the next documents before refining this one
+            fill()
+            try:
+                document = refine(
+                    parse(xml, strings=strings), cancel=token, **params
+                )
+            except Exception as e:
+                yield BatchResult(path, None, e)
+                continue
+            finally:
+                del xml
+            yield BatchResult(path, document, None)
+    finally:
+        # Only reached with extractions pending if the consumer stopped early
+        for _, future, _ in pending:
+            future.cancel()
+        executor.shutdown()
@@ -0,0 +1,259 @@
+'''Layout profiles, which record the layout learned from the documents of a
+source (e.g. a publisher) so that later documents from the same source can skip
+detecting it again.
+
+A profile holds the ROI containing the body texts (as fractions of the page
+size, so it excludes running headers and footers), the column edges found on
+each size of page and the font sizes used. Pass one to refine() as profile,
+see LayoutProfile.confidence() for when it's used. Headings are still
+classified from the document itself.
+
+'''
+import collections
+import json
+import os
+
+from refiner.columns import columns, DEFAULT_SMALLEST_COL, DEFAULT_MIN_COL_VOTES
+
+
+# The minimum confidence for refine() to use a profile
+DEFAULT_MIN_CONFIDENCE = 0.9
+# Added around the ROI of the texts of learned documents, as a fraction of the
+# page size
+ROI_MARGIN = 0.01
+# The number of texts on a page which must start at the same x coord for them
+# to be counted as body texts when learning the ROI
+MIN_ALIGNED = 3
+# How far the start of a line may be from a column edge and still be counted
+# as in that column when matching, as a fraction of the page width
+SNAP_TOLERANCE = 0.01
+# The number of pages of each size scored by LayoutProfile.confidence()
+SAMPLE_PAGES = 3
+
+
+def page_size(page):
+    '''Return the key of the size of page in LayoutProfile.columns.'''
+    return '{}x{}'.format(page.width, page.height)
+
+
+def line_starts(texts):
+    '''Return the texts which start a line, i.e. those with no other text on
+    the same line ending less than their height to their left.'''
+    rows = collections.defaultdict(list)
+    for t in texts:
+        rows[t.page, t.top].append(t)
+    starts = list()
+    for row in rows.values():
+        row.sort(key=lambda t: t.left)
+        right = None
+        for t in row:
+            if right is None or t.left >= right + t.height:
+                starts.append(t)
+            right = t.right if right is None else max(right, t.right)
+    return starts
+
+
+class LayoutProfile(object):
+    def __init__(self, min_confidence = DEFAULT_MIN_CONFIDENCE):
+        self.min_confidence = min_confidence
+        # The number of documents learned from
+        self.documents = 0
+        # (left, top, right, bottom) fractions of the page size, or None
+        self.roi = None
+        # Maps page_size() to a Counter of the column edges (as tuples) found on
+        # pages of that size
+        self.columns = dict()
+        self.font_sizes = set()
+
+    def columns_for(self, page):
+        '''Return the column edges most often found on pages the size of page,
+        or None if there haven't been any.'''
+        counts = self.columns.get(page_size(page))
+        if not counts:
+            return None
+        return list(counts.most_common(1)[0][0])
+
+    def in_roi(self, page, t):
+        if self.roi is None:
+            return True
+        left, top, right, bottom = self.roi
+        return (
+            t.left >= page.width * left and
+            t.top >= page.height * top and
+            t.right <= page.width * right and
+            t.bottom <= page.height * bottom
+        )
+
+    def confidence(self, pages):
+        '''Return how well pages match the profile, from 0.0 to 1.0.
+
+        Only the first SAMPLE_PAGES pages of each size are scored, which is
+        enough to tell one layout from another and keeps this much cheaper than
+        detecting the layout. The score is the lowest of the fractions of:
+        - the texts which are on a page of a known size in a known font size,
+        - the texts which are within the ROI, and
+        - the starts of lines within the ROI (see line_starts()) which are
+          within SNAP_TOLERANCE of one of the profile's column edges, and
+        - the column edges of each page which at least MIN_ALIGNED line starts
+          are within SNAP_TOLERANCE of,
+        so a document with the same fonts and page size as the profile but a
+        different layout (e.g. another number of columns) doesn't match.
+
+        '''
+        total = known = inside = starts = snapped = 0
+        all_edges = used_edges = 0
+        sampled = collections.Counter()
+        for page in pages:
+            size = page_size(page)
+            if sampled[size] >= SAMPLE_PAGES:
+                continue
+            sampled[size] += 1
+            edges = self.columns_for(page)
+            if edges is None:
+                # A page size the profile hasn't seen, so none of its texts
+                # are known
+                total += len(page.texts)
+                continue
+            tolerance = page.width * SNAP_TOLERANCE
+            votes = collections.Counter()
+            texts = list()
+            for t in page.texts:
+                total += 1
+                if t.font is not None and t.font.size in self.font_sizes:
+                    known += 1
+                if self.in_roi(page, t):
+                    inside += 1
+                    texts.append(t)
+            for t in line_starts(texts):
+                starts += 1
+                for e in edges:
+                    if abs(t.left - e) <= tolerance:
+                        snapped += 1
+                        votes[e] += 1
+                        break
+            all_edges += len(edges)
+            used_edges += sum(1 for e in edges if votes[e] >= MIN_ALIGNED)
+        if total == 0:
+            return 0.0
+        return min(
+            known / total, inside / total,
+            snapped / starts if starts else 1.0,
+            used_edges / all_edges if all_edges else 1.0
+        )
+
+    def matches(self, pages):
+        return self.confidence(pages) >= self.min_confidence
+
+    def learn(
+            self,
+            selected,
+            smallest_col = DEFAULT_SMALLEST_COL,
+            min_col_votes = DEFAULT_MIN_COL_VOTES
+    ):
+        '''Update the profile from a refined document.
+
+        selected is a list of (InputPage, texts) of the texts which were
+        refined (i.e. without running headers and footers).
+
+        The ROI is learned from the texts which start at the same x coord as at
+        least MIN_ALIGNED texts of their page, like the lines of a column,
+        which leaves out stray marks in the margins. Columns are then found
+        again from the texts within the ROI.
+
+        '''
+        self.documents += 1
+        roi = self.roi
+        for page, texts in selected:
+            aligned = collections.Counter(t.left for t in texts)
+            for t in texts:
+                if t.font is not None:
+                    self.font_sizes.add(t.font.size)
+                if aligned[t.left] < MIN_ALIGNED:
+                    continue
+                box = (
+                    t.left / page.width - ROI_MARGIN,
+                    t.top / page.height - ROI_MARGIN,
+                    t.right / page.width + ROI_MARGIN,
+                    t.bottom / page.height + ROI_MARGIN,
+                )
+                if roi is None:
+                    roi = box
+                else:
+                    roi = (
+                        min(roi[0], box[0]), min(roi[1], box[1]),
+                        max(roi[2], box[2]), max(roi[3], box[3]),
+                    )
+        if roi is not None:
+            self.roi = (
+                max(roi[0], 0.0), max(roi[1], 0.0),
+                min(roi[2], 1.0), min(roi[3], 1.0),
+            )
+
+        for page, texts in selected:
+            texts = [t for t in texts if self.in_roi(page, t)]
+            counts = self.columns.setdefault(
+                page_size(page), collections.Counter()
+            )
+            counts[tuple(columns(texts, smallest_col, min_col_votes))] += 1
+
+    def to_dict(self):
+        return {
+            'min_confidence': self.min_confidence,
+            'documents': self.documents,
+            'roi': None if self.roi is None else list(self.roi),
+            'columns': {
+                size: [[list(edges), n] for edges, n in counts.items()]
+                for size, counts in self.columns.items()
+            },
+            'font_sizes': sorted(self.font_sizes),
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        profile = cls(d.get('min_confidence', DEFAULT_MIN_CONFIDENCE))
+        profile.documents = d['documents']
+        if d['roi'] is not None:
+            profile.roi = tuple(d['roi'])
+        for size, counts in d['columns'].items():
+            profile.columns[size] = collections.Counter(
+                {tuple(edges): n for edges, n in counts}
+            )
+        profile.font_sizes = set(d['font_sizes'])
+        return profile
+
+
+class ProfileStore(object):
+    '''The layout profiles of a number of sources, kept in a JSON file.'''
+    def __init__(self, path):
+        self.path = path
+        self.profiles = dict()
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                for source, d in json.load(f).items():
+                    self.profiles[source] = LayoutProfile.from_dict(d)
+
+    def __contains__(self, source):
+        return source in self.profiles
+
+    def __len__(self):
+        return len(self.profiles)
+
+    def get(self, source):
+        '''Return the profile of source, adding a new (empty) one if there
+        isn't one yet.'''
+        try:
+            return self.profiles[source]
+        except KeyError:
+            profile = LayoutProfile()
+            self.profiles[source] = profile
+            return profile
+
+    def save(self):
+        '''Write the profiles to the file, replacing it atomically.'''
+        tmp = '{}.{}.tmp'.format(self.path, os.getpid())
+        with open(tmp, 'w') as f:
+            json.dump(
+                {s: p.to_dict() for s, p in self.profiles.items()}, f,
+                indent=1, sort_keys=True
+            )
+        os.replace(tmp, self.path)
@@ -0,0 +1,74 @@
+'''Detection of running headers, footers and page numbers.
+
+A text is running if a text with the same normalized string (digits replaced,
+so that page numbers match each other) appears at about the same height in the
+top or bottom band of many pages. Texts are hashed by (string, height bin) so
+detection takes a single pass over the texts.
+
+'''
+import collections
+import math
+import re
+
+
+# Fraction of the page height at the top and bottom in which running texts are
+# looked for
+DEFAULT_BAND = 0.1
+# Running texts must appear on at least this many pages...
+DEFAULT_MIN_PAGES = 3
+# ...and at least this fraction of the pages
+DEFAULT_MIN_FRACTION = 0.5
+# Height bins as a fraction of the page height
+BIN = 0.01
+
+
+def normalize(string):
+    '''Return string with runs of digits replaced by # and whitespace
+    collapsed, so page numbers and dates compare equal.'''
+    string = re.sub(r'\d+', '#', string.strip().lower())
+    return re.sub(r'\s+', ' ', string)
+
+
+def _key(text, page, band):
+    '''Return the (string, bin) key of text, or None if it isn't in either of
+    the bands of page.'''
+    if text.top > page.height * band and (
+            text.bottom < page.height * (1 - band)
+    ):
+        return None
+    string = normalize(text.string)
+    if string == '':
+        return None
+    return (string, int(text.top / page.height / BIN))
+
+
+def find_running(
+        pages,
+        band = DEFAULT_BAND,
+        min_pages = DEFAULT_MIN_PAGES,
+        min_fraction = DEFAULT_MIN_FRACTION
+):
+    '''Return the set of the running texts on pages (InputPages).'''
+    seen = collections.defaultdict(set)
+    candidates = list()
+    for page in pages:
+        for t in page.texts:
+            key = _key(t, page, band)
+            if key is not None:
+                seen[key].add(page.number)
+                candidates.append((t, key))
+
+    threshold = max(min_pages, math.ceil(min_fraction * len(pages)))
+    running = set()
+    # Counts for the keys of running texts, which allow for a text drifting
+    # into a neighbouring bin on some pages
+    counts = dict()
+    for t, (string, b) in candidates:
+        if (string, b) not in counts:
+            numbers = set()
+            for near in (b - 1, b, b + 1):
+                numbers |= seen.get((string, near), set())
+            counts[(string, b)] = len(numbers)
+        if counts[(string, b)] >= threshold:
+            running.add(t)
+    return running
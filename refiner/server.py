@@ -0,0 +1,334 @@
+'''A long-lived refinement server with a warm pool of worker processes.
+
+Run with python -m refiner.server, see --help. The server speaks HTTP on a
+localhost port or a Unix socket:
+
+    POST /refine    The body is either pdftohtml -xml output (any content type
+                    other than application/json) or a JSON object
+                    {"path": "/path/to/document.pdf"}. refine() parameters are
+                    given in the query string, e.g. ?roi=0,0.08,0.952,0.94.
+                    The refined document is streamed back in the format named
+                    by the format query parameter: jsonl (the default),
+                    markdown or html. Pass quality=fast to shed load, the
+                    X-Refiner-Quality response header gives the quality used.
+    GET /stats      Queue depth and throughput as a JSON object.
+
+'''
+import argparse
+import concurrent.futures
+import http.server
+import io
+import json
+import os
+import socketserver
+import stat
+import sys
+import threading
+import time
+import urllib.parse
+
+from refiner.batch import refine_path
+from refiner.core import refine, QUALITIES
+from refiner.input.pdftohtml import parse
+from refiner.output import jsonl, markdown, html
+
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+FORMATS = {
+    'jsonl': (jsonl, 'application/x-ndjson'),
+    'markdown': (markdown, 'text/markdown; charset=utf-8'),
+    'html': (html, 'text/html; charset=utf-8'),
+}
+
+def _quality(value):
+    if value not in QUALITIES:
+        raise ValueError('unknown quality {!r}'.format(value))
+    return value
+
+
+def _roi(value):
+    roi = tuple(float(x) for x in value.split(','))
+    if len(roi) != 4:
+        raise ValueError('roi must be four numbers')
+    return roi
+
+
+PARAMS = {
+    'first': int,
+    'last': int,
+    'width': int,
+    'max_line_sep': float,
+    'smallest_col': float,
+    'min_col_votes': int,
+    'min_h_sep': float,
+    'roi': _roi,
+    'ignore': lambda v: [int(x) for x in v.split(',') if x],
+    'quality': _quality,
+}
+
+# Chunks are only sent once this much output has been buffered
+CHUNK_SIZE = 64 * 1024
+
+# Throughput is measured over this many seconds
+THROUGHPUT_WINDOW = 60.0
+
+
+def _warm():
+    # Imported so that the first request doesn't pay for it, parse() is the
+    # one which pulls in bs4
+    parse('<pdf2xml></pdf2xml>')
+
+
+def _refine_xml(xml, params):
+    return refine(parse(xml), **params)
+
+
+def _json_path(body):
+    '''Return the path from a JSON request body, {"path": "..."}.'''
+    request = json.loads(body.decode('utf-8'))
+    if not isinstance(request, dict) or not isinstance(
+            request.get('path'), str
+    ):
+        raise ValueError('expected {"path": "..."}')
+    return request['path']
+
+
+def parse_params(query):
+    '''Return refine() keyword arguments from a parsed query string dict.'''
+    params = dict()
+    for name, values in query.items():
+        if name in PARAMS:
+            params[name] = PARAMS[name](values[-1])
+    return params
+
+
+class Stats(object):
+    def __init__(self, workers):
+        self.workers = workers
+        self.lock = threading.Lock()
+        self.start = time.time()
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.busy_time = 0.0
+        # Finish times of recent documents, for throughput
+        self.recent = list()
+
+    def submitted(self):
+        with self.lock:
+            self.in_flight += 1
+
+    def finished(self, seconds, failed = False):
+        now = time.time()
+        with self.lock:
+            self.in_flight -= 1
+            if failed:
+                self.failed += 1
+            else:
+                self.completed += 1
+                self.busy_time += seconds
+            self.recent.append(now)
+            self._trim(now)
+
+    def _trim(self, now):
+        while self.recent and self.recent[0] < now - THROUGHPUT_WINDOW:
+            del self.recent[0]
+
+    def report(self):
+        now = time.time()
+        with self.lock:
+            self._trim(now)
+            window = min(THROUGHPUT_WINDOW, now - self.start) or 1.0
+            return {
+                'workers': self.workers,
+                'in_flight': self.in_flight,
+                'queue_depth': max(self.in_flight - self.workers, 0),
+                'completed': self.completed,
+                'failed': self.failed,
+                'uptime': now - self.start,
+                'throughput': len(self.recent) / window,
+                'mean_seconds': (
+                    self.busy_time / self.completed if self.completed else None
+                ),
+            }
+
+
+class _ChunkedWriter(object):
+    '''A text file-like object writing HTTP/1.1 chunked transfer encoding.'''
+    def __init__(self, f):
+        self.f = f
+        self.buffer = io.StringIO()
+
+    def write(self, s):
+        self.buffer.write(s)
+        if self.buffer.tell() >= CHUNK_SIZE:
+            self.flush()
+
+    def flush(self):
+        data = self.buffer.getvalue().encode('utf-8')
+        if data:
+            self.f.write('{:x}\r\n'.format(len(data)).encode('ascii'))
+            self.f.write(data)
+            self.f.write(b'\r\n')
+        self.buffer = io.StringIO()
+
+    def close(self):
+        self.flush()
+        self.f.write(b'0\r\n\r\n')
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def address_string(self):
+        # client_address is empty for Unix sockets
+        if isinstance(self.client_address, tuple):
+            return self.client_address[0]
+        return 'unix'
+
+    def send_json(self, status, obj):
+        body = json.dumps(obj).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        if url.path == '/stats':
+            self.send_json(200, self.server.stats.report())
+        else:
+            self.send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        url = urllib.parse.urlsplit(self.path)
+        if url.path != '/refine':
+            self.send_json(404, {'error': 'not found'})
+            return
+
+        query = urllib.parse.parse_qs(url.query)
+        try:
+            params = parse_params(query)
+            writer, content_type = FORMATS[query.get('format', ['jsonl'])[-1]]
+            length = int(self.headers.get('Content-Length', 0))
+            body = self.rfile.read(length)
+            if self.headers.get('Content-Type', '').startswith(
+                    'application/json'
+            ):
+                task = (refine_path, _json_path(body))
+            else:
+                task = (_refine_xml, body.decode('utf-8'))
+        except (KeyError, ValueError) as e:
+            self.send_json(400, {'error': 'bad request: {!r}'.format(e)})
+            return
+
+        stats = self.server.stats
+        stats.submitted()
+        start = time.time()
+        try:
+            future = self.server.executor.submit(task[0], task[1], params)
+            document = future.result()
+        except Exception as e:
+            stats.finished(time.time() - start, failed=True)
+            self.send_json(500, {'error': '{}: {}'.format(
+                type(e).__name__, e
+            )})
+            return
+        stats.finished(time.time() - start)
+
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('X-Refiner-Quality', document.quality)
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        out = _ChunkedWriter(self.wfile)
+        writer.write(document, out)
+        out.close()
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super(Handler, self).log_message(format, *args)
+
+
+class _ServerMixin(object):
+    daemon_threads = True
+
+    def setup_pool(self, workers, verbose):
+        self.executor = concurrent.futures.ProcessPoolExecutor(
+            workers, initializer=_warm
+        )
+        self.stats = Stats(workers)
+        self.verbose = verbose
+
+    def server_close(self):
+        super(_ServerMixin, self).server_close()
+        self.executor.shutdown()
+
+
+class HTTPServer(
+        _ServerMixin, socketserver.ThreadingMixIn, http.server.HTTPServer
+):
+    pass
+
+
+class UnixHTTPServer(
+        _ServerMixin, socketserver.ThreadingMixIn,
+        socketserver.UnixStreamServer
+):
+    pass
+
+
+def make_server(address, workers = None, verbose = False):
+    '''Return a server listening on address, either a (host, port) two-tuple
+    or the path of a Unix socket, with a pool of workers processes. Call its
+    serve_forever() method to start handling requests.
+
+    A socket left at the path by a previous server is replaced, but
+    FileExistsError is raised if there is any other kind of file there.
+
+    '''
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if isinstance(address, str):
+        if os.path.exists(address):
+            if not stat.S_ISSOCK(os.stat(address).st_mode):
+                raise FileExistsError(
+                    '{} exists and is not a socket'.format(address)
+                )
+            os.remove(address)
+        server = UnixHTTPServer(address, Handler)
+    else:
+        server = HTTPServer(address, Handler)
+    server.setup_pool(workers, verbose)
+    return server
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(
+        prog='python -m refiner.server',
+        description='Serve document refinement over HTTP.'
+    )
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument(
+        '--socket', help='listen on this Unix socket instead of a port'
+    )
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('-v', '--verbose', action='store_true')
+    args = parser.parse_args(argv)
+
+    address = args.socket or (args.host, args.port)
+    server = make_server(address, args.workers, args.verbose)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
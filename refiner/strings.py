@@ -0,0 +1,56 @@
+import sys
+import threading
+
+
+class StringTable(object):
+    '''Interns strings, so that equal strings share a single object.
+
+    Pass the same StringTable to parse() for each document of a batch and the
+    memory used by the strings of fragments and output contents is bounded by
+    the number of distinct strings rather than the number of fragments. Unlike
+    sys.intern() the strings are released along with the table.
+
+    A table may be shared by documents refined in different threads.
+
+    '''
+    def __init__(self):
+        self.strings = dict()
+        self.lookups = 0
+        self.saved = 0
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.strings)
+
+    def __contains__(self, string):
+        return string in self.strings
+
+    def intern(self, string):
+        '''Return the interned string equal to string.'''
+        with self._lock:
+            self.lookups += 1
+            interned = self.strings.setdefault(string, string)
+            if interned is not string:
+                # string can now be freed
+                self.saved += sys.getsizeof(string)
+            return interned
+
+    def report(self):
+        '''Return a dict of the number of distinct strings, the bytes they
+        take up, the number of strings interned and the bytes saved by
+        interning (i.e. the size of the equal copies which could be freed).'''
+        return {
+            'strings': len(self.strings),
+            'bytes': sum(sys.getsizeof(s) for s in self.strings),
+            'lookups': self.lookups,
+            'saved': self.saved,
+        }
@@ -0,0 +1,204 @@
+'''Refine one input document with every combination of a grid of parameter
+values, sharing each stage between the points whose parameters for that stage
+are the same.
+
+Stages and the parameters they depend on:
+
+    select      first, last, ignore, roi, strip_running, dedupe
+    columns     the above and smallest_col, min_col_votes
+    group       the above and max_line_sep, min_h_sep (group_lines and
+                join_over_columns)
+    classify    the above and width
+
+'''
+import collections
+import itertools
+import time
+
+from refiner.batch import process_many
+from refiner.columns import (
+    ColumnMap, columns, DEFAULT_SMALLEST_COL, DEFAULT_MIN_COL_VOTES
+)
+from refiner.core import (
+    group_lines, join_over_columns, build_contents, select_pages,
+    new_output_page, page_roi, exclude_texts, select_texts,
+    DEFAULT_MAX_LINE_SEP, DEFAULT_MIN_H_SEP
+)
+from refiner.output.model import OutputDocument
+
+
+# The parameters of refine() which can be swept, with their defaults
+DEFAULTS = {
+    'first': None,
+    'last': None,
+    'ignore': (),
+    'roi': None,
+    'width': None,
+    'max_line_sep': DEFAULT_MAX_LINE_SEP,
+    'smallest_col': DEFAULT_SMALLEST_COL,
+    'min_col_votes': DEFAULT_MIN_COL_VOTES,
+    'min_h_sep': DEFAULT_MIN_H_SEP,
+    'strip_running': False,
+    'dedupe': False,
+}
+
+SELECT = ('first', 'last', 'ignore', 'roi', 'strip_running', 'dedupe')
+COLUMNS = SELECT + ('smallest_col', 'min_col_votes')
+GROUP = COLUMNS + ('max_line_sep', 'min_h_sep')
+
+# params is the dict of all the refine() parameters of the point. timings maps
+# each stage to the seconds it took, stages shared with other points are
+# included in the timings of each of them.
+SweepResult = collections.namedtuple(
+    'SweepResult', ['params', 'document', 'timings']
+)
+
+
+def points(grid, **params):
+    '''Return the parameters of each point of grid as a list of dicts.
+
+    grid maps parameter names to lists of values, points are every combination
+    of them in the order given by itertools.product(). Other keyword arguments
+    are fixed parameters of every point.
+
+    '''
+    for name in itertools.chain(grid, params):
+        if name not in DEFAULTS:
+            raise TypeError('cannot sweep parameter {}'.format(name))
+    names = list(grid)
+    result = list()
+    for values in itertools.product(*[grid[n] for n in names]):
+        point = dict(DEFAULTS)
+        point.update(params)
+        point.update(zip(names, values))
+        result.append(point)
+    return result
+
+
+def _key(point, names):
+    return tuple(
+        tuple(point[n]) if isinstance(point[n], list) else point[n]
+        for n in names
+    )
+
+
+def _timed(f, *args):
+    start = time.perf_counter()
+    result = f(*args)
+    return result, time.perf_counter() - start
+
+
+def _select(input, point):
+    '''Return the selected input pages and a list of (page, texts) for those
+    which aren't ignored.'''
+    pages = select_pages(input, point['first'], point['last'])
+    ignore = point['ignore']
+    exclude = exclude_texts(
+        pages, ignore, point['dedupe'], point['strip_running']
+    )
+    selected = [
+        (p, select_texts(p, page_roi(p, point['roi']), exclude))
+        for p in pages if p.number not in ignore
+    ]
+    return pages, selected
+
+
+def _columns(selected, smallest_col, min_col_votes):
+    column_map = ColumnMap()
+    texts = list()
+    for page, page_texts in selected:
+        column_map.insert(page, columns(page_texts, smallest_col, min_col_votes))
+        texts += page_texts
+    return column_map, texts
+
+
+def _group_and_classify(task):
+    '''Group the texts once and then build the output document of each point
+    sharing that grouping. This is the unit of work run in each worker
+    process.'''
+    pages, texts, column_map, max_line_sep, min_h_sep, strings, todo = task
+    groups, group_time = _timed(
+        group_lines, texts, column_map, max_line_sep, min_h_sep
+    )
+    groups, join_time = _timed(join_over_columns, groups, column_map)
+
+    results = list()
+    for i, point in todo:
+        start = time.perf_counter()
+        document = OutputDocument(strings)
+        for p in pages:
+            output_page, _ = new_output_page(
+                document, p, point['roi'], point['width'],
+                p.number in point['ignore']
+            )
+            document.pages[output_page.number] = output_page
+        build_contents(groups, document)
+        results.append((i, document, {
+            'group_lines': group_time,
+            'join_over_columns': join_time,
+            'classify': time.perf_counter() - start,
+        }))
+    return results
+
+
+def sweep(input, grid, workers = None, executor = None, **params):
+    '''Refine the InputDocument input at each point of grid (see points()),
+    returning a SweepResult for each in the same order.
+
+    Selecting texts and finding columns are done once for each distinct set of
+    their parameters in this process. Grouping and classifying are then run in
+    a pool of worker processes, one task for each distinct set of grouping
+    parameters.
+
+    workers: the number of worker processes, defaults to the number of CPUs
+    executor: an existing concurrent.futures.Executor to use instead of
+        starting a new pool, it is not shut down afterwards. Since refining
+        doesn't modify the input, a thread pool avoids pickling the input for
+        each task (but only runs in parallel on free-threaded builds).
+
+    '''
+    todo = points(grid, **params)
+    timings = [dict() for _ in todo]
+    selections = dict()
+    column_maps = dict()
+    tasks = collections.OrderedDict()
+
+    for i, point in enumerate(todo):
+        key = _key(point, SELECT)
+        if key not in selections:
+            selections[key] = _timed(_select, input, point)
+        (pages, selected), timings[i]['select'] = selections[key]
+
+        key = _key(point, COLUMNS)
+        if key not in column_maps:
+            column_maps[key] = _timed(
+                _columns, selected, point['smallest_col'],
+                point['min_col_votes']
+            )
+        (column_map, texts), timings[i]['columns'] = column_maps[key]
+
+        key = _key(point, GROUP)
+        if key not in tasks:
+            tasks[key] = (
+                pages, texts, column_map, point['max_line_sep'],
+                point['min_h_sep'], input.strings, list()
+            )
+        tasks[key][-1].append((i, point))
+
+    documents = [None] * len(todo)
+    for _, results, error in process_many(
+            _group_and_classify, tasks.values(), workers, ordered=False,
+            executor=executor
+    ):
+        if error is not None:
+            raise error
+        for i, document, t in results:
+            documents[i] = document
+            timings[i].update(t)
+
+    for t in timings:
+        t['total'] = sum(t.values())
+    return [
+        SweepResult(point, document, t)
+        for point, document, t in zip(todo, documents, timings)
+    ]
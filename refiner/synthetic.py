@@ -0,0 +1,290 @@
+'''Generate synthetic pdftohtml -xml (or pdftotext -bbox-layout) output for
+tests and benchmarks.'''
+import random
+from xml.sax.saxutils import escape
+
+
+PAGE_WIDTH = 892
+PAGE_HEIGHT = 1263
+MARGIN = 60
+
+FORMATS = ('pdftohtml', 'bbox')
+
+# pdftotext coords are PDF points, pdftohtml's are points scaled by this
+BBOX_SCALE = 1.5
+
+# The ROI which excludes the header and footer bands noise is placed in
+ROI = (0.0, 0.08, 1.0, 0.94)
+
+BODY_SIZE = 12
+HEADING_SIZES = [20, 16, 14]
+
+WORDS = (
+    'the of and to in a is that for it as was with be by on not he this are '
+    'or his from at which but have an they you were her she there one all we '
+    'their been has when who will more no if out so said what up its about '
+    'into than them can only other new some could time these two may then do '
+    'first any my now such like our over man me even most made after also '
+    'did many before must through back years where much your way well down '
+    'should because each just those people how too little state good very '
+    'make world still own see men work long get here between both life being '
+    'under never day same another know while last might us great old year '
+    'off come since against go came right used take three'
+).split()
+
+
+def _font_sizes(fonts):
+    '''Return the size of each of fonts fontspecs. Font 0 is the body font,
+    then up to three heading fonts, then any others are body sized variants.'''
+    sizes = [BODY_SIZE]
+    sizes += HEADING_SIZES[:max(fonts - 1, 0)]
+    sizes += [BODY_SIZE] * max(fonts - 1 - len(HEADING_SIZES), 0)
+    return sizes
+
+
+def _text_width(string, size):
+    return max(int(len(string) * size * 0.5), 1)
+
+
+def _points(px):
+    return '{:.6f}'.format(px / BBOX_SCALE)
+
+
+class _Generator(object):
+    def __init__(
+            self, columns, fragments, fonts, noise, duplicates, seed,
+            format = 'pdftohtml'
+    ):
+        if format not in FORMATS:
+            raise ValueError('unknown format {}'.format(format))
+        self.format = format
+        self.columns = max(columns, 1)
+        self.fragments = max(fragments, 1)
+        self.sizes = _font_sizes(max(fonts, 1))
+        self.variants = [
+            i for i, s in enumerate(self.sizes) if i > 0 and s == BODY_SIZE
+        ]
+        self.headings = [
+            i for i, s in enumerate(self.sizes) if s != BODY_SIZE
+        ]
+        self.noise = noise
+        self.duplicates = duplicates
+        self.random = random.Random(seed)
+        # Separate so that the rest of the document doesn't depend on
+        # duplicates
+        self.duplicates_random = random.Random('duplicates {}'.format(seed))
+        self.out = list()
+        # The fragments of the line being written in the bbox format, or None
+        self.pending = None
+
+    def element(self, left, top, string, font, duplicate = False):
+        size = self.sizes[font]
+        width = _text_width(string, size)
+        if self.format == 'pdftohtml':
+            self.out.append(
+                '<text top="{}" left="{}" width="{}" height="{}" font="{}">'
+                '{}</text>\n'.format(
+                    top, left, width, size, font, escape(string)
+                )
+            )
+        elif self.pending is not None and not duplicate:
+            self.pending.append((left, top, string, size))
+        else:
+            self.bbox_line([(left, top, string, size)])
+
+    def bbox_line(self, fragments):
+        '''Write fragments, a list of (left, top, string, size), as one line
+        of words.'''
+        left, top, _, size = fragments[0]
+        last = fragments[-1]
+        right = last[0] + _text_width(last[2], last[3])
+        words = list()
+        for x, _, string, s in fragments:
+            for word in string.split():
+                words.append((x, word))
+                x += _text_width(word + ' ', s)
+        self.out.append(
+            '<line xMin="{}" yMin="{}" xMax="{}" yMax="{}">\n'.format(
+                _points(left), _points(top), _points(right),
+                _points(top + size)
+            )
+        )
+        for x, word in words:
+            self.out.append(
+                '<word xMin="{}" yMin="{}" xMax="{}" yMax="{}">{}</word>\n'
+                .format(
+                    _points(x), _points(top),
+                    _points(x + _text_width(word, size)), _points(top + size),
+                    escape(word)
+                )
+            )
+        self.out.append('</line>\n')
+
+    def text(self, left, top, string, font):
+        self.element(left, top, string, font)
+        r = self.duplicates_random
+        while self.duplicates and r.random() < self.duplicates:
+            # A faux-bold copy offset by up to a pixel
+            self.element(
+                left + r.randint(0, 1), top + r.randint(0, 1), string, font,
+                duplicate=True
+            )
+        return left + _text_width(string, self.sizes[font])
+
+    def words(self, n):
+        return [self.random.choice(WORDS) for _ in range(n)]
+
+    def line(self, left, top, words, font):
+        '''Write a line of words split into self.fragments texts. In the bbox
+        format they are written as a single line instead (and duplicates of
+        them as lines of their own).'''
+        if self.format == 'bbox':
+            self.pending = list()
+        n = min(self.fragments, len(words))
+        bounds = sorted(self.random.sample(range(1, len(words)), n - 1))
+        bounds = [0] + bounds + [len(words)]
+        for i in range(n):
+            fragment = ' '.join(words[bounds[i]:bounds[i+1]])
+            if i < n - 1:
+                fragment += ' '
+            f = font
+            if (i > 0 and font == 0 and self.variants
+                    and self.random.random() < 0.3):
+                f = self.random.choice(self.variants)
+            left = self.text(left, top, fragment, f)
+        if self.pending is not None:
+            self.bbox_line(self.pending)
+            self.pending = None
+
+    def column(self, col_left, col_width, top, bottom):
+        chars = int(col_width / (BODY_SIZE * 0.5))
+        y = top
+        while y < bottom:
+            if self.headings and self.random.random() < 0.1:
+                font = self.random.choice(self.headings)
+                words = self.words(self.random.randint(1, 5))
+                words[0] = words[0].capitalize()
+                self.line(col_left, y, words, font)
+                y += self.sizes[font] + 10
+                continue
+
+            # A paragraph of lines with the last ending in a full stop
+            lines = self.random.randint(2, 8)
+            for i in range(lines):
+                if y >= bottom:
+                    break
+                words = self.words(max(chars // 6, 1))
+                while len(' '.join(words)) > chars and len(words) > 1:
+                    words.pop()
+                if i == 0:
+                    words[0] = words[0].capitalize()
+                if i == lines - 1:
+                    words[-1] += '.'
+                self.line(col_left, y, words, 0)
+                y += BODY_SIZE + 2
+            y += BODY_SIZE
+
+    def page(self, number):
+        if self.format == 'bbox':
+            self.out.append(
+                '<page width="{}" height="{}">\n<flow>\n<block>\n'.format(
+                    _points(PAGE_WIDTH), _points(PAGE_HEIGHT)
+                )
+            )
+        else:
+            self.out.append(
+                '<page number="{}" position="absolute" top="0" left="0" '
+                'height="{}" width="{}">\n'.format(
+                    number, PAGE_HEIGHT, PAGE_WIDTH
+                )
+            )
+        if number == 1 and self.format == 'pdftohtml':
+            for i, size in enumerate(self.sizes):
+                family = 'Times-Italic' if i in self.variants else 'Times'
+                self.out.append(
+                    '<fontspec id="{}" size="{}" family="{}" '
+                    'color="#000000"/>\n'.format(i, size, family)
+                )
+
+        top = int(PAGE_HEIGHT * ROI[1]) + 10
+        bottom = int(PAGE_HEIGHT * ROI[3]) - 30
+        gutter = 30
+        col_width = (
+            (PAGE_WIDTH - 2 * MARGIN - gutter * (self.columns - 1))
+            // self.columns
+        )
+        for c in range(self.columns):
+            col_left = MARGIN + c * (col_width + gutter)
+            self.column(col_left, col_width, top, bottom)
+
+        # Noise: a running header, a page number footer and then random
+        # specks, all outside the ROI
+        for i in range(self.noise):
+            if i == 0:
+                self.text(MARGIN, 30, 'Synthetic Journal of Documents', 0)
+            elif i == 1:
+                self.text(PAGE_WIDTH // 2, PAGE_HEIGHT - 40, str(number), 0)
+            else:
+                band = self.random.choice((
+                    (5, int(PAGE_HEIGHT * ROI[1]) - BODY_SIZE - 5),
+                    (int(PAGE_HEIGHT * ROI[3]) + 5, PAGE_HEIGHT - BODY_SIZE - 5)
+                ))
+                self.text(
+                    self.random.randint(0, PAGE_WIDTH - 100),
+                    self.random.randint(*band),
+                    ' '.join(self.words(self.random.randint(1, 3))),
+                    0
+                )
+
+        if self.format == 'bbox':
+            self.out.append('</block>\n</flow>\n')
+        self.out.append('</page>\n')
+
+    def document(self, pages):
+        if self.format == 'bbox':
+            self.out.append(
+                '<!DOCTYPE html>\n'
+                '<html xmlns="http://www.w3.org/1999/xhtml">\n'
+                '<head>\n<title></title>\n'
+                '<meta name="Producer" content="refiner.synthetic"/>\n'
+                '</head>\n<body>\n<doc>\n'
+            )
+        else:
+            self.out.append(
+                '<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<!DOCTYPE pdf2xml SYSTEM "pdf2xml.dtd">\n\n'
+                '<pdf2xml producer="refiner.synthetic">\n'
+            )
+        for number in range(1, pages + 1):
+            self.page(number)
+        if self.format == 'bbox':
+            self.out.append('</doc>\n</body>\n</html>\n')
+        else:
+            self.out.append('</pdf2xml>\n')
+        return ''.join(self.out)
+
+
+def generate(
+        pages = 10, columns = 2, fragments = 1, fonts = 4, noise = 0,
+        duplicates = 0, seed = 0, format = 'pdftohtml'
+):
+    '''Return a string of pdftohtml -xml style output for a synthetic document.
+
+    pages: the number of pages
+    columns: the number of text columns on each page
+    fragments: the number of text elements each line is broken into
+    fonts: the number of fontspecs, a body font then up to three heading fonts
+        and then body sized variants which are used for some fragments
+    noise: the number of texts outside ROI on each page, the first two are a
+        running header and a page number
+    duplicates: the probability of each text being followed by a copy offset
+        by up to a pixel, and of each copy being followed by another
+    seed: the random seed, the same arguments always give the same output
+    format: 'bbox' for pdftotext -bbox-layout style output of the same
+        document instead, with each line (and each duplicate) as one line of
+        words and no fonts
+
+    '''
+    return _Generator(
+        columns, fragments, fonts, noise, duplicates, seed, format
+    ).document(pages)
@@ -0,0 +1,45 @@
+'''Fake pdftohtml and pdftotext executables for testing the code which runs
+them. The "PDFs" given to them are already their XML (or XHTML) output.'''
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+
+
+# pdftohtml -xml -stdout path
+PDFTOHTML = '''#!/bin/sh
+exec cat "$3"
+'''
+
+# pdftotext -bbox-layout path -
+PDFTOTEXT = '''#!/bin/sh
+exec cat "$2"
+'''
+
+# Either tool, hanging
+HANGING = '''#!/bin/sh
+exec sleep 30
+'''
+
+
+def write_command(dir, name, script):
+    '''Write script to an executable file named name in dir, returning its
+    path.'''
+    path = os.path.join(dir, name)
+    with open(path, 'w') as f:
+        f.write(script)
+    os.chmod(path, stat.S_IRWXU)
+    return path
+
+
+class CommandTestCase(unittest.TestCase):
+    '''Runs each test with self.command, the path of a fake executable named
+    name running script, in a temporary directory self.dir.'''
+    name = 'pdftohtml'
+    script = PDFTOHTML
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.command = write_command(self.dir, self.name, self.script)
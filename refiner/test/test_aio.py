@@ -0,0 +1,48 @@
+import asyncio
+import os
+import subprocess
+from refiner import synthetic
+from refiner.aio import AsyncRefiner
+from refiner.core import refine
+from refiner.equivalence import diff
+from refiner.input.pdftohtml import parse
+from refiner.test.commands import CommandTestCase
+
+
+class AsyncRefinerTestCase(CommandTestCase):
+    def setUp(self):
+        super(AsyncRefinerTestCase, self).setUp()
+        self.xml = dict()
+        for i in range(3):
+            path = os.path.join(self.dir, '{}.pdf'.format(i))
+            self.xml[path] = synthetic.generate(pages=2, seed=i)
+            with open(path, 'w') as f:
+                f.write(self.xml[path])
+
+    def test_refine_file(self):
+        async def run():
+            refiner = AsyncRefiner(max_processes=2, command=self.command)
+            paths = sorted(self.xml)
+            return paths, await asyncio.gather(*[
+                refiner.refine_file(p, roi=synthetic.ROI) for p in paths
+            ])
+        paths, outputs = asyncio.run(run())
+        for path, output in zip(paths, outputs):
+            expected = refine(parse(self.xml[path]), roi=synthetic.ROI)
+            self.assertIsNone(diff(expected, output))
+
+    def test_parse_then_refine(self):
+        async def run(path):
+            refiner = AsyncRefiner(command=self.command)
+            input = await refiner.parse_file(path)
+            return await refiner.refine(input)
+        path = sorted(self.xml)[0]
+        output = asyncio.run(run(path))
+        self.assertIsNone(diff(refine(parse(self.xml[path])), output))
+
+    def test_failure(self):
+        async def run():
+            refiner = AsyncRefiner(command=self.command)
+            await refiner.refine_file(os.path.join(self.dir, 'missing.pdf'))
+        with self.assertRaises(subprocess.CalledProcessError):
+            asyncio.run(run())
@@ -0,0 +1,94 @@
+import concurrent.futures
+import os
+import shutil
+import tempfile
+import unittest
+from refiner import synthetic
+from refiner.batch import refine_many
+from refiner.core import refine
+from refiner.equivalence import diff
+from refiner.input.pdftohtml import parse_xml_file
+
+
+def crashing_parser(path):
+    # Kills the worker process, as running out of memory would
+    if path.endswith('crash.xml'):
+        os._exit(1)
+    return parse_xml_file(path)
+
+
+class RefineManyTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.paths = list()
+        for i in range(4):
+            path = os.path.join(self.dir, '{}.xml'.format(i))
+            with open(path, 'w') as f:
+                f.write(synthetic.generate(pages=i + 1, seed=i))
+            self.paths.append(path)
+        self.paths.insert(2, os.path.join(self.dir, 'missing.xml'))
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_ordered(self):
+        results = list(refine_many(
+            self.paths, workers=2, parser=parse_xml_file, roi=synthetic.ROI
+        ))
+        self.assertEqual([r.path for r in results], self.paths)
+        for r in results:
+            if r.path.endswith('missing.xml'):
+                self.assertIsNone(r.document)
+                self.assertIsInstance(r.error, FileNotFoundError)
+            else:
+                self.assertIsNone(r.error)
+                expected = refine(parse_xml_file(r.path), roi=synthetic.ROI)
+                self.assertIsNone(diff(expected, r.document))
+
+    def test_unordered(self):
+        results = list(refine_many(
+            self.paths, workers=2, ordered=False, max_pending=1,
+            parser=parse_xml_file
+        ))
+        self.assertEqual(
+            sorted(r.path for r in results), sorted(self.paths)
+        )
+        self.assertEqual(len([r for r in results if r.error]), 1)
+
+    def test_worker_dies(self):
+        # The documents pending in the pool with the crash are retried
+        paths = [p for p in self.paths if not p.endswith('missing.xml')] * 2
+        paths[2] = os.path.join(self.dir, 'crash.xml')
+        for ordered in (True, False):
+            results = list(refine_many(
+                paths, workers=2, ordered=ordered, parser=crashing_parser
+            ))
+            self.assertEqual(
+                sorted(r.path for r in results), sorted(paths)
+            )
+            if ordered:
+                self.assertEqual([r.path for r in results], paths)
+            for r in results:
+                if r.path.endswith('crash.xml'):
+                    self.assertIsInstance(
+                        r.error, concurrent.futures.BrokenExecutor
+                    )
+                else:
+                    self.assertIsNone(r.error)
+
+    def test_given_executor_dies(self):
+        self.paths[0] = os.path.join(self.dir, 'crash.xml')
+        with concurrent.futures.ProcessPoolExecutor(1) as executor:
+            results = list(refine_many(
+                self.paths, max_pending=1, parser=crashing_parser,
+                executor=executor
+            ))
+        self.assertEqual([r.path for r in results], self.paths)
+        for r in results:
+            self.assertIsInstance(r.error, concurrent.futures.BrokenExecutor)
+
+    def test_stop_early(self):
+        results = refine_many(self.paths, workers=1, parser=parse_xml_file)
+        first = next(results)
+        results.close()
+        self.assertEqual(first.path, self.paths[0])
@@ -0,0 +1,120 @@
+import functools
+import os
+import pickle
+import threading
+import time
+import unittest
+from refiner import synthetic
+from refiner.batch import refine_many
+from refiner.cancel import CancelToken, Cancelled, DeadlineExceeded, NEVER
+from refiner.core import refine
+from refiner.input.pdftohtml import parse, extract, parse_file
+from refiner.pipeline import pipeline
+from refiner.test import commands
+
+
+class CancelTokenTestCase(unittest.TestCase):
+    def test_cancel(self):
+        token = CancelToken()
+        token.check()
+        self.assertFalse(token.cancelled)
+        self.assertIsNone(token.remaining())
+        token.cancel()
+        self.assertTrue(token.cancelled)
+        self.assertRaises(Cancelled, token.check)
+
+    def test_deadline(self):
+        token = CancelToken(0.05)
+        self.assertLessEqual(token.remaining(), 0.05)
+        time.sleep(0.06)
+        self.assertRaises(DeadlineExceeded, token.check)
+
+    def test_within(self):
+        self.assertIs(CancelToken.within(), NEVER)
+        parent = CancelToken()
+        self.assertIs(CancelToken.within(parent), parent)
+        child = CancelToken.within(parent, 10)
+        self.assertFalse(child.cancelled)
+        parent.cancel()
+        self.assertTrue(child.cancelled)
+
+    def test_pickle(self):
+        token = pickle.loads(pickle.dumps(CancelToken(10)))
+        self.assertGreater(token.remaining(), 9)
+        token.cancel()
+        self.assertTrue(token.cancelled)
+
+
+class RefineCancelTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.xml = synthetic.generate(pages=5, seed=8)
+
+    def test_progress(self):
+        calls = list()
+        refine(parse(self.xml), progress=lambda *args: calls.append(args))
+        self.assertEqual(calls[:5], [('pages', i, 5) for i in range(1, 6)])
+        self.assertEqual(calls[5:7], [
+            ('group_lines', 1, 1), ('join_over_columns', 1, 1)
+        ])
+        self.assertEqual(calls[7:], [('classify', i, 5) for i in range(1, 6)])
+
+    def test_cancel_between_pages(self):
+        token = CancelToken()
+        calls = list()
+
+        def progress(stage, done, total):
+            calls.append((stage, done))
+            if done == 2:
+                token.cancel()
+
+        self.assertRaises(
+            Cancelled, refine, parse(self.xml), cancel=token,
+            progress=progress
+        )
+        self.assertEqual(calls, [('pages', 1), ('pages', 2)])
+
+    def test_timeout(self):
+        self.assertRaises(
+            DeadlineExceeded, refine, parse(self.xml), timeout=0
+        )
+
+
+class ExtractCancelTestCase(commands.CommandTestCase):
+    script = commands.HANGING
+
+    def setUp(self):
+        super(ExtractCancelTestCase, self).setUp()
+        self.path = os.path.join(self.dir, 'hangs.pdf')
+
+    def test_timeout(self):
+        start = time.monotonic()
+        self.assertRaises(
+            DeadlineExceeded, extract, self.path, self.command, timeout=0.2
+        )
+        self.assertLess(time.monotonic() - start, 5)
+
+    def test_cancel(self):
+        token = CancelToken()
+        threading.Timer(0.2, token.cancel).start()
+        start = time.monotonic()
+        self.assertRaises(
+            Cancelled, parse_file, self.path, cancel=token,
+            command=self.command
+        )
+        self.assertLess(time.monotonic() - start, 5)
+
+    def test_refine_many_timeout(self):
+        start = time.monotonic()
+        result, = refine_many(
+            [self.path], workers=1, timeout=0.2,
+            parser=functools.partial(parse_file, command=self.command)
+        )
+        self.assertIsInstance(result.error, DeadlineExceeded)
+        self.assertLess(time.monotonic() - start, 5)
+
+    def test_pipeline_timeout(self):
+        start = time.monotonic()
+        result, = pipeline([self.path], command=self.command, timeout=0.2)
+        self.assertIsInstance(result.error, DeadlineExceeded)
+        self.assertLess(time.monotonic() - start, 5)
@@ -0,0 +1,101 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from refiner import cli, synthetic
+
+
+class CLITestCase(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.input = os.path.join(self.dir, 'in')
+        self.output = os.path.join(self.dir, 'out')
+        for i, sub in enumerate(['', 'a', 'a/b']):
+            os.makedirs(os.path.join(self.input, sub), exist_ok=True)
+            path = os.path.join(self.input, sub, '{}.xml'.format(i))
+            with open(path, 'w') as f:
+                f.write(synthetic.generate(pages=1, seed=i))
+        with open(os.path.join(self.input, 'a', 'bad.xml'), 'w') as f:
+            f.write('<pdf2xml><page number="x"></page></pdf2xml>')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def run_cli(self, *args):
+        return cli.main(
+            [self.input, '-o', self.output, '--xml', '-j', '2', '-q'] +
+            list(args)
+        )
+
+    def manifest(self):
+        path = os.path.join(self.output, cli.MANIFEST_NAME)
+        with open(path) as f:
+            return [json.loads(l) for l in f]
+
+    def test_directory(self):
+        self.assertEqual(self.run_cli('--roi', '0,0.08,1,0.94'), 1)
+        for name in ('0.jsonl', 'a/1.jsonl', 'a/b/2.jsonl'):
+            path = os.path.join(self.output, name)
+            self.assertTrue(os.path.exists(path), name)
+        records = self.manifest()
+        self.assertEqual(len(records), 4)
+        self.assertEqual(
+            sorted(r['status'] for r in records), ['failed', 'ok', 'ok', 'ok']
+        )
+        leftovers = [
+            n for _, _, files in os.walk(self.output) for n in files
+            if n.endswith('.tmp')
+        ]
+        self.assertEqual(leftovers, [])
+
+    def test_resume(self):
+        self.run_cli()
+        os.remove(os.path.join(self.input, 'a', 'bad.xml'))
+        # Changing an input means it is redone
+        changed = os.path.join(self.input, 'a', 'b', '2.xml')
+        with open(changed, 'a') as f:
+            f.write('\n')
+        self.assertEqual(self.run_cli(), 0)
+        records = self.manifest()
+        self.assertEqual(len(records), 5, 'only the changed input redone')
+        self.assertEqual(records[-1]['input'], os.path.abspath(changed))
+        self.run_cli('--force', '-f', 'markdown')
+        self.assertEqual(len(self.manifest()), 8)
+        self.assertTrue(os.path.exists(os.path.join(self.output, '0.md')))
+
+    def test_next_to_inputs(self):
+        path = os.path.join(self.input, '0.xml')
+        self.assertEqual(cli.main([path, '--xml', '-q', '-f', 'binary']), 0)
+        self.assertTrue(os.path.exists(os.path.join(self.input, '0.rfnb')))
+        self.assertTrue(
+            os.path.exists(os.path.join(self.input, cli.MANIFEST_NAME))
+        )
+
+    def test_skips_outputs(self):
+        # Inputs and outputs in the same tree, with a pattern matching both
+        self.assertEqual(cli.main(
+            [self.input, '--xml', '-q', '--pattern', '*', '--roi', '0,0,1,1']
+        ), 1)
+        self.assertEqual(cli.main(
+            [self.input, '--xml', '-q', '--pattern', '*', '--roi', '0,0,1,1']
+        ), 1)
+        path = os.path.join(self.input, cli.MANIFEST_NAME)
+        with open(path) as f:
+            records = [json.loads(l) for l in f]
+        self.assertEqual(
+            sorted(os.path.basename(r['input']) for r in records),
+            ['0.xml', '1.xml', '2.xml', 'bad.xml', 'bad.xml']
+        )
+
+    def test_output_collision(self):
+        with open(os.path.join(self.input, '0.pdf'), 'w') as f:
+            f.write(synthetic.generate(pages=1))
+        self.assertEqual(self.run_cli('--pattern', '*'), 1)
+        records = self.manifest()
+        # The first in order wins
+        first, = [r for r in records if r['input'].endswith('0.pdf')]
+        self.assertEqual(first['status'], 'ok')
+        collided, = [r for r in records if r['input'].endswith('0.xml')]
+        self.assertEqual(collided['status'], 'failed')
+        self.assertIn('0.pdf', collided['error'])
@@ -0,0 +1,42 @@
+import concurrent.futures
+import unittest
+
+from refiner import synthetic
+from refiner.core import refine
+from refiner.equivalence import diff
+from refiner.input.pdftohtml import parse
+from refiner.strings import StringTable
+
+
+PARAMS = [
+    {},
+    {'roi': synthetic.ROI},
+    {'max_line_sep': 0.2, 'width': 600},
+    {'smallest_col': 0.6, 'min_col_votes': 2},
+    {'strip_running': True, 'dedupe': True},
+]
+
+
+class ConcurrentRefineTestCase(unittest.TestCase):
+    def test_shared_input(self):
+        xml = synthetic.generate(
+            pages=6, columns=3, fragments=3, noise=2, duplicates=0.1, seed=6
+        )
+        shared = parse(xml, strings=StringTable())
+        before = [vars(t).copy() for p in shared.pages for t in p.texts]
+
+        with concurrent.futures.ThreadPoolExecutor(8) as executor:
+            futures = [
+                executor.submit(refine, shared, **params)
+                for _ in range(4) for params in PARAMS
+            ]
+            documents = [f.result() for f in futures]
+
+        for i, document in enumerate(documents):
+            expected = refine(parse(xml), **PARAMS[i % len(PARAMS)])
+            self.assertIsNone(diff(expected, document))
+        after = [vars(t) for p in shared.pages for t in p.texts]
+        self.assertEqual(
+            [sorted(v) for v in before], [sorted(v) for v in after],
+            'input texts modified'
+        )
@@ -0,0 +1,49 @@
+import unittest
+
+from refiner import synthetic
+from refiner.core import refine
+from refiner.dedupe import dedupe, duplicates, overlap
+from refiner.equivalence import diff
+from refiner.input.model import InputPage, Text
+from refiner.input.pdftohtml import parse
+from refiner.instrument import Instrumentation
+
+
+class DedupeTestCase(unittest.TestCase):
+    def setUp(self):
+        self.page = InputPage(1, 800, 1000)
+
+    def text(self, string, left, top, width = 50, height = 12):
+        return Text(string, self.page, left, top, width, height)
+
+    def test_overlap(self):
+        a = self.text('a', 0, 0, 10, 10)
+        self.assertEqual(overlap(a, self.text('a', 1, 0, 10, 10)), 0.9)
+        self.assertEqual(overlap(a, self.text('a', 20, 0, 10, 10)), 0.0)
+
+    def test_duplicates(self):
+        texts = [
+            self.text('Bold', 100, 100),
+            self.text('Bold', 101, 101),
+            self.text('Bold', 100, 100),
+            # Same string further away, a different string at the same place
+            self.text('Bold', 103, 100),
+            self.text('Other', 100, 100),
+        ]
+        self.assertEqual(duplicates(texts), texts[1:3])
+
+    def test_refine(self):
+        clean = synthetic.generate(pages=4, fragments=2, seed=4)
+        noisy = synthetic.generate(pages=4, fragments=2, duplicates=0.3, seed=4)
+        expected = refine(parse(clean))
+        self.assertIsNotNone(diff(expected, refine(parse(noisy))))
+
+        instrument = Instrumentation()
+        actual = refine(parse(noisy), dedupe=True, instrument=instrument)
+        self.assertIsNone(diff(expected, actual))
+        removed = instrument.counts['duplicates']
+        self.assertGreater(removed, 0)
+
+        document = parse(noisy)
+        self.assertEqual(dedupe(document), removed)
+        self.assertIsNone(diff(expected, refine(document)))
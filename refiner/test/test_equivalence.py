@@ -0,0 +1,51 @@
+import unittest
+from refiner import equivalence, synthetic
+from refiner.core import refine
+from refiner.input.pdftohtml import parse
+
+
+def altered(input, **params):
+    output = refine(input, **params)
+    page = output.page_list[-1]
+    page.contents[1].string += ' changed'
+    return output
+
+
+def dropped(input, **params):
+    output = refine(input, **params)
+    del output.pages[output.pages.keys()[-1]]
+    return output
+
+
+class EquivalenceTestCase(unittest.TestCase):
+    def test_same(self):
+        inputs = list(equivalence.synthetic_inputs(5, max_pages=3))
+        results = list(equivalence.check(refine, inputs))
+        self.assertEqual(len(results), 5)
+        for result in results:
+            self.assertIsNone(result.divergence, result.name)
+            self.assertGreater(result.reference_time, 0)
+            self.assertGreater(result.candidate_time, 0)
+
+    def test_first_divergence(self):
+        xml = synthetic.generate(pages=3)
+        result = list(equivalence.check(altered, [('x', xml, {})]))[0]
+        d = result.divergence
+        self.assertEqual((d.page, d.content, d.field), (3, 1, 'string'))
+        self.assertEqual(d.actual, d.expected + ' changed')
+
+    def test_pages_divergence(self):
+        xml = synthetic.generate(pages=3)
+        result = list(equivalence.check(dropped, [('x', xml, {})]))[0]
+        self.assertEqual(result.divergence.field, 'pages')
+
+    def test_diff_page_fields(self):
+        xml = synthetic.generate(pages=2)
+        a = refine(parse(xml))
+        b = refine(parse(xml), width=100)
+        d = equivalence.diff(a, b)
+        self.assertEqual(d.page, 1)
+        self.assertEqual(d.field, 'left')
+
+    def test_load(self):
+        self.assertIs(equivalence.load('refiner.core:refine'), refine)
@@ -0,0 +1,51 @@
+import subprocess
+import sys
+import unittest
+
+
+# Seconds allowed for importing the modules needed to work with refined output.
+# Typically under 0.1, but generous so that a loaded machine doesn't fail it:
+# test_no_heavy_imports is what catches eager imports.
+IMPORT_BUDGET = 0.5
+
+# Modules which should only be imported once they're actually used
+HEAVY = [
+    'bs4', 'subprocess', 'tempfile', 'concurrent.futures', 'asyncio',
+    'http.server',
+]
+
+SCRIPT = '''
+import sys, time
+start = time.perf_counter()
+import refiner
+import refiner.core
+import refiner.input.pdftohtml
+import refiner.output.model
+import refiner.output.binary
+print(time.perf_counter() - start)
+print(' '.join(m for m in {!r} if m in sys.modules))
+'''.format(HEAVY)
+
+
+class ImportTestCase(unittest.TestCase):
+    def run_script(self):
+        out = subprocess.check_output([sys.executable, '-c', SCRIPT])
+        seconds, loaded = out.decode('ascii').split('\n')[:2]
+        return float(seconds), loaded.split()
+
+    def test_no_heavy_imports(self):
+        _, loaded = self.run_script()
+        self.assertEqual(loaded, [], 'imported eagerly')
+
+    def test_budget(self):
+        # Best of a few runs to avoid failing because of a busy machine
+        seconds = min(self.run_script()[0] for _ in range(3))
+        self.assertLess(seconds, IMPORT_BUDGET, 'import refiner too slow')
+
+    def test_lazy_attributes(self):
+        import refiner
+        from refiner.core import refine
+        self.assertIs(refiner.refine, refine)
+        self.assertIn('refine_many', dir(refiner))
+        with self.assertRaises(AttributeError):
+            refiner.missing
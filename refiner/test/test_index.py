@@ -0,0 +1,68 @@
+import io
+import unittest
+from refiner.core import refine
+from refiner.index import InvertedIndex
+from refiner.input.model import InputDocument, InputPage, Font, Text
+
+
+def make_input():
+    document = InputDocument()
+    big = Font('0', 'Times', 20, '#000000')
+    small = Font('1', 'Times', 10, '#000000')
+    document.fonts = {'0': big, '1': small}
+    lines = [
+        (1, 10, 'Introduction', big),
+        (1, 50, 'The quick brown fox jumps.', small),
+        (2, 10, 'Method', big),
+        (2, 50, 'A brown fox and a quick dog.', small),
+    ]
+    pages = dict()
+    for number, top, string, font in lines:
+        if number not in pages:
+            pages[number] = InputPage(number, 600, 800)
+            document.pages.append(pages[number])
+        page = pages[number]
+        page.texts.append(
+            Text(string, page, 10, top, 300, font.size, font=font)
+        )
+    return document
+
+
+class InvertedIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.index = InvertedIndex()
+        self.output = refine(make_input(), index=self.index)
+
+    def test_search(self):
+        hits = self.index.search('Fox')
+        self.assertEqual([(h.page, h.content) for h in hits], [(1, 1), (2, 1)])
+        self.assertEqual(self.index.heading(hits[0]), 'Introduction')
+        self.assertEqual(self.index.heading(hits[1]), 'Method')
+        self.assertEqual(self.index.search('missing'), [])
+        hit = self.index.search('method')[0]
+        self.assertIsNone(self.index.heading(hit), 'top heading has context')
+
+    def test_phrase(self):
+        hits = self.index.phrase('quick brown')
+        self.assertEqual([(h.page, h.content) for h in hits], [(1, 1)])
+        hits = self.index.phrase('brown fox')
+        self.assertEqual(len(hits), 2, 'phrase on both pages')
+        self.assertEqual(self.index.phrase('fox brown'), [])
+        self.assertEqual(self.index.phrase(''), [])
+
+    def test_hits_match_output(self):
+        for hit in self.index.search('quick'):
+            content = self.output.pages[hit.page].contents[hit.content]
+            self.assertIn('quick', content.string)
+
+    def test_dump_load(self):
+        f = io.StringIO()
+        self.index.dump(f)
+        f.seek(0)
+        loaded = InvertedIndex.load(f)
+        self.assertEqual(len(loaded), len(self.index))
+        self.assertEqual(loaded.search('fox'), self.index.search('fox'))
+        self.assertEqual(
+            loaded.phrase('a quick dog'), self.index.phrase('a quick dog')
+        )
+        self.assertEqual(loaded.heading(loaded.search('dog')[0]), 'Method')
@@ -0,0 +1,56 @@
+import unittest
+from refiner.core import refine
+from refiner.input.pdftohtml import parse
+from refiner.instrument import Instrumentation, NULL
+
+
+XML = '''<?xml version="1.0" encoding="UTF-8"?>
+<pdf2xml>
+<page number="1" position="absolute" top="0" left="0" height="800" width="600">
+<fontspec id="0" size="20" family="Times" color="#000000"/>
+<fontspec id="1" size="10" family="Times" color="#000000"/>
+<text top="10" left="10" width="200" height="20" font="0">Introduction</text>
+<text top="50" left="10" width="200" height="10" font="1">Some text which</text>
+<text top="61" left="10" width="200" height="10" font="1">carries on</text>
+<text top="50" left="310" width="200" height="10" font="1">Second column</text>
+</page>
+<page number="2" position="absolute" top="0" left="0" height="800" width="600">
+<text top="50" left="10" width="200" height="10" font="1">More text.</text>
+</page>
+</pdf2xml>
+'''
+
+
+class InstrumentationTestCase(unittest.TestCase):
+    def test_stages_and_counts(self):
+        reports = []
+        instrument = Instrumentation(reports.append)
+        document = parse(XML, instrument=instrument)
+        self.assertEqual(len(reports), 1, 'callback after parse')
+        refine(document, instrument=instrument)
+        self.assertEqual(len(reports), 2, 'callback after refine')
+
+        report = reports[-1]
+        for name in (
+                'parse', 'refine', 'roi', 'columns', 'group_lines',
+                'join_over_columns', 'classify'
+        ):
+            self.assertIn(name, report['stages'], 'missing stage')
+            self.assertGreaterEqual(report['stages'][name]['wall'], 0)
+            self.assertGreaterEqual(report['stages'][name]['cpu'], 0)
+        self.assertEqual(report['stages']['refine']['calls'], 1)
+        self.assertEqual(report['stages']['columns']['calls'], 2, 'per page')
+
+        counts = report['counts']
+        self.assertEqual(counts['texts_parsed'], 5)
+        self.assertEqual(counts['texts_in'], 5)
+        self.assertEqual(counts['groups_out'], 4)
+        self.assertEqual(counts['joins'], 2)
+        self.assertEqual(counts['headings'], 1)
+        self.assertEqual(counts['contents'], 2)
+        self.assertIsNotNone(report['peak_memory'])
+
+    def test_null(self):
+        self.assertFalse(NULL.enabled)
+        with NULL.stage('anything'):
+            NULL.count('anything')
@@ -0,0 +1,87 @@
+import io
+import os
+import tempfile
+import unittest
+from refiner.geometry import Box
+from refiner.output.model import OutputDocument, OutputPage, Paragraph, Heading
+from refiner.output import binary
+
+
+def make_document():
+    document = OutputDocument()
+    title = None
+    for n in (1, 2, 3):
+        page = OutputPage(
+            document, n, 612, 792.5, scale=1.25,
+            roi=Box(0, 10, right=600, bottom=780.25), ignored=(n == 2)
+        )
+        document.pages[n] = page
+        if title is None:
+            title = Heading(page, 10, 10, 'Title', None)
+            page.contents.append(title)
+        sub = Heading(page, 10.5, 30, 'Section {}'.format(n), title)
+        page.contents.append(sub)
+        page.contents.append(Heading(page, 10, 40, 'Sub', sub))
+        page.contents.append(Paragraph(page, 10, 50.25, 'Repeated ünïcode'))
+    return document
+
+
+class BinaryTestCase(unittest.TestCase):
+    def assertDocumentsEqual(self, a, b):
+        self.assertEqual(a.pages.keys(), b.pages.keys(), 'page numbers')
+        for pa, pb in zip(a.page_list, b.page_list):
+            self.assertEqual(
+                (pa.number, pa.width, pa.height, pa.scale, pa.ignored),
+                (pb.number, pb.width, pb.height, pb.scale, pb.ignored),
+                'page attributes'
+            )
+            self.assertEqual(pa.roi, pb.roi, 'page roi')
+            self.assertEqual(len(pa.contents), len(pb.contents), 'contents')
+            for ca, cb in zip(pa.contents, pb.contents):
+                self.assertIsInstance(cb, type(ca), 'content type')
+                self.assertEqual(
+                    (ca.left, ca.top, ca.string),
+                    (cb.left, cb.top, cb.string),
+                    'content attributes'
+                )
+                if isinstance(ca, Heading):
+                    self.assertEqual(ca.level, cb.level, 'heading level')
+
+    def test_loads(self):
+        document = make_document()
+        f = io.BytesIO()
+        binary.write(document, f)
+        self.assertDocumentsEqual(document, binary.loads(f.getvalue()))
+
+    def test_strings_interned(self):
+        f = io.BytesIO()
+        binary.write(make_document(), f)
+        data = f.getvalue()
+        self.assertEqual(data.count('Repeated ünïcode'.encode('utf-8')), 1)
+        decoded = binary.loads(data)
+        a = decoded.pages[1].contents[-1].string
+        b = decoded.pages[3].contents[-1].string
+        self.assertIs(a, b, 'decoded strings not shared')
+
+    def test_read_lazy(self):
+        document = make_document()
+        fd, path = tempfile.mkstemp(suffix='.rfnb')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                binary.write(document, f)
+            with binary.read(path) as lazy:
+                self.assertEqual(len(lazy.pages), 3)
+                self.assertEqual(lazy.pages.loaded, [], 'decoded eagerly')
+                page = lazy.pages[3]
+                self.assertEqual(lazy.pages.loaded, [3], 'decoded too much')
+                self.assertEqual(page.contents[-1].string, 'Repeated ünïcode')
+                # Resolving the heading hierarchy decodes the parent's page
+                self.assertEqual(page.contents[1].level, 3)
+                self.assertEqual(lazy.pages.loaded, [1, 3])
+                self.assertDocumentsEqual(document, lazy)
+        finally:
+            os.remove(path)
+
+    def test_bad_magic(self):
+        with self.assertRaises(binary.FormatError):
+            binary.loads(b'\0' * 64)
@@ -0,0 +1,148 @@
+import pickle
+import unittest
+from refiner.geometry import Box
+from refiner.input.model import InputPage, Text
+from refiner.output.model import (
+    OutputDocument, OutputPage, Paragraph, Heading, join_strings
+)
+
+
+def make_document(numbers):
+    document = OutputDocument()
+    for n in numbers:
+        page = OutputPage(document, n, 100, 100)
+        document.pages[n] = page
+    return document
+
+
+class PageStoreTestCase(unittest.TestCase):
+    def test_ordered(self):
+        document = make_document([3, 1, 5, 2])
+        self.assertEqual(document.pages.keys(), [1, 2, 3, 5], 'keys order')
+        self.assertEqual(
+            [p.number for p in document.page_list], [1, 2, 3, 5],
+            'page_list order'
+        )
+        self.assertEqual(list(document.pages), [1, 2, 3, 5], 'iter order')
+
+    def test_replace_and_delete(self):
+        document = make_document([1, 2, 3])
+        page = OutputPage(document, 2, 50, 50)
+        document.pages[2] = page
+        self.assertEqual(len(document.pages), 3, 'replace changed length')
+        self.assertIs(document.pages[2], page, 'page not replaced')
+        del document.pages[2]
+        self.assertEqual(document.pages.keys(), [1, 3], 'delete error')
+        self.assertNotIn(2, document.pages)
+
+    def test_range(self):
+        document = make_document(range(1, 31))
+        self.assertEqual(
+            [p.number for p in document.pages.range(10, 20)],
+            list(range(10, 21)), 'inclusive range'
+        )
+        self.assertEqual(
+            [p.number for p in document.pages.range(None, 3)], [1, 2, 3],
+            'open first'
+        )
+        self.assertEqual(
+            [p.number for p in document.pages.range(29)], [29, 30],
+            'open last'
+        )
+        self.assertEqual(document.pages.range(40, 50), [], 'empty range')
+
+
+class ContentIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.document = make_document(range(1, 4))
+        for page in self.document.page_list:
+            page.contents.append(Heading(page, 10, 5, 'Title', None))
+            for top in (50, 20, 80, 35):
+                page.contents.append(Paragraph(page, 10, top, str(top)))
+            page.contents.append(Paragraph(page, 60, 20, 'right'))
+
+    def test_between(self):
+        page = self.document.pages[1]
+        self.assertEqual(
+            [c.string for c in page.between(20, 50)],
+            ['20', 'right', '35', '50'], 'between order'
+        )
+        self.assertEqual(page.between(81, 90), [], 'empty between')
+
+    def test_between_kind(self):
+        found = self.document.between(0, 30, first=2, last=3, kind=Paragraph)
+        self.assertEqual(
+            [(c.page.number, c.string) for c in found],
+            [(2, '20'), (2, 'right'), (3, '20'), (3, 'right')],
+            'document between'
+        )
+        found = self.document.between(0, 100, kind=Heading)
+        self.assertEqual(len(found), 3, 'headings on all pages')
+
+    def test_within(self):
+        page = self.document.pages[1]
+        found = page.within(Box(50, 0, right=100, bottom=100))
+        self.assertEqual([c.string for c in found], ['right'], 'within error')
+
+    def test_nearest(self):
+        page = self.document.pages[2]
+        self.assertEqual(page.nearest(12, 33).string, '35', 'nearest below')
+        self.assertEqual(page.nearest(58, 25).string, 'right', 'nearest right')
+        self.assertEqual(page.nearest(0, 0).string, 'Title', 'nearest top')
+        self.assertEqual(
+            page.nearest(0, 0, kind=Paragraph).string, '20', 'nearest kind'
+        )
+        self.assertIsNone(
+            OutputPage(self.document, 9, 1, 1).nearest(0, 0), 'empty page'
+        )
+
+    def test_index_rebuilt(self):
+        page = self.document.pages[3]
+        self.assertEqual(len(page.between(90, 100)), 0)
+        page.contents.append(Paragraph(page, 10, 95, 'late'))
+        self.assertEqual(
+            [c.string for c in page.between(90, 100)], ['late'],
+            'index not rebuilt after append'
+        )
+
+    def test_index_rebuilt_after_edit(self):
+        page = self.document.pages[3]
+        i = page.contents.index(page.nearest(10, 20))
+        page.contents[i] = Paragraph(page, 10, 97, 'replaced')
+        self.assertEqual(
+            [c.string for c in page.between(90, 100)], ['replaced'],
+            'index not rebuilt after replacing a content'
+        )
+        page.contents[i].top = 150
+        self.assertEqual(len(page.between(90, 100)), 0, 'moved content found')
+        self.assertEqual(page.nearest(10, 150).string, 'replaced')
+        page.contents = page.contents[:1]
+        self.assertEqual(len(page.between(0, 1000)), 1, 'contents not reset')
+
+
+class LazyStringTestCase(unittest.TestCase):
+    def setUp(self):
+        input_page = InputPage(1, 100, 100)
+        self.texts = [
+            Text(' Some  text ', input_page, 0, 0),
+            Text('\tmore', input_page, 0, 10),
+        ]
+        self.page = make_document([1]).pages[1]
+
+    def test_join_strings(self):
+        self.assertEqual(join_strings(['a ', ' b']), 'a b')
+        self.assertEqual(
+            join_strings([t.string for t in self.texts]), 'Some text more'
+        )
+
+    def test_lazy(self):
+        content = Paragraph(self.page, 0, 0, texts=self.texts)
+        self.assertIsNone(content._string)
+        self.assertEqual(content.string, 'Some text more')
+        self.assertIsNone(content.texts, 'texts not released')
+
+    def test_pickle(self):
+        content = Heading(self.page, 0, 0, None, None, texts=self.texts)
+        data = pickle.dumps(content)
+        self.assertNotIn(b'Text', data)
+        self.assertEqual(pickle.loads(data).string, 'Some text more')
@@ -0,0 +1,86 @@
+import io
+import json
+import unittest
+from refiner.output.model import OutputDocument, OutputPage, Paragraph, Heading
+from refiner.output import jsonl, markdown, html
+
+
+def make_document():
+    document = OutputDocument()
+    for n in (2, 1):
+        page = OutputPage(document, n, 100, 200)
+        document.pages[n] = page
+        title = Heading(page, 10, 10, 'Title {}'.format(n), None)
+        page.contents.append(title)
+        page.contents.append(Heading(page, 10, 30, 'Sub', title))
+        page.contents.append(Paragraph(page, 10, 50, 'Some <text> & more'))
+    return document
+
+
+class JSONLTestCase(unittest.TestCase):
+    def test_write(self):
+        f = io.StringIO()
+        jsonl.write(make_document(), f)
+        records = [json.loads(l) for l in f.getvalue().splitlines()]
+        self.assertEqual(len(records), 9, 'incorrect record count')
+        self.assertEqual(records[0], {'type': 'document', 'quality': 'full'})
+        records = records[1:]
+        self.assertEqual(records[0]['type'], 'page')
+        self.assertEqual(records[0]['number'], 1, 'pages out of order')
+        self.assertEqual(records[1]['type'], 'heading')
+        self.assertEqual(records[2]['level'], 2, 'incorrect level')
+        self.assertEqual(records[3]['string'], 'Some <text> & more')
+        self.assertNotIn('level', records[3])
+
+
+class MarkdownTestCase(unittest.TestCase):
+    def test_write(self):
+        f = io.StringIO()
+        markdown.write(make_document(), f)
+        lines = [l for l in f.getvalue().splitlines() if l]
+        self.assertEqual(lines[0], '<!-- quality full -->')
+        self.assertEqual(lines[1], '<!-- page 1 -->')
+        self.assertEqual(lines[2], '# Title 1')
+        self.assertEqual(lines[3], '## Sub')
+        self.assertEqual(lines[4], 'Some \\<text\\> \\& more')
+
+    def test_escape(self):
+        self.assertEqual(markdown.escape('# not a heading'), '\\# not a heading')
+        self.assertEqual(markdown.escape('* star'), '\\* star')
+        self.assertEqual(markdown.escape('- dash'), '\\- dash')
+        self.assertEqual(markdown.escape('12. Point'), '12\\. Point')
+        self.assertEqual(markdown.escape('3) Point'), '3\\) Point')
+        self.assertEqual(markdown.escape('1999 was'), '1999 was')
+        self.assertEqual(markdown.escape('Plain'), 'Plain')
+        self.assertEqual(markdown.escape('> quote'), '\\> quote')
+        self.assertEqual(
+            markdown.escape('a *b* _c_ `d` [e](f) \\g'),
+            'a \\*b\\* \\_c\\_ \\`d\\` \\[e\\](f) \\\\g'
+        )
+
+    def test_max_level(self):
+        document = OutputDocument()
+        page = OutputPage(document, 1, 100, 200)
+        document.pages[1] = page
+        parent = None
+        for level in range(8):
+            parent = Heading(page, 10, 10 * level, '#{}'.format(level), parent)
+            page.contents.append(parent)
+        f = io.StringIO()
+        markdown.write(document, f)
+        lines = [l for l in f.getvalue().splitlines() if l]
+        self.assertEqual(lines[2], '# \\#0')
+        self.assertEqual(lines[-1], '###### \\#7')
+
+
+class HTMLTestCase(unittest.TestCase):
+    def test_write(self):
+        f = io.StringIO()
+        html.write(make_document(), f)
+        out = f.getvalue()
+        self.assertTrue(out.startswith('<!DOCTYPE html>'))
+        self.assertIn('<body data-quality="full">', out)
+        self.assertIn('<h1>Title 1</h1>', out)
+        self.assertIn('<h2>Sub</h2>', out)
+        self.assertIn('<p>Some &lt;text&gt; &amp; more</p>', out)
+        self.assertLess(out.index('id="page-1"'), out.index('id="page-2"'))
@@ -0,0 +1,137 @@
+import os
+import unittest
+from refiner import bench, synthetic
+from refiner.core import refine
+from refiner.equivalence import diff
+from refiner.input import pdftohtml, pdftotext
+from refiner.strings import StringTable
+from refiner.test import commands
+
+
+XHTML = '''<!DOCTYPE html>
+<html xmlns="http://www.w3.org/1999/xhtml">
+<head><title></title></head>
+<body>
+<doc>
+<page width="100.000000" height="200.000000">
+<flow><block>
+<line xMin="10.000000" yMin="20.000000" xMax="40.000000" yMax="28.000000">
+<word xMin="10.000000" yMin="20.000000" xMax="22.000000" yMax="28.000000">Fish</word>
+<word xMin="24.000000" yMin="20.000000" xMax="40.000000" yMax="28.000000">&amp; chips</word>
+</line>
+</block></flow>
+</page>
+<page width="100.000000" height="200.000000">
+<flow><block>
+<line xMin="10.000000" yMin="20.000000" xMax="20.000000" yMax="28.000000">
+<word xMin="10.000000" yMin="20.000000" xMax="20.000000" yMax="28.000000">Peas</word>
+</line>
+<line xMin="10.000000" yMin="40.000000" xMax="20.000000" yMax="52.000000">
+<word xMin="10.000000" yMin="40.000000" xMax="20.000000" yMax="52.000000">Big</word>
+</line>
+</block></flow>
+</page>
+</doc>
+</body>
+</html>
+'''
+
+
+class ParseTestCase(unittest.TestCase):
+    def test_parse(self):
+        document = pdftotext.parse(XHTML)
+        self.assertEqual([p.number for p in document.pages], [1, 2])
+        page = document.pages[0]
+        self.assertEqual((page.width, page.height), (150, 300))
+        text, = page.texts
+        self.assertEqual(text.string, 'Fish & chips')
+        self.assertEqual(
+            (text.left, text.top, text.width, text.height), (15, 30, 45, 12)
+        )
+        self.assertEqual(text.font.size, 12)
+        small, big = document.pages[1].texts
+        self.assertIs(small.font, text.font)
+        self.assertEqual(big.font.size, 18)
+        self.assertEqual(len(document.fonts), 2)
+
+    def test_strings(self):
+        strings = StringTable()
+        document = pdftotext.parse(XHTML, strings=strings)
+        self.assertIs(document.strings, strings)
+        self.assertIn('Peas', strings)
+
+    def test_agrees_with_pdftohtml(self):
+        # Fonts of distinct sizes only, since pdftotext doesn't report fonts
+        for fragments in (1, 3):
+            expected = refine(pdftohtml.parse(synthetic.generate(
+                pages=3, fragments=fragments, noise=3, seed=2
+            )), roi=synthetic.ROI)
+            actual = refine(pdftotext.parse(synthetic.generate(
+                pages=3, fragments=fragments, noise=3, seed=2, format='bbox'
+            )), roi=synthetic.ROI)
+            self.assertIsNone(diff(expected, actual))
+
+    def test_unknown_format(self):
+        self.assertRaises(
+            ValueError, synthetic.generate, pages=1, format='html'
+        )
+
+
+class ParseFileTestCase(commands.CommandTestCase):
+    name = 'pdftotext'
+    script = commands.PDFTOTEXT
+
+    def setUp(self):
+        super(ParseFileTestCase, self).setUp()
+        self.path = os.path.join(self.dir, 'document.pdf')
+        with open(self.path, 'w') as f:
+            f.write(XHTML)
+
+    def test_arguments(self):
+        self.assertEqual(
+            pdftotext.arguments('a.pdf'),
+            ['pdftotext', '-bbox-layout', 'a.pdf', '-']
+        )
+
+    def test_parse_file(self):
+        document = pdftotext.parse_file(self.path, command=self.command)
+        self.assertEqual(len(document.pages), 2)
+        self.assertEqual(document.pages[1].texts[1].string, 'Big')
+
+
+class BenchBackendsTestCase(commands.CommandTestCase):
+    def test_bench_backends(self):
+        results = bench.bench_backends(2, 1)
+        self.assertEqual(
+            [r['backend'] for r in results], ['pdftohtml', 'pdftotext']
+        )
+        for r in results:
+            self.assertEqual(r['stage'], 'parse_synthetic')
+            self.assertTrue(r['identical'])
+            self.assertEqual(r['agreement'], 1.0)
+        rows = bench.compare({'results': results}, {'results': results})
+        self.assertEqual(len(rows), 2)
+
+    def test_bench_pdfs(self):
+        # Each fake tool reads its own output for a "PDF" from next to it
+        pdftohtml_command = commands.write_command(
+            self.dir, 'pdftohtml', '#!/bin/sh\nexec cat "$2.xml" > "$3"\n'
+        )
+        pdftotext_command = commands.write_command(
+            self.dir, 'pdftotext', '#!/bin/sh\nexec cat "$2.xhtml"\n'
+        )
+        path = os.path.join(self.dir, 'document.pdf')
+        for format, suffix in (('pdftohtml', '.xml'), ('bbox', '.xhtml')):
+            with open(path + suffix, 'w') as f:
+                f.write(synthetic.generate(pages=2, noise=2, format=format))
+        results = bench.bench_pdfs([path], 1, {
+            'pdftohtml': pdftohtml_command, 'pdftotext': pdftotext_command,
+        })
+        self.assertEqual(
+            [r['backend'] for r in results], ['pdftohtml', 'pdftotext']
+        )
+        for r in results:
+            self.assertEqual(r['stage'], 'end_to_end')
+            self.assertEqual(r['path'], path)
+            self.assertEqual(r['pages'], 2)
+            self.assertEqual(r['agreement'], 1.0)
@@ -0,0 +1,70 @@
+import os
+import subprocess
+import time
+from refiner import synthetic
+from refiner.core import refine
+from refiner.equivalence import diff
+from refiner.input.pdftohtml import parse
+from refiner.pipeline import pipeline
+from refiner.test.commands import CommandTestCase
+
+
+class PipelineTestCase(CommandTestCase):
+    # Marks when each extraction starts
+    script = '''#!/bin/sh
+touch "$3.started"
+exec cat "$3"
+'''
+
+    def setUp(self):
+        super(PipelineTestCase, self).setUp()
+        self.xml = dict()
+        self.paths = list()
+        for i in range(4):
+            path = os.path.join(self.dir, '{}.pdf'.format(i))
+            self.xml[path] = synthetic.generate(pages=2, seed=i)
+            with open(path, 'w') as f:
+                f.write(self.xml[path])
+            self.paths.append(path)
+
+    def started(self, path, timeout = 5):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if os.path.exists(path + '.started'):
+                return True
+            time.sleep(0.01)
+        return False
+
+    def test_results(self):
+        paths = self.paths[:2] + [os.path.join(self.dir, 'missing.pdf')]
+        paths += self.paths[2:]
+        results = list(pipeline(
+            paths, depth=2, command=self.command, roi=synthetic.ROI
+        ))
+        self.assertEqual([r.path for r in results], paths)
+        for r in results:
+            if r.path.endswith('missing.pdf'):
+                self.assertIsInstance(r.error, subprocess.CalledProcessError)
+            else:
+                self.assertIsNone(r.error)
+                expected = refine(parse(self.xml[r.path]), roi=synthetic.ROI)
+                self.assertIsNone(diff(expected, r.document))
+
+    def test_prefetch(self):
+        results = pipeline(self.paths, depth=2, command=self.command)
+        self.assertEqual(next(results).path, self.paths[0])
+        # While the first document was refined the next two were extracted
+        self.assertTrue(self.started(self.paths[1]))
+        self.assertTrue(self.started(self.paths[2]))
+        self.assertFalse(os.path.exists(self.paths[3] + '.started'))
+        results.close()
+
+    def test_max_bytes(self):
+        # Only the next document is extracted ahead
+        results = pipeline(
+            self.paths, depth=3, max_bytes=0, command=self.command
+        )
+        next(results)
+        self.assertTrue(self.started(self.paths[1]))
+        self.assertFalse(os.path.exists(self.paths[2] + '.started'))
+        self.assertEqual(len(list(results)), 3)
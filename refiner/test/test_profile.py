@@ -0,0 +1,117 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from refiner import synthetic
+from refiner.core import refine
+from refiner.input.pdftohtml import parse
+from refiner.instrument import Instrumentation
+from refiner.profile import LayoutProfile, ProfileStore
+
+
+def contents(document):
+    return [
+        (type(c).__name__, c.string)
+        for p in document.page_list for c in p.contents
+    ]
+
+
+class LayoutProfileTestCase(unittest.TestCase):
+    def setUp(self):
+        self.xmls = [
+            synthetic.generate(pages=6, columns=2, noise=4, seed=seed)
+            for seed in range(3)
+        ]
+
+    def refine(self, xml, profile):
+        instrument = Instrumentation()
+        document = refine(parse(xml), profile=profile, instrument=instrument)
+        return document, instrument
+
+    def test_learn_and_use(self):
+        profile = LayoutProfile()
+        _, instrument = self.refine(self.xmls[0], profile)
+        self.assertIn('running', instrument.counts, 'no fallback detection')
+        self.assertEqual(profile.documents, 1)
+        self.assertEqual(profile.columns_for(parse(self.xmls[0]).pages[0]),
+                         [60, 461])
+        # The learned ROI leaves out the header, footer and specks
+        left, top, right, bottom = profile.roi
+        self.assertLess(top, synthetic.ROI[1] + 0.01)
+        self.assertGreater(top, 30 / synthetic.PAGE_HEIGHT)
+        self.assertGreater(bottom, synthetic.ROI[3] - 0.05)
+        self.assertLess(
+            bottom, (synthetic.PAGE_HEIGHT - 40) / synthetic.PAGE_HEIGHT
+        )
+        self.assertEqual(profile.font_sizes, {12, 14, 16, 20})
+
+        for xml in self.xmls[1:]:
+            document, instrument = self.refine(xml, profile)
+            self.assertNotIn('running', instrument.counts)
+            self.assertEqual(profile.documents, 1, 'profile updated')
+            self.assertEqual(
+                contents(document),
+                contents(refine(parse(xml), roi=synthetic.ROI))
+            )
+
+    def test_fallback(self):
+        profile = LayoutProfile()
+        self.refine(self.xmls[0], profile)
+        # A page size the profile hasn't seen
+        xml = self.xmls[1].replace('width="892"', 'width="900"')
+        self.assertLess(profile.confidence(parse(xml).pages), 0.1)
+        _, instrument = self.refine(xml, profile)
+        self.assertIn('running', instrument.counts)
+        self.assertEqual(profile.documents, 2)
+        self.assertEqual(sorted(profile.columns), ['892x1263', '900x1263'])
+        self.assertTrue(profile.matches(parse(xml).pages))
+
+    def test_layout_mismatch(self):
+        profile = LayoutProfile()
+        self.refine(self.xmls[0], profile)
+        # Same page size and fonts but a different number of columns
+        for columns in (1, 3):
+            xml = synthetic.generate(
+                pages=6, columns=columns, noise=4, seed=7
+            )
+            self.assertFalse(profile.matches(parse(xml).pages), columns)
+            document, instrument = self.refine(xml, LayoutProfile.from_dict(
+                profile.to_dict()
+            ))
+            self.assertIn('running', instrument.counts)
+            self.assertEqual(
+                contents(document),
+                contents(refine(parse(xml), strip_running=True))
+            )
+
+    def test_fallback_with_roi(self):
+        profile = LayoutProfile()
+        instrument = Instrumentation()
+        refine(
+            parse(self.xmls[0]), profile=profile, roi=synthetic.ROI,
+            instrument=instrument
+        )
+        self.assertNotIn('running', instrument.counts)
+        self.assertEqual(profile.documents, 1)
+
+
+class ProfileStoreTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'profiles.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_round_trip(self):
+        store = ProfileStore(self.path)
+        self.assertEqual(len(store), 0)
+        profile = store.get('journal')
+        refine(parse(synthetic.generate(pages=4, seed=1)), profile=profile)
+        store.save()
+
+        loaded = ProfileStore(self.path)
+        self.assertIn('journal', loaded)
+        self.assertEqual(loaded.get('journal').to_dict(), profile.to_dict())
+        self.assertEqual(os.listdir(self.dir), ['profiles.json'])
@@ -0,0 +1,90 @@
+import io
+import json
+import unittest
+
+from refiner import synthetic
+from refiner.columns import ColumnSampler, columns
+from refiner.core import refine, QUALITY_FAST
+from refiner.input.pdftohtml import parse
+from refiner.instrument import Instrumentation
+from refiner.output import binary, html, jsonl, markdown
+from refiner.output.model import Heading
+
+
+def words(document):
+    return sorted(
+        w for p in document.page_list for c in p.contents
+        for w in c.string.split()
+    )
+
+
+class FastQualityTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.xml = synthetic.generate(pages=8, columns=2, fonts=4, seed=9)
+
+    def test_sampler(self):
+        document = parse(self.xml)
+        sampler = ColumnSampler(samples=2)
+        for page in document.pages:
+            self.assertEqual(
+                sampler.columns(page, page.texts), columns(page.texts)
+            )
+        self.assertEqual(sum(sampler.found[(892, 1263)].values()), 2)
+
+    def test_fast(self):
+        full = refine(parse(self.xml), roi=synthetic.ROI)
+        self.assertEqual(full.quality, 'full')
+
+        instrument = Instrumentation()
+        fast = refine(
+            parse(self.xml), roi=synthetic.ROI, quality=QUALITY_FAST,
+            instrument=instrument
+        )
+        self.assertEqual(fast.quality, 'fast')
+        self.assertNotIn('join_over_columns', instrument.stages)
+        self.assertEqual(fast.pages.keys(), full.pages.keys())
+        # Nothing is lost, only structured differently
+        self.assertEqual(words(fast), words(full))
+        headings = [
+            c for p in fast.page_list for c in p.contents
+            if isinstance(c, Heading)
+        ]
+        self.assertGreater(len(headings), 0)
+        # Only the heading fonts (bigger than the body font) make headings
+        self.assertTrue(all(c.string[0].isupper() for c in headings))
+        self.assertIn(2, [c.level for c in headings])
+
+    def test_progress(self):
+        calls = list()
+        refine(
+            parse(self.xml), quality=QUALITY_FAST,
+            progress=lambda *args: calls.append(args)
+        )
+        stages = set(stage for stage, _, _ in calls)
+        self.assertEqual(stages, {'pages', 'group_lines', 'classify'})
+
+    def test_written(self):
+        fast = refine(parse(self.xml), quality=QUALITY_FAST)
+        f = io.BytesIO()
+        binary.write(fast, f)
+        self.assertEqual(binary.loads(f.getvalue()).quality, 'fast')
+        f = io.BytesIO()
+        binary.write(refine(parse(self.xml)), f)
+        self.assertEqual(binary.loads(f.getvalue()).quality, 'full')
+
+        f = io.StringIO()
+        jsonl.write(fast, f)
+        record = json.loads(f.getvalue().splitlines()[0])
+        self.assertEqual(record, {'type': 'document', 'quality': 'fast'})
+        f = io.StringIO()
+        html.write(fast, f)
+        self.assertIn('<body data-quality="fast">', f.getvalue())
+        f = io.StringIO()
+        markdown.write(fast, f)
+        self.assertTrue(f.getvalue().startswith('<!-- quality fast -->'))
+
+    def test_unknown(self):
+        self.assertRaises(
+            ValueError, refine, parse(self.xml), quality='best'
+        )
@@ -0,0 +1,37 @@
+import unittest
+
+from refiner import synthetic
+from refiner.core import refine
+from refiner.input.pdftohtml import parse
+from refiner.running import find_running, normalize
+
+
+def strings(document):
+    return [c.string for p in document.page_list for c in p.contents]
+
+
+class RunningTestCase(unittest.TestCase):
+    def test_normalize(self):
+        self.assertEqual(normalize(' Page  12 of 30 '), 'page # of #')
+
+    def test_find_running(self):
+        document = parse(synthetic.generate(pages=6, noise=2, seed=1))
+        running = find_running(document.pages)
+        self.assertEqual(len(running), 12)
+        self.assertEqual(
+            {t.string for t in running},
+            {'Synthetic Journal of Documents'} | {str(n) for n in range(1, 7)}
+        )
+
+    def test_too_few_pages(self):
+        document = parse(synthetic.generate(pages=2, noise=2, seed=1))
+        self.assertEqual(find_running(document.pages), set())
+
+    def test_refine(self):
+        # Only the running header and footer are outside the ROI, so stripping
+        # them should have the same effect as the ROI
+        xml = synthetic.generate(pages=8, columns=2, noise=2, seed=2)
+        expected = refine(parse(xml), roi=synthetic.ROI)
+        actual = refine(parse(xml), strip_running=True)
+        self.assertNotEqual(strings(expected), strings(refine(parse(xml))))
+        self.assertEqual(strings(expected), strings(actual))
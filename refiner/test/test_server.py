@@ -0,0 +1,112 @@
+import http.client
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+import urllib.parse
+from refiner import synthetic
+from refiner.core import refine
+from refiner.input.pdftohtml import parse
+from refiner.server import make_server
+
+
+class ServerTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = make_server(('127.0.0.1', 0), workers=1)
+        cls.thread = threading.Thread(target=cls.server.serve_forever)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.thread.join()
+
+    def request(self, method, path, body = None, headers = {}):
+        connection = http.client.HTTPConnection(*self.server.server_address)
+        try:
+            connection.request(method, path, body, headers)
+            response = connection.getresponse()
+            return response.status, response.read().decode('utf-8')
+        finally:
+            connection.close()
+
+    def test_refine_xml(self):
+        xml = synthetic.generate(pages=2)
+        query = urllib.parse.urlencode({
+            'roi': ','.join(str(x) for x in synthetic.ROI),
+        })
+        status, body = self.request(
+            'POST', '/refine?' + query, xml.encode('utf-8'),
+            {'Content-Type': 'application/xml'}
+        )
+        self.assertEqual(status, 200)
+        records = [json.loads(l) for l in body.splitlines()]
+        expected = refine(parse(xml), roi=synthetic.ROI)
+        strings = [c.string for p in expected.page_list for c in p.contents]
+        self.assertEqual(
+            [r['string'] for r in records if 'string' in r], strings
+        )
+
+        status, body = self.request('GET', '/stats')
+        self.assertEqual(status, 200)
+        stats = json.loads(body)
+        self.assertGreaterEqual(stats['completed'], 1)
+        self.assertEqual(stats['in_flight'], 0)
+        self.assertEqual(stats['queue_depth'], 0)
+        self.assertGreater(stats['throughput'], 0)
+
+    def test_markdown(self):
+        status, body = self.request(
+            'POST', '/refine?format=markdown',
+            synthetic.generate(pages=1).encode('utf-8')
+        )
+        self.assertEqual(status, 200)
+        self.assertTrue(body.startswith('<!-- quality full -->'))
+        self.assertIn('<!-- page 1 -->', body)
+
+    def test_errors(self):
+        status, _ = self.request('GET', '/missing')
+        self.assertEqual(status, 404)
+        status, _ = self.request('POST', '/refine?format=pdf', b'')
+        self.assertEqual(status, 400)
+        status, _ = self.request('POST', '/refine?quality=best', b'')
+        self.assertEqual(status, 400)
+        status, _ = self.request('POST', '/refine?roi=0,1', b'')
+        self.assertEqual(status, 400)
+        for request in ([1], 'x', {}, {'path': 1}):
+            status, _ = self.request(
+                'POST', '/refine', json.dumps(request),
+                {'Content-Type': 'application/json'}
+            )
+            self.assertEqual(status, 400)
+        status, body = self.request(
+            'POST', '/refine', json.dumps({'path': '/no/such.pdf'}),
+            {'Content-Type': 'application/json'}
+        )
+        self.assertEqual(status, 500)
+        self.assertIn('error', json.loads(body))
+
+
+class UnixSocketTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'refiner.sock')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_replaces_socket(self):
+        make_server(self.path, workers=1).server_close()
+        self.assertTrue(os.path.exists(self.path))
+        make_server(self.path, workers=1).server_close()
+
+    def test_keeps_other_files(self):
+        with open(self.path, 'w') as f:
+            f.write('precious')
+        self.assertRaises(FileExistsError, make_server, self.path, workers=1)
+        with open(self.path) as f:
+            self.assertEqual(f.read(), 'precious')
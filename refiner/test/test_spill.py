@@ -0,0 +1,99 @@
+import io
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+from refiner import synthetic
+from refiner.batch import refine_many
+from refiner.core import refine
+from refiner.equivalence import diff
+from refiner.input.pdftohtml import parse, parse_xml_file
+from refiner.output import binary
+from refiner.output.model import Heading, PageStore
+from refiner.output.spill import SpillStore
+
+
+class SpillTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.xml = synthetic.generate(pages=12, columns=2, fonts=4, seed=3)
+
+    def test_equivalent(self):
+        expected = refine(parse(self.xml), roi=synthetic.ROI)
+        actual = refine(parse(self.xml), roi=synthetic.ROI, max_memory=1)
+        self.assertIsInstance(actual.pages, SpillStore)
+        # With a tiny ceiling only the most recently used page stays loaded
+        self.assertEqual(len(actual.pages.resident), 1)
+        self.assertIsNone(diff(expected, actual))
+        self.assertEqual(len(actual.pages.resident), 1)
+
+    def test_equivalent_scaled(self):
+        # Scaled coordinates aren't whole numbers and must survive a spill
+        expected = refine(parse(self.xml), width=600)
+        actual = refine(parse(self.xml), width=600, max_memory=1)
+        self.assertIsNone(diff(expected, actual))
+
+    def test_ceiling(self):
+        document = refine(parse(self.xml), max_memory=20000)
+        store = document.pages
+        self.assertEqual(len(store.spilled), 12)
+        for page in document.page_list:
+            self.assertLessEqual(
+                store.resident_bytes, 20000 + store.resident[page.number]
+            )
+        self.assertLess(len(store.resident), 12)
+
+    def test_heading_levels(self):
+        expected = refine(parse(self.xml))
+        actual = refine(parse(self.xml), max_memory=1)
+        levels = [
+            c.level for p in expected.page_list for c in p.contents
+            if isinstance(c, Heading)
+        ]
+        self.assertIn(2, levels, 'no heading hierarchy to test')
+        self.assertEqual(levels, [
+            c.level for p in actual.page_list for c in p.contents
+            if isinstance(c, Heading)
+        ])
+
+    def test_pickle(self):
+        expected = refine(parse(self.xml))
+        spilled = refine(parse(self.xml), max_memory=1)
+        actual = pickle.loads(pickle.dumps(spilled))
+        self.assertIs(type(actual.pages), PageStore)
+        self.assertIsNone(diff(expected, actual))
+        self.assertEqual(
+            [c.level for p in expected.page_list for c in p.contents
+             if isinstance(c, Heading)],
+            [c.level for p in actual.page_list for c in p.contents
+             if isinstance(c, Heading)]
+        )
+
+    def test_refine_many(self):
+        dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(dir, 'document.xml')
+            with open(path, 'w') as f:
+                f.write(self.xml)
+            result, = refine_many(
+                [path], workers=1, parser=parse_xml_file, max_memory=1
+            )
+            self.assertIsNone(result.error)
+            self.assertIsNone(diff(refine(parse(self.xml)), result.document))
+        finally:
+            shutil.rmtree(dir)
+
+    def test_binary_write(self):
+        expected = refine(parse(self.xml))
+        actual = refine(parse(self.xml), max_memory=1)
+        f = io.BytesIO()
+        binary.write(actual, f)
+        self.assertIsNone(diff(expected, binary.loads(f.getvalue())))
+
+    def test_range(self):
+        document = refine(parse(self.xml), max_memory=1)
+        pages = document.pages.range(3, 5)
+        self.assertEqual(len(pages), 3)
+        self.assertEqual([p.number for p in pages], [3, 4, 5])
+        self.assertEqual(pages[-1].number, 5)
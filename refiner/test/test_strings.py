@@ -0,0 +1,50 @@
+import pickle
+import unittest
+
+from refiner import synthetic
+from refiner.core import refine
+from refiner.equivalence import diff
+from refiner.input.pdftohtml import parse
+from refiner.strings import StringTable
+
+
+class StringTableTestCase(unittest.TestCase):
+    def test_intern(self):
+        table = StringTable()
+        a = ''.join(['Synthetic', ' Journal'])
+        b = ''.join(['Synthetic', ' Journal'])
+        self.assertIsNot(a, b)
+        self.assertIs(table.intern(a), a)
+        self.assertIs(table.intern(b), a)
+        report = table.report()
+        self.assertEqual(report['strings'], 1)
+        self.assertEqual(report['lookups'], 2)
+        self.assertGreater(report['saved'], 0)
+
+        copy = pickle.loads(pickle.dumps(table))
+        self.assertEqual(copy.report(), report)
+        self.assertEqual(copy.intern(b), a)
+
+    def test_shared(self):
+        table = StringTable()
+        xmls = [
+            synthetic.generate(pages=3, noise=2, fragments=3, seed=seed)
+            for seed in range(2)
+        ]
+        documents = [parse(xml, strings=table) for xml in xmls]
+        headers = [
+            t.string for d in documents for p in d.pages for t in p.texts
+            if t.string == 'Synthetic Journal of Documents'
+        ]
+        self.assertEqual(len(headers), 6)
+        self.assertTrue(all(h is headers[0] for h in headers))
+        self.assertGreater(table.report()['saved'], 0)
+
+        for xml, document in zip(xmls, documents):
+            output = refine(document)
+            self.assertIs(output.strings, table)
+            self.assertIsNone(diff(refine(parse(xml)), output))
+            for p in output.page_list:
+                for c in p.contents:
+                    self.assertIn(c.string, table)
+                    self.assertIs(table.intern(c.string), c.string)
@@ -0,0 +1,60 @@
+import unittest
+
+from refiner import synthetic
+from refiner.core import refine
+from refiner.equivalence import diff
+from refiner.input.pdftohtml import parse
+from refiner.sweep import sweep, points
+
+
+class SweepTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.xml = synthetic.generate(
+            pages=4, columns=2, fragments=2, noise=2, seed=5
+        )
+
+    def test_points(self):
+        grid = points({'max_line_sep': [0.5, 1.0], 'width': [None, 600]})
+        self.assertEqual(len(grid), 4)
+        self.assertEqual(grid[1]['max_line_sep'], 0.5)
+        self.assertEqual(grid[1]['width'], 600)
+        self.assertRaises(TypeError, points, {'index': [None]})
+
+    def test_equivalent(self):
+        grid = {
+            'max_line_sep': [0.2, 1.0],
+            'smallest_col': [0.25, 0.6],
+            'width': [None, 600],
+        }
+        results = sweep(parse(self.xml), grid, workers=2, roi=synthetic.ROI)
+        self.assertEqual(len(results), 8)
+        for r in results:
+            expected = refine(parse(self.xml), **r.params)
+            self.assertIsNone(diff(expected, r.document), r.params)
+
+    def test_min_h_sep(self):
+        # A large min_h_sep puts texts level with a text in the left column
+        # into the left column too
+        results = sweep(
+            parse(self.xml), {'min_h_sep': [0.5, 50.0]}, workers=1,
+            roi=synthetic.ROI
+        )
+        for r in results:
+            expected = refine(parse(self.xml), **r.params)
+            self.assertIsNone(diff(expected, r.document), r.params)
+        self.assertIsNotNone(diff(results[0].document, results[1].document))
+
+    def test_shared(self):
+        grid = {'max_line_sep': [0.2, 1.0], 'strip_running': [False, True]}
+        results = sweep(parse(self.xml), grid, workers=1)
+        for r in results:
+            expected = refine(parse(self.xml), **r.params)
+            self.assertIsNone(diff(expected, r.document), r.params)
+        # Points with the same selection parameters share the select and
+        # columns stages but not grouping
+        a, b = results[0].timings, results[2].timings
+        self.assertEqual(a['select'], b['select'])
+        self.assertEqual(a['columns'], b['columns'])
+        self.assertNotEqual(a['group_lines'], b['group_lines'])
+        self.assertNotEqual(a['select'], results[1].timings['select'])
@@ -0,0 +1,65 @@
+import unittest
+from refiner import bench, synthetic
+from refiner.core import refine
+from refiner.geometry import Box
+from refiner.input.pdftohtml import parse
+from refiner.profile import DEFAULT_MIN_CONFIDENCE
+
+
+class SyntheticTestCase(unittest.TestCase):
+    def test_deterministic(self):
+        self.assertEqual(
+            synthetic.generate(pages=2, seed=1),
+            synthetic.generate(pages=2, seed=1),
+            'same seed differs'
+        )
+        self.assertNotEqual(
+            synthetic.generate(pages=2, seed=1),
+            synthetic.generate(pages=2, seed=2),
+            'different seeds equal'
+        )
+
+    def test_parameters(self):
+        document = parse(synthetic.generate(
+            pages=3, columns=3, fragments=2, fonts=6, noise=4
+        ))
+        self.assertEqual(len(document.pages), 3)
+        self.assertEqual(len(document.fonts), 6)
+        roi = synthetic.ROI
+        for page in document.pages:
+            box = Box(
+                page.width * roi[0], page.height * roi[1],
+                right=page.width * roi[2], bottom=page.height * roi[3]
+            )
+            outside = [t for t in page.texts if not box.contains(t)]
+            self.assertEqual(len(outside), 4, 'noise not outside roi')
+            lefts = set(t.left for t in page.texts if box.contains(t))
+            self.assertGreaterEqual(len(lefts), 3)
+
+    def test_refine(self):
+        document = parse(synthetic.generate(pages=2, noise=2))
+        output = refine(document, roi=synthetic.ROI)
+        strings = [c.string for p in output.page_list for c in p.contents]
+        self.assertGreater(len(strings), 0)
+        self.assertNotIn('Synthetic Journal of Documents', strings)
+
+
+class BenchTestCase(unittest.TestCase):
+    def test_run_compare(self):
+        report = bench.run([1], 1)
+        stages = [r['stage'] for r in report['results']]
+        self.assertEqual(stages, [
+            'parse', 'columns', 'group_lines', 'join_over_columns', 'refine',
+            'running', 'profile'
+        ])
+        rows = bench.compare(report, report)
+        self.assertEqual(len(rows), 7)
+        self.assertTrue(all(ratio == 1.0 for *_, ratio in rows))
+
+    def test_profile_beats_detection(self):
+        results = bench.bench_document(20, 3, fragments=1)
+        best = dict((r['stage'], r['best']) for r in results)
+        self.assertLess(best['profile'], best['running'])
+        self.assertGreaterEqual(
+            results[-1]['confidence'], DEFAULT_MIN_CONFIDENCE
+        )
@@ -0,0 +1,50 @@
+import io
+import json
+import unittest
+from refiner.core import refine
+from refiner.input.pdftohtml import parse
+from refiner.trace import Tracer
+from refiner.test.test_instrument import XML
+
+
+class TracerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tracer = Tracer()
+        refine(parse(XML, instrument=self.tracer), instrument=self.tracer)
+        f = io.StringIO()
+        self.tracer.dump(f)
+        self.trace = json.loads(f.getvalue())
+
+    def test_format(self):
+        events = self.trace['traceEvents']
+        self.assertGreater(len(events), 0)
+        timestamps = [e['ts'] for e in events]
+        self.assertEqual(timestamps, sorted(timestamps), 'events not sorted')
+        for e in events:
+            for key in ('name', 'ph', 'ts', 'pid', 'tid'):
+                self.assertIn(key, e)
+            if e['ph'] == 'X':
+                self.assertGreaterEqual(e['dur'], 0)
+
+    def test_page_spans(self):
+        pages = [
+            e for e in self.trace['traceEvents']
+            if e['name'] == 'page' and e['ph'] == 'X'
+        ]
+        # One span per page for each of parse and refine
+        self.assertEqual(
+            sorted(e['args']['number'] for e in pages), [1, 1, 2, 2]
+        )
+        refine_span = [
+            e for e in self.trace['traceEvents'] if e['name'] == 'refine'
+        ][0]
+        for e in pages[2:]:
+            self.assertGreaterEqual(e['ts'], refine_span['ts'])
+
+    def test_join_events(self):
+        joins = [
+            e for e in self.trace['traceEvents'] if e['name'] == 'join'
+        ]
+        self.assertEqual(len(joins), 2)
+        self.assertEqual([e['args']['chain'] for e in joins], [1, 2])
+        self.assertEqual([e['args']['page'] for e in joins], [1, 2])
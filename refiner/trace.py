@@ -0,0 +1,68 @@
+import json
+import os
+import threading
+import time
+
+from refiner.instrument import Instrumentation
+
+
+class Tracer(Instrumentation):
+    '''Instrumentation which also records every stage entry as a span, and
+    every event, in Chrome trace event format.
+
+    Pass an instance as the instrument argument of parse_file(), parse() and
+    refine(), then save() the trace and open it in a trace viewer such as
+    chrome://tracing or Perfetto. refine() and parse() record a span per page,
+    with the page number in its args, around the per-page stages.
+
+    '''
+    def __init__(self, callback = None, memory = False):
+        super(Tracer, self).__init__(callback, memory)
+        self.events = list()
+        self.start = time.perf_counter()
+        self.pid = os.getpid()
+
+    def _timestamp(self, t):
+        # Trace event timestamps are in microseconds
+        return (t - self.start) * 1e6
+
+    def _span(self, stage, wall):
+        self.events.append({
+            'name': stage.name,
+            'cat': 'refiner',
+            'ph': 'X',
+            'ts': self._timestamp(stage.wall),
+            'dur': wall * 1e6,
+            'pid': self.pid,
+            'tid': threading.get_ident(),
+            'args': stage.args,
+        })
+
+    def event(self, name, **args):
+        self.events.append({
+            'name': name,
+            'cat': 'refiner',
+            'ph': 'i',
+            's': 't',
+            'ts': self._timestamp(time.perf_counter()),
+            'pid': self.pid,
+            'tid': threading.get_ident(),
+            'args': args,
+        })
+
+    def trace(self):
+        '''Return the trace as a JSON-serializable dict.'''
+        # Viewers expect events sorted by timestamp, but spans are recorded
+        # when they end so enclosing spans come after the spans they contain
+        return {
+            'traceEvents': sorted(self.events, key=lambda e: e['ts']),
+            'displayTimeUnit': 'ms',
+            'otherData': {'counts': dict(self.counts)},
+        }
+
+    def dump(self, f):
+        json.dump(self.trace(), f)
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            self.dump(f)
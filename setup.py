@@ -1,4 +1,4 @@
-from distutils.core import setup
+from setuptools import setup
 setup(
     name = 'pdfrefiner',
     packages = ['refiner', 'refiner.input', 'refiner.output'],
@@ -8,9 +8,15 @@ setup(
     author_email = 'mrmaxspencer@gmail.com',
     url = 'https://github.com/maxspencer/pdfrefiner',
     download_url = 'https://github.com/maxspencer/pdfrefiner/archive/0.1.2.tar.gz',
+    python_requires = '>=3.7',
     install_requires = [
         'beautifulsoup4',
     ],
+    entry_points = {
+        'console_scripts': [
+            'pdfrefiner = refiner.cli:main',
+        ],
+    },
     keywords = ['pdf', 'document'],
     classifiers = [
         'Development Status :: 2 - Pre-Alpha',
@@ -18,6 +24,8 @@ setup(
         'License :: OSI Approved :: MIT License',
         'Natural Language :: English',
         'Operating System :: POSIX',
-        'Programming Language :: Python :: 3.4'
+        'Programming Language :: Python :: 3',
+        'Programming Language :: Python :: 3 :: Only',
+        'Programming Language :: Python :: 3.7'
     ],
 )